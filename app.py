@@ -1,16 +1,57 @@
-from flask import Flask, jsonify, request, render_template
+import json
+import time
+BOOT_STARTED = time.perf_counter()
+
+from flask import Flask, Response, g, jsonify, request, render_template, stream_with_context
 import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
-from emotion_detector import detect_emotion
+from emotion_detector import detect_emotion_in_frames, detect_group_emotions, preload_model, startup_report, emotion_batcher, model_client, pipeline_timer
+from spotify_search import search_many
+from spotify_limiter import RateLimitedSpotify, SPOTIFY_TIMEOUT, spotify_session
+from spotify_auth import SharedClientCredentials
+from search_cache import search_cache
+from playlist_snapshots import PlaylistSnapshotStore
+from track_pools import TrackPools
+from pool_snapshot import POOL_SNAPSHOT_PATH, PoolSnapshotFile
+from track_catalog import TrackCatalog
+from ranking import CandidateSet, keyword_weights
+from tracks import Track
+from single_flight import SingleFlight
+from email_queue import SMTPConnectionPool, EmailQueue
+from email_rendering import PlaylistEmailRenderer
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, registry as metrics_registry
 from dotenv import load_dotenv
 import os
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from datetime import datetime
+from contextlib import closing
 
 load_dotenv()
 app = Flask(__name__)
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # Bounds uploaded frame bursts
+
+MAX_UPLOAD_FRAMES = int(os.getenv("MAX_UPLOAD_FRAMES", 10))
+
+ROUTE_LATENCY = metrics_registry.histogram(
+    "moodstream_http_request_seconds", "HTTP request latency by route", ("route", "method", "status"))
+RECOMMENDATION_PHASES = metrics_registry.histogram(
+    "moodstream_recommendation_phase_seconds", "Time spent per recommendation phase", ("phase", "full_list"))
+RECOMMENDATION_SOURCES = metrics_registry.counter(
+    "moodstream_recommendations_total", "Recommendations computed by the source that served them", ("source", "full_list"))
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    # Streamed routes record their latency once the body has been generated
+    if started is not None and not g.get('stream_metrics'):
+        observe_request_latency(started, response.status_code)
+    return response
+
+def observe_request_latency(started, status):
+    # Label by URL rule, not path, so /email-status/<job_id> stays one series
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    ROUTE_LATENCY.observe(time.perf_counter() - started, route=route, method=request.method, status=status)
 
 # Security headers for production
 @app.after_request
@@ -30,10 +71,16 @@ if not CLIENT_ID or not CLIENT_SECRET:
     # Don't exit in production, just log the error
     
 try:
-    auth_manager = SpotifyClientCredentials(client_id=CLIENT_ID, client_secret=CLIENT_SECRET)
-    sp = spotipy.Spotify(auth_manager=auth_manager)
+    # One pooled keep-alive session for token and API calls; the token is shared by all workers
+    spotify_http = spotify_session()
+    auth_manager = SharedClientCredentials(client_id=CLIENT_ID, client_secret=CLIENT_SECRET,
+                                           requests_session=spotify_http, requests_timeout=SPOTIFY_TIMEOUT)
+    # 429s are left to the shared limiter so Retry-After is honored worker-wide
+    sp = RateLimitedSpotify(spotipy.Spotify(auth_manager=auth_manager, requests_session=spotify_http,
+                                            requests_timeout=SPOTIFY_TIMEOUT))
 except Exception as e:
     print(f"ERROR: Failed to initialize Spotify client: {e}")
+    auth_manager = None
     sp = None
 
 # Email configuration with error handling
@@ -43,95 +90,212 @@ EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
 if not EMAIL_ADDRESS or not EMAIL_PASSWORD:
     print("WARNING: Email credentials not found. Email functionality will be disabled.")
 
+# Playlist emails are sent by background workers over pooled SMTP connections
+smtp_pool = SMTPConnectionPool(username=EMAIL_ADDRESS, password=EMAIL_PASSWORD)
+email_queue = EmailQueue(smtp_pool, EMAIL_ADDRESS)
+# Email templates are compiled once; rendered playlists are cached
+email_renderer = PlaylistEmailRenderer()
+
+# Load the emotion model at boot only on workers that serve detection
+if os.getenv("EMOTION_MODEL_PRELOAD", "0") == "1":
+    try:
+        preload_model()
+    except Exception as e:
+        print(f"WARNING: Emotion model preload failed, will retry on first detection: {e}")
+
 emotion_dict = {0: "Angry", 1: "Disgust", 2: "Anxious", 3: "Happy", 4: "Sad", 5: "Surprise", 6: "Relaxed"}
 
+def is_valid_emotion(emotion):
+    """
+    True for one of the model's emotions (any case).
+    """
+    return isinstance(emotion, str) and emotion.capitalize() in emotion_dict.values()
+
+# Background track pools (set TRACK_POOLS=0 to serve from the catalog or live search only)
+TRACK_POOLS_ENABLED = os.getenv("TRACK_POOLS", "1") == "1"
+TRACK_POOL_SEARCH_LIMIT = int(os.getenv("TRACK_POOL_SEARCH_LIMIT", 10))  # tracks per search when building pools
+TRACK_POOL_SIZE = int(os.getenv("TRACK_POOL_SIZE", 500))  # max candidates kept per emotion
+
+# Persistent track catalog survives worker restarts
+try:
+    track_catalog = TrackCatalog()
+except Exception as e:
+    print(f"WARNING: Track catalog unavailable, recommendations will rely on live search: {e}")
+    track_catalog = None
+
+# Enhanced emotion profiles with genres, moods, and descriptors
+EMOTION_PROFILES = {
+    "happy": {
+        "genres": ["pop", "dance", "funk", "disco", "electronic", "reggae"],
+        "moods": ["upbeat", "joyful", "celebration", "energetic", "festive", "cheerful"],
+        "descriptors": ["bright", "optimistic", "vibrant", "bouncy", "lively"],
+        "styles": ["party", "wedding", "festival", "dance", "uplifting"]
+    },
+    "sad": {
+        "genres": ["ballad", "acoustic", "folk", "blues", "indie", "classical"],
+        "moods": ["melancholy", "heartbreak", "emotional", "lonely", "nostalgic", "reflective"],
+        "descriptors": ["slow", "gentle", "soft", "tender", "mellow"],
+        "styles": ["romantic", "soulful", "contemplative", "introspective", "emotional"]
+    },
+    "angry": {
+        "genres": ["rock", "metal", "punk", "hard rock", "alternative", "grunge"],
+        "moods": ["intense", "powerful", "aggressive", "fierce", "rebellious", "strong"],
+        "descriptors": ["loud", "heavy", "driving", "forceful", "explosive"],
+        "styles": ["hardcore", "aggressive", "intense", "powerful", "energetic"]
+    },
+    "relaxed": {
+        "genres": ["ambient", "chill", "lounge", "jazz", "new age", "meditation"],
+        "moods": ["calm", "peaceful", "soothing", "tranquil", "serene", "zen"],
+        "descriptors": ["smooth", "flowing", "gentle", "warm", "cozy"],
+        "styles": ["chillout", "ambient", "peaceful", "relaxing", "meditative"]
+    },
+    "surprise": {
+        "genres": ["experimental", "fusion", "world", "electronic", "avant-garde"],
+        "moods": ["exciting", "dynamic", "unexpected", "innovative", "creative", "unique"],
+        "descriptors": ["eclectic", "diverse", "unconventional", "fresh", "original"],
+        "styles": ["experimental", "unique", "creative", "innovative", "surprising"]
+    },
+    "disgust": {
+        "genres": ["alternative", "indie", "grunge", "post-rock", "experimental"],
+        "moods": ["dark", "moody", "brooding", "introspective", "mysterious", "edgy"],
+        "descriptors": ["atmospheric", "haunting", "complex", "layered", "abstract"],
+        "styles": ["alternative", "indie", "dark", "moody", "atmospheric"]
+    },
+    "anxious": {
+        "genres": ["cinematic", "orchestral", "electronic", "ambient", "post-rock"],
+        "moods": ["tense", "dramatic", "suspenseful", "nervous", "uncertain", "restless"],
+        "descriptors": ["building", "climactic", "escalating", "urgent", "stirring"],
+        "styles": ["dramatic", "cinematic", "suspenseful", "intense", "emotional"]
+    }
+}
+
+def build_search_combinations(emotion):
+    """
+    Build the deterministic list of search queries for an emotion profile.
+    """
+    emotion_lower = emotion.lower()
+    profile = EMOTION_PROFILES.get(emotion_lower, EMOTION_PROFILES["happy"])
+    
+    search_combinations = []
+    
+    # Create diverse search combinations
+    # Genre-based searches
+    for genre in profile["genres"][:3]:
+        search_combinations.extend([
+            f"{genre} bollywood hindi",
+            f"{genre} indian music",
+            f"{genre} hindi songs"
+        ])
+
+    # Mood-based searches
+    for mood in profile["moods"][:3]:
+        search_combinations.extend([
+            f"{mood} hindi songs",
+            f"{mood} bollywood music",
+            f"{mood} indian cinema"
+        ])
+
+    # Style-based searches
+    for style in profile["styles"][:2]:
+        search_combinations.extend([
+            f"{style} bollywood",
+            f"{style} hindi music"
+        ])
+
+    # Descriptor-based searches
+    for descriptor in profile["descriptors"][:2]:
+        search_combinations.append(f"{descriptor} indian music")
+    
+    return search_combinations
+
+# Coalesces identical concurrent recommendation requests
+recommendation_flight = SingleFlight()
+
 def get_songs_for_emotion(emotion, full_list=False):
     """
     Enhanced song recommendation system using multi-dimensional search.
     Returns either 10 songs for display or 50+ songs for email.
+    Concurrent requests for the same (emotion, full_list) share one computation.
     """
-    # Enhanced emotion profiles with genres, moods, and descriptors
-    emotion_profiles = {
-        "happy": {
-            "genres": ["pop", "dance", "funk", "disco", "electronic", "reggae"],
-            "moods": ["upbeat", "joyful", "celebration", "energetic", "festive", "cheerful"],
-            "descriptors": ["bright", "optimistic", "vibrant", "bouncy", "lively"],
-            "styles": ["party", "wedding", "festival", "dance", "uplifting"]
-        },
-        "sad": {
-            "genres": ["ballad", "acoustic", "folk", "blues", "indie", "classical"],
-            "moods": ["melancholy", "heartbreak", "emotional", "lonely", "nostalgic", "reflective"],
-            "descriptors": ["slow", "gentle", "soft", "tender", "mellow"],
-            "styles": ["romantic", "soulful", "contemplative", "introspective", "emotional"]
-        },
-        "angry": {
-            "genres": ["rock", "metal", "punk", "hard rock", "alternative", "grunge"],
-            "moods": ["intense", "powerful", "aggressive", "fierce", "rebellious", "strong"],
-            "descriptors": ["loud", "heavy", "driving", "forceful", "explosive"],
-            "styles": ["hardcore", "aggressive", "intense", "powerful", "energetic"]
-        },
-        "relaxed": {
-            "genres": ["ambient", "chill", "lounge", "jazz", "new age", "meditation"],
-            "moods": ["calm", "peaceful", "soothing", "tranquil", "serene", "zen"],
-            "descriptors": ["smooth", "flowing", "gentle", "warm", "cozy"],
-            "styles": ["chillout", "ambient", "peaceful", "relaxing", "meditative"]
-        },
-        "surprise": {
-            "genres": ["experimental", "fusion", "world", "electronic", "avant-garde"],
-            "moods": ["exciting", "dynamic", "unexpected", "innovative", "creative", "unique"],
-            "descriptors": ["eclectic", "diverse", "unconventional", "fresh", "original"],
-            "styles": ["experimental", "unique", "creative", "innovative", "surprising"]
-        },
-        "disgust": {
-            "genres": ["alternative", "indie", "grunge", "post-rock", "experimental"],
-            "moods": ["dark", "moody", "brooding", "introspective", "mysterious", "edgy"],
-            "descriptors": ["atmospheric", "haunting", "complex", "layered", "abstract"],
-            "styles": ["alternative", "indie", "dark", "moody", "atmospheric"]
-        },
-        "anxious": {
-            "genres": ["cinematic", "orchestral", "electronic", "ambient", "post-rock"],
-            "moods": ["tense", "dramatic", "suspenseful", "nervous", "uncertain", "restless"],
-            "descriptors": ["building", "climactic", "escalating", "urgent", "stirring"],
-            "styles": ["dramatic", "cinematic", "suspenseful", "intense", "emotional"]
-        }
-    }
+    for event, payload in shared_recommendation_events(emotion, full_list):
+        if event == "done":
+            return list(payload["songs"])
+
+def shared_recommendation_events(emotion, full_list=False, stream=False):
+    """
+    recommendation_events, shared with any identical request already in
+    flight. A request that joins a flight gets the events of whichever
+    request started it, so a streaming request may only see "done".
+    """
+    return recommendation_flight.stream(
+        (emotion.lower(), full_list),
+        lambda: recommendation_events(emotion, full_list, stream)
+    )
+
+# Full playlists computed by recommendations, reused by the email route
+# and the "more songs" endpoint
+playlist_snapshots = PlaylistSnapshotStore()
+DISPLAY_SONGS = 10
+
+def recommend_with_snapshot(emotion):
+    """
+    Compute the full playlist once and store it as a snapshot.
+    Returns (display songs, snapshot id); the display songs are its first page.
+    """
+    full_playlist = get_songs_for_emotion(emotion, full_list=True)
+    snapshot_id = playlist_snapshots.put(emotion, full_playlist)
+    return display_songs(full_playlist), snapshot_id
+
+def display_songs(songs):
+    """
+    [name, url] rows for the first page of a playlist.
+    """
+    return [song[:2] for song in songs[:DISPLAY_SONGS]]
+
+DEFAULT_SONGS = [
+    ["Tum Hi Ho", "https://open.spotify.com/track/example1"],
+    ["Kal Ho Naa Ho", "https://open.spotify.com/track/example2"],
+    ["Ae Dil Hai Mushkil", "https://open.spotify.com/track/example3"],
+    ["Raabta", "https://open.spotify.com/track/example4"],
+    ["Gerua", "https://open.spotify.com/track/example5"]
+]
+
+def recommendation_events(emotion, full_list=False, stream=False):
+    """
+    Generate (event, payload) pairs for a recommendation, ending with
+    ("done", {"source", "songs"}) carrying the ranked songs. With stream=True
+    live searches are consumed as they finish and every batch of new tracks
+    is reported first as ("songs", {"query", "songs"}).
+    """
+    needed_tracks = 50 if full_list else 10
     
-    emotion_lower = emotion.lower()
-    profile = emotion_profiles.get(emotion_lower, emotion_profiles["happy"])
+    # Serve from the background-warmed pool when one is available
+    pool = track_pools.get(emotion)
+    if pool:
+        RECOMMENDATION_SOURCES.inc(source="pool", full_list=full_list)
+        yield "done", {"source": "pool", "songs": format_tracks(pool.select(needed_tracks), emotion, full_list)}
+        return
+    
+    # Then from the persistent catalog if it already holds enough tracks
+    # (reading extra candidates leaves the ranking room for artist variety)
+    catalog_tracks = load_catalog_tracks(emotion, needed_tracks * 4)
+    if len(catalog_tracks) >= needed_tracks:
+        RECOMMENDATION_SOURCES.inc(source="catalog", full_list=full_list)
+        yield "done", {"source": "catalog", "songs": format_tracks(rank_tracks(emotion, catalog_tracks, needed_tracks), emotion, full_list)}
+        return
+    
+    # While Spotify is unhealthy, whatever the catalog holds beats failing searches
+    if catalog_tracks and sp is not None and not sp.available():
+        RECOMMENDATION_SOURCES.inc(source="catalog", full_list=full_list)
+        yield "done", {"source": "catalog", "songs": format_tracks(rank_tracks(emotion, catalog_tracks, needed_tracks), emotion, full_list)}
+        return
     
     all_tracks = []
     
     try:
         # Phase 1: Multi-dimensional keyword search
-        search_combinations = []
-        
-        # Create diverse search combinations
-        # Genre-based searches
-        for genre in profile["genres"][:3]:
-            search_combinations.extend([
-                f"{genre} bollywood hindi",
-                f"{genre} indian music",
-                f"{genre} hindi songs"
-            ])
-        
-        # Mood-based searches
-        for mood in profile["moods"][:3]:
-            search_combinations.extend([
-                f"{mood} hindi songs",
-                f"{mood} bollywood music",
-                f"{mood} indian cinema"
-            ])
-        
-        # Style-based searches
-        for style in profile["styles"][:2]:
-            search_combinations.extend([
-                f"{style} bollywood",
-                f"{style} hindi music"
-            ])
-        
-        # Descriptor-based searches
-        for descriptor in profile["descriptors"][:2]:
-            search_combinations.append(f"{descriptor} indian music")
+        phase_started = time.perf_counter()
+        search_combinations = build_search_combinations(emotion)
         
         print(f"Searching with {len(search_combinations)} different combinations for {emotion}")
         
@@ -140,52 +304,48 @@ def get_songs_for_emotion(emotion, full_list=False):
         target_tracks = 50 if full_list else 20  # More tracks for email
         
         search_limit = 20 if full_list else 12  # More searches for email
-        for search_term in search_combinations[:search_limit]:
-            try:
-                limit_per_search = 5 if full_list else 3
-                results = sp.search(q=search_term, type='track', limit=limit_per_search, market='IN')
+        limit_per_search = 5 if full_list else 3
+        # Searches run concurrently; results are consumed in query order,
+        # or as each one finishes when streaming
+        with closing(search_many(sp, search_combinations[:search_limit], limit_per_search, ordered=not stream)) as searches:
+            for search_term, results, search_error in searches:
+                if search_error is not None:
+                    print(f"Search failed for '{search_term}': {search_error}")
+                    continue
                 
+                found = len(all_tracks)
                 for track in results['tracks']['items']:
                     if track['id'] not in used_track_ids:
-                        track_info = {
-                            'name': track['name'],
-                            'url': track['external_urls']['spotify'],
-                            'id': track['id'],
-                            'artists': [artist['name'] for artist in track['artists']],
-                            'popularity': track['popularity'],
-                            'search_term': search_term  # Track which search found this
-                        }
-                        
-                        all_tracks.append(track_info)
+                        # Remember which search found the track
+                        all_tracks.append(Track.from_spotify(track, search_term))
                         used_track_ids.add(track['id'])
+                
+                if stream and len(all_tracks) > found:
+                    yield "songs", {"query": search_term, "songs": track_rows(all_tracks[found:], full_list)}
                         
                 if len(all_tracks) >= target_tracks:  # Collect enough for variety
-                    break
-                    
-            except Exception as search_error:
-                print(f"Search failed for '{search_term}': {search_error}")
-                continue
+                    break  # Leaving the block cancels outstanding searches
+        
+        # Top up the catalog with everything this search surfaced
+        save_catalog_tracks(emotion, all_tracks)
         
-        # Phase 2: Popularity-based filtering and ranking
+        # Serve what the catalog knows if Spotify returned nothing
+        if not all_tracks and catalog_tracks:
+            all_tracks = catalog_tracks
+            used_track_ids.update(track.id for track in catalog_tracks)
+        
+        RECOMMENDATION_PHASES.observe(time.perf_counter() - phase_started, phase="search", full_list=full_list)
+        
+        # Phase 2: Rank by popularity and emotion match, spread across artists
+        phase_started = time.perf_counter()
         if all_tracks:
-            # Sort by popularity to get more well-known tracks
-            all_tracks.sort(key=lambda x: x['popularity'], reverse=True)
-            
-            # Add some variety by not taking only the most popular
-            selected_tracks = []
-            
-            # Take top popular tracks
-            selected_tracks.extend(all_tracks[:6])
-            
-            # Add some moderately popular tracks for variety
-            if len(all_tracks) > 6:
-                mid_popular = all_tracks[6:15]
-                selected_tracks.extend(mid_popular[:4])
-            
-            all_tracks = selected_tracks
+            all_tracks = rank_tracks(emotion, all_tracks, needed_tracks)
+        
+        RECOMMENDATION_PHASES.observe(time.perf_counter() - phase_started, phase="rank", full_list=full_list)
         
         # Phase 3: Fallback search if not enough matches
         if len(all_tracks) < 8:
+            phase_started = time.perf_counter()
             try:
                 fallback_queries = [
                     f"{emotion} bollywood songs",
@@ -196,55 +356,135 @@ def get_songs_for_emotion(emotion, full_list=False):
                     "hindi film songs popular"
                 ]
                 
-                for query in fallback_queries:
-                    if len(all_tracks) >= 10:
-                        break
+                with closing(search_many(sp, fallback_queries, 5, ordered=not stream, kind="fallback")) as searches:
+                    for query, results, search_error in searches:
+                        if len(all_tracks) >= 10:
+                            break
+                        if search_error is not None:
+                            print(f"Fallback search failed for '{query}': {search_error}")
+                            continue
+                        
+                        found = len(all_tracks)
+                        for track in results['tracks']['items']:
+                            if track['id'] not in used_track_ids:
+                                all_tracks.append(Track.from_spotify(track))
+                                used_track_ids.add(track['id'])
+                                
+                                if len(all_tracks) >= 10:
+                                    break
                         
-                    results = sp.search(q=query, type='track', limit=5, market='IN')
-                    for track in results['tracks']['items']:
-                        if track['id'] not in used_track_ids:
-                            track_info = {
-                                'name': track['name'],
-                                'url': track['external_urls']['spotify'],
-                                'id': track['id'],
-                                'popularity': track['popularity']
-                            }
-                            
-                            all_tracks.append(track_info)
-                            used_track_ids.add(track['id'])
-                            
-                            if len(all_tracks) >= 10:
-                                break
+                        if stream and len(all_tracks) > found:
+                            yield "songs", {"query": query, "songs": track_rows(all_tracks[found:], full_list)}
                         
             except Exception as fallback_error:
                 print(f"Fallback search failed: {fallback_error}")
+            RECOMMENDATION_PHASES.observe(time.perf_counter() - phase_started, phase="fallback", full_list=full_list)
         
-        # Format output - return track name and URL pairs
-        if full_list:
-            # Return more tracks for email (up to 50)
-            final_tracks = []
-            for track in all_tracks[:50]:
-                final_tracks.append([track['name'], track['url'], ', '.join(track['artists'])])
-            print(f"Found {len(final_tracks)} tracks for {emotion} emotion (full list)")
-            return final_tracks
-        else:
-            # Return 10 tracks for display
-            final_tracks = []
-            for track in all_tracks[:10]:
-                final_tracks.append([track['name'], track['url']])
-            print(f"Found {len(final_tracks)} tracks for {emotion} emotion")
-            return final_tracks
+        RECOMMENDATION_SOURCES.inc(source="live", full_list=full_list)
+        songs = format_tracks(all_tracks, emotion, full_list)
         
     except Exception as e:
         print(f"Spotify search error: {e}")
+        RECOMMENDATION_SOURCES.inc(source="default", full_list=full_list)
         # Return default songs if everything fails
-        return [
-            ["Tum Hi Ho", "https://open.spotify.com/track/example1"],
-            ["Kal Ho Naa Ho", "https://open.spotify.com/track/example2"],
-            ["Ae Dil Hai Mushkil", "https://open.spotify.com/track/example3"],
-            ["Raabta", "https://open.spotify.com/track/example4"],
-            ["Gerua", "https://open.spotify.com/track/example5"]
-        ]
+        yield "done", {"source": "default", "songs": [list(song) for song in DEFAULT_SONGS]}
+        return
+    
+    yield "done", {"source": "live", "songs": songs}
+
+def track_rows(tracks, full_list=False):
+    """
+    Response rows for tracks: [name, url], or [name, url, artists] for email.
+    """
+    if full_list:
+        return [track.full_row() for track in tracks]
+    return [track.display_row() for track in tracks]
+
+def format_tracks(tracks, emotion, full_list=False):
+    """
+    Format ranked tracks into the response shape: [name, url] pairs for
+    display, or [name, url, artists] triples (up to 50) for email. Rows are
+    only built here, for the tracks actually served.
+    """
+    if full_list:
+        # Return more tracks for email (up to 50)
+        final_tracks = track_rows(tracks[:50], full_list)
+        print(f"Found {len(final_tracks)} tracks for {emotion} emotion (full list)")
+        return final_tracks
+    else:
+        # Return 10 tracks for display
+        final_tracks = track_rows(tracks[:10])
+        print(f"Found {len(final_tracks)} tracks for {emotion} emotion")
+        return final_tracks
+
+def emotion_candidates(emotion, tracks):
+    """
+    Index candidate tracks for ranking against an emotion's profile.
+    """
+    profile = EMOTION_PROFILES.get(emotion.lower(), EMOTION_PROFILES["happy"])
+    return CandidateSet(tracks, keyword_weights(profile))
+
+def rank_tracks(emotion, tracks, limit):
+    """
+    Pick up to limit tracks: popular, matching the emotion and diverse in artists.
+    """
+    return emotion_candidates(emotion, tracks).select(limit)
+
+def build_track_pool(emotion):
+    """
+    Materialize the candidate pool for an emotion by running every search
+    combination of its profile, deduplicated and indexed for ranking.
+    """
+    pool = []
+    used_track_ids = set()
+    
+    with closing(search_many(sp, build_search_combinations(emotion), TRACK_POOL_SEARCH_LIMIT)) as searches:
+        for search_term, results, search_error in searches:
+            if search_error is not None:
+                print(f"Pool search failed for '{search_term}': {search_error}")
+                continue
+            
+            for track in results['tracks']['items']:
+                if track['id'] not in used_track_ids:
+                    pool.append(Track.from_spotify(track, search_term))
+                    used_track_ids.add(track['id'])
+    
+    # Merge into the catalog and rank from it, so the pool keeps tracks
+    # learned earlier and still builds while Spotify is unavailable
+    save_catalog_tracks(emotion, pool)
+    catalog_pool = load_catalog_tracks(emotion, TRACK_POOL_SIZE)
+    if catalog_pool:
+        return emotion_candidates(emotion, catalog_pool)
+    
+    pool.sort(key=lambda x: x.popularity, reverse=True)
+    return emotion_candidates(emotion, pool[:TRACK_POOL_SIZE])
+
+def load_catalog_tracks(emotion, limit):
+    """
+    Read the most popular catalog tracks for an emotion ([] if unavailable).
+    """
+    if track_catalog is None:
+        return []
+    try:
+        return track_catalog.top_tracks(emotion, limit)
+    except Exception as e:
+        print(f"Track catalog read failed: {e}")
+        return []
+
+def save_catalog_tracks(emotion, tracks):
+    """
+    Upsert tracks into the catalog, ignoring storage errors. Only the
+    model's emotions are stored.
+    """
+    if track_catalog is None or not tracks:
+        return
+    if not is_valid_emotion(emotion):
+        print(f"Track catalog write skipped for unknown emotion: {emotion!r}")
+        return
+    try:
+        track_catalog.upsert_tracks(emotion, tracks)
+    except Exception as e:
+        print(f"Track catalog write failed: {e}")
 
 def create_playlist_url(songs_list, emotion):
     """
@@ -295,184 +535,22 @@ def create_playlist_url(songs_list, emotion):
         print(f"Error creating playlist URL: {e}")
         return f"https://open.spotify.com/search/{emotion}%20music", []
 
+def build_playlist_email(user_email, emotion, songs_list):
+    """
+    Build the beautifully formatted playlist email as an EmailMessage.
+    Rendering uses precompiled templates and is cached per playlist.
+    """
+    # Create playlist URL
+    playlist_url, track_ids = create_playlist_url(songs_list, emotion)
+    return email_renderer.render_message(EMAIL_ADDRESS, user_email, emotion, songs_list, playlist_url)
+
 def send_email_playlist(user_email, emotion, songs_list):
     """
-    Send a beautifully formatted email with the full playlist.
+    Send the playlist email synchronously over a pooled SMTP connection.
     """
     try:
-        # Create playlist URL
-        playlist_url, track_ids = create_playlist_url(songs_list, emotion)
-        
-        # Create message
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = f"🎵 Your {emotion.title()} Playlist from MoodStream"
-        msg['From'] = EMAIL_ADDRESS
-        msg['To'] = user_email
-        
-        # Create HTML content
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    background-color: #000000;
-                    color: #FFFFFF;
-                    margin: 0;
-                    padding: 20px;
-                }}
-                .container {{
-                    max-width: 600px;
-                    margin: 0 auto;
-                    background-color: #121212;
-                    border-radius: 15px;
-                    padding: 30px;
-                }}
-                .header {{
-                    text-align: center;
-                    background: #1DB954;
-                    color: #000000;
-                    padding: 20px;
-                    border-radius: 10px;
-                    margin-bottom: 30px;
-                }}
-                .playlist-button {{
-                    background: #1DB954;
-                    color: #000000;
-                    padding: 20px 40px;
-                    border-radius: 25px;
-                    text-decoration: none;
-                    font-weight: bold;
-                    font-size: 1.2rem;
-                    display: inline-block;
-                    margin: 20px 0;
-                    transition: all 0.3s ease;
-                }}
-                .playlist-button:hover {{
-                    background: #1ED760;
-                    transform: translateY(-2px);
-                }}
-                .song-preview {{
-                    background: #1a1a1a;
-                    border: 1px solid #404040;
-                    border-radius: 8px;
-                    padding: 15px;
-                    margin: 10px 0;
-                    color: #FFFFFF;
-                }}
-                .footer {{
-                    text-align: center;
-                    margin-top: 30px;
-                    color: #B3B3B3;
-                    font-size: 0.9rem;
-                }}
-                .spotify-link {{
-                    color: #1DB954;
-                    text-decoration: none;
-                    font-weight: 500;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🎵 MoodStream</h1>
-                    <h2>Your {emotion.title()} Playlist</h2>
-                    <p>Generated on {datetime.now().strftime("%B %d, %Y at %I:%M %p")}</p>
-                </div>
-                
-                <p>Hello! 👋</p>
-                <p>Based on your <strong>{emotion}</strong> mood, we've curated a special collection with <strong>{len(songs_list)}</strong> handpicked songs to match your vibe!</p>
-                
-                <div style="text-align: center; margin: 30px 0;">
-                    <a href="{playlist_url}" class="playlist-button" target="_blank">
-                        🎧 Discover Similar Music on Spotify
-                    </a>
-                </div>
-                
-                <p style="text-align: center; color: #B3B3B3;">
-                    This link will take you to Spotify where you can explore music similar to your curated selection!
-                </p>
-                
-                <h3 style="color: #1DB954; margin-top: 30px;">Preview of Your Songs:</h3>
-                <div class="song-previews">"""
-        
-        # Add first 5 songs as preview
-        for i, song in enumerate(songs_list[:5], 1):
-            song_name = song[0]
-            artist_name = song[2] if len(song) > 2 else "Various Artists"
-            
-            html_content += f"""
-                    <div class="song-preview">
-                        <strong>{i}. {song_name}</strong><br>
-                        <span style="color: #B3B3B3;">by {artist_name}</span>
-                    </div>
-            """
-        
-        if len(songs_list) > 5:
-            html_content += f"""
-                    <div class="song-preview" style="text-align: center; font-style: italic; color: #B3B3B3;">
-                        + {len(songs_list) - 5} more amazing songs waiting for you!
-                    </div>
-            """
-        
-        html_content += """
-                </div>
-                
-                <div class="footer">
-                    <p>🎧 Click the Spotify button to discover more music like your curated selection!</p>
-                    <p>The songs below are your personalized recommendations - use them to search on Spotify for similar tracks! 🌟</p>
-                    <p><em>- Team MoodStream</em></p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        # Create plain text version
-        text_content = f"""
-        MoodStream - Your {emotion.title()} Playlist
-        Generated on {datetime.now().strftime("%B %d, %Y at %I:%M %p")}
-        
-        Hello!
-        
-        Based on your {emotion} mood, we've curated a special collection with {len(songs_list)} handpicked songs to match your vibe!
-        
-        🎧 Discover Similar Music: {playlist_url}
-        
-        Your Curated Song Recommendations:
-        """
-        
-        for i, song in enumerate(songs_list[:5], 1):
-            song_name = song[0]
-            artist_name = song[2] if len(song) > 2 else "Various Artists"
-            text_content += f"{i}. {song_name} by {artist_name}\n"
-        
-        if len(songs_list) > 5:
-            text_content += f"+ {len(songs_list) - 5} more amazing songs!\n"
-        
-        text_content += f"""
-        
-        Click the Spotify link above to discover more music like your curated selection!
-        Use these song recommendations to search for similar tracks on Spotify!
-        
-        - Team MoodStream
-        """
-        
-        # Attach both versions
-        text_part = MIMEText(text_content, 'plain')
-        html_part = MIMEText(html_content, 'html')
-        
-        msg.attach(text_part)
-        msg.attach(html_part)
-        
-        # Send email
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            server.starttls()
-            server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-            text = msg.as_string()
-            server.sendmail(EMAIL_ADDRESS, user_email, text)
+        msg = build_playlist_email(user_email, emotion, songs_list)
+        smtp_pool.sendmail(EMAIL_ADDRESS, user_email, msg.as_bytes())
         
         print(f"Email sent successfully to {user_email}")
         return True
@@ -483,28 +561,59 @@ def send_email_playlist(user_email, emotion, songs_list):
 
 # @app.route('/detect-emotion-and-recommend', methods=['GET'])
 @app.route('/', methods=['GET'])
-@app.route('/detect-emotion-and-recommend', methods=['GET','POST'])
+@app.route('/detect-emotion-and-recommend', methods=['GET'])
 def detect_and_recommend():
     """
-    Auto-detect emotion using camera and recommend songs.
+    Serve the page; emotions are detected from frames the browser uploads.
     """
-    if request.method == 'POST':
-        try:
-            detected_emotion_index = detect_emotion()
-            emotion = emotion_dict[detected_emotion_index]
-            
-            if not emotion:
+    return render_template('index.html')
+
+@app.route('/detect-emotion-from-frames', methods=['POST'])
+def detect_from_frames():
+    """
+    Detect emotion from camera frames captured in the browser and recommend songs.
+    Accepts multipart 'frames' files (JPEG/PNG) or JSON {"frames": [data URLs]}.
+    With mode=group, every face in the frame is classified in one batch and
+    songs are recommended for the aggregated group emotion.
+    """
+    try:
+        if request.files:
+            frames = [upload.read() for upload in request.files.getlist('frames')[:MAX_UPLOAD_FRAMES]]
+            mode = request.form.get('mode', 'single')
+        else:
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                data = {}
+            frames = data.get('frames') or ([data['frame']] if 'frame' in data else [])
+            if not isinstance(frames, list):
+                return jsonify({"error": "frames must be a list of images"}), 400
+            frames = frames[:MAX_UPLOAD_FRAMES]
+            mode = data.get('mode', 'single')
+
+        if not frames:
+            return jsonify({"error": "No frames provided"}), 400
+
+        if mode == 'group':
+            group = detect_group_emotions(frames)
+            if group is None:
                 return jsonify({"error": "No face detected. Please try again."}), 400
 
-            songs = get_songs_for_emotion(emotion)
-            print(f"Auto-detected emotion: {emotion}, found {len(songs)} songs")
-            return jsonify({"emotion": emotion, "songs": songs})
-            
-        except Exception as e:
-            print(f"Error in emotion detection: {e}")
-            return jsonify({"error": "Failed to detect emotion. Please try again."}), 500
-            
-    return render_template('index.html')
+            songs, snapshot_id = recommend_with_snapshot(group["emotion"])
+            print(f"Group emotion from {len(group['faces'])} faces: {group['emotion']}, found {len(songs)} songs")
+            return jsonify({"emotion": group["emotion"], "songs": songs, "snapshot_id": snapshot_id, "group": group})
+
+        detection = detect_emotion_in_frames(frames)
+        emotion = detection["emotion"]
+        if not emotion:
+            return jsonify({"error": "No face detected. Please try again."}), 400
+
+        songs, snapshot_id = recommend_with_snapshot(emotion)
+        print(f"Detected emotion from {detection['frames_used']}/{len(frames)} uploaded frames: {emotion}, found {len(songs)} songs")
+        return jsonify({"emotion": emotion, "songs": songs, "snapshot_id": snapshot_id, "detection": detection})
+
+    except Exception as e:
+        print(f"Error in frame emotion detection: {e}")
+        return jsonify({"error": "Failed to detect emotion. Please try again."}), 500
 
 @app.route('/select-emotion-and-recommend', methods=['POST'])
 def select_and_recommend():
@@ -524,14 +633,54 @@ def select_and_recommend():
         if selected_emotion not in valid_emotions:
             return jsonify({"error": "Invalid emotion selected"}), 400
         
-        songs = get_songs_for_emotion(selected_emotion)
+        songs, snapshot_id = recommend_with_snapshot(selected_emotion)
         print(f"Manual selection: {selected_emotion}, found {len(songs)} songs")
-        return jsonify({"emotion": selected_emotion, "songs": songs})
+        return jsonify({"emotion": selected_emotion, "songs": songs, "snapshot_id": snapshot_id})
         
     except Exception as e:
         print(f"Error in manual emotion selection: {e}")
         return jsonify({"error": "Failed to get recommendations. Please try again."}), 500
 
+@app.route('/select-emotion-and-recommend/stream', methods=['POST'])
+def select_and_recommend_stream():
+    """
+    Stream recommendations for a manually selected emotion as NDJSON: a
+    "songs" line for each search's new tracks as it completes, then one
+    "done" line with the final ranked list and its snapshot id.
+    """
+    data = request.get_json(silent=True)
+    
+    if not data or 'emotion' not in data:
+        return jsonify({"error": "No emotion provided"}), 400
+        
+    selected_emotion = data['emotion']
+    
+    # Validate the emotion
+    valid_emotions = list(emotion_dict.values())
+    if selected_emotion not in valid_emotions:
+        return jsonify({"error": "Invalid emotion selected"}), 400
+    
+    started = g.get('request_started', time.perf_counter())
+    g.stream_metrics = True
+    
+    def generate():
+        try:
+            for event, payload in shared_recommendation_events(selected_emotion, full_list=True, stream=True):
+                if event == "done":
+                    snapshot_id = playlist_snapshots.put(selected_emotion, payload["songs"])
+                    payload = dict(payload, emotion=selected_emotion, snapshot_id=snapshot_id)
+                    print(f"Manual selection (streamed): {selected_emotion}, found {len(payload['songs'])} songs")
+                payload = dict(payload, songs=display_songs(payload["songs"]))
+                yield json.dumps(dict(payload, type=event)) + "\n"
+        except Exception as e:
+            print(f"Error in streamed emotion selection: {e}")
+            yield json.dumps({"type": "error", "error": "Failed to get recommendations. Please try again."}) + "\n"
+        finally:
+            observe_request_latency(started, 200)
+    
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.route('/send-email-playlist', methods=['POST'])
 def send_email_playlist_route():
     """
@@ -545,32 +694,200 @@ def send_email_playlist_route():
             
         user_email = data['email']
         emotion = data['emotion']
+        snapshot_id = data.get('snapshot_id')
         
         # Validate email format (basic check)
         if '@' not in user_email or '.' not in user_email:
             return jsonify({"error": "Please enter a valid email address"}), 400
         
-        # Get full playlist (50+ songs)
-        full_playlist = get_songs_for_emotion(emotion, full_list=True)
+        # Validate the emotion
+        if emotion not in emotion_dict.values():
+            return jsonify({"error": "Invalid emotion selected"}), 400
+        
+        # Reuse the playlist the recommendation computed, if it is still held
+        snapshot = playlist_snapshots.get(snapshot_id) if snapshot_id else None
+        if snapshot is not None and snapshot[0] == emotion:
+            full_playlist = snapshot[1]
+        else:
+            # Get full playlist (50+ songs)
+            full_playlist = get_songs_for_emotion(emotion, full_list=True)
         
         if not full_playlist:
             return jsonify({"error": "Could not generate playlist. Please try again."}), 500
         
-        # Send email
-        email_sent = send_email_playlist(user_email, emotion, full_playlist)
-        
-        if email_sent:
-            return jsonify({
-                "success": True, 
-                "message": f"Playlist with {len(full_playlist)} songs sent to {user_email}!"
-            })
-        else:
-            return jsonify({"error": "Failed to send email. Please try again."}), 500
+        # Queue the email; delivery and retries happen in the background
+        job_id = email_queue.enqueue(
+            user_email,
+            lambda: build_playlist_email(user_email, emotion, full_playlist),
+            emotion=emotion,
+            songs=len(full_playlist)
+        )
+        
+        return jsonify({
+            "success": True,
+            "job_id": job_id,
+            "status_url": f"/email-status/{job_id}",
+            "message": f"Playlist with {len(full_playlist)} songs is on its way to {user_email}!"
+        }), 202
             
     except Exception as e:
         print(f"Error in email playlist: {e}")
         return jsonify({"error": "Failed to send email. Please try again."}), 500
 
+@app.route('/playlist/<snapshot_id>/songs', methods=['GET'])
+def playlist_songs(snapshot_id):
+    """
+    Page through a recommendation's full playlist ("more songs").
+    Query parameters: offset (default 10, past the display list) and limit.
+    """
+    try:
+        offset = max(0, int(request.args.get('offset', DISPLAY_SONGS)))
+        limit = min(50, max(1, int(request.args.get('limit', DISPLAY_SONGS))))
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+
+    page = playlist_snapshots.page(snapshot_id, offset, limit)
+    if page is None:
+        return jsonify({"error": "This playlist has expired. Please get new recommendations."}), 404
+
+    emotion, songs, total = page
+    next_offset = offset + len(songs)
+    return jsonify({
+        "snapshot_id": snapshot_id,
+        "emotion": emotion,
+        "songs": [song[:2] for song in songs],
+        "offset": offset,
+        "total": total,
+        "next_offset": next_offset if next_offset < total else None
+    })
+
+@app.route('/email-status/<job_id>', methods=['GET'])
+def email_status(job_id):
+    """
+    Report the delivery status of a queued playlist email.
+    """
+    job = email_queue.status(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown email job"}), 404
+    return jsonify(job)
+
+# Pools are built from every emotion profile and refreshed in the background;
+# with a snapshot file one worker builds them and all workers map the result
+# (set POOL_SNAPSHOT_PATH= to have every worker build its own)
+pool_snapshot = PoolSnapshotFile() if TRACK_POOLS_ENABLED and POOL_SNAPSHOT_PATH else None
+track_pools = TrackPools(build_track_pool, emotion_dict.values(), snapshot=pool_snapshot)
+# Map the current snapshot, or seed pools from the catalog, so a restarted
+# worker serves from memory at once (with TRACK_POOLS=0 pools stay empty)
+if TRACK_POOLS_ENABLED and not track_pools.sync():
+    track_pools.seed({emotion: emotion_candidates(emotion, load_catalog_tracks(emotion, TRACK_POOL_SIZE))
+                      for emotion in emotion_dict.values()})
+if TRACK_POOLS_ENABLED and sp is not None:
+    track_pools.start()
+if track_catalog is not None:
+    track_catalog.start_compactor()
+
+@app.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    """
+    Report search cache hit/miss counters, pool state, coalesced requests,
+    the rendered email cache, playlist snapshots, the Spotify rate limiter
+    and the shared Spotify token. Counters are this worker's, named by "worker";
+    /metrics aggregates them across workers.
+    """
+    return jsonify({
+        "worker": os.getpid(),
+        **search_cache.stats(),
+        "track_pools": track_pools.stats(),
+        "single_flight": recommendation_flight.stats(),
+        "spotify_limiter": sp.stats() if sp is not None else None,
+        "spotify_token": auth_manager.stats() if auth_manager is not None else None,
+        "email_render_cache": email_renderer.stats(),
+        "playlist_snapshots": playlist_snapshots.stats()
+    })
+
+@metrics_registry.collector
+def collect_component_metrics():
+    """
+    Expose the counters components already keep, read at scrape time.
+    """
+    cache = search_cache.stats()
+    yield ("moodstream_search_cache_lookups_total", "counter", "Search cache lookups by result",
+           [({"result": result}, cache[key]) for result, key in (("hit", "hits"), ("stale", "stale_hits"), ("miss", "misses"))])
+    yield ("moodstream_search_cache_entries", "gauge", "Search cache entries", [({}, cache["size"])])
+    yield ("moodstream_search_cache_evictions_total", "counter", "Search cache evictions", [({}, cache["evictions"])])
+
+    render_cache = email_renderer.stats()
+    yield ("moodstream_email_render_cache_lookups_total", "counter", "Rendered email cache lookups by result",
+           [({"result": "hit"}, render_cache["hits"]), ({"result": "miss"}, render_cache["misses"])])
+
+    snapshots = playlist_snapshots.stats()
+    yield ("moodstream_playlist_snapshot_lookups_total", "counter", "Playlist snapshot lookups by result",
+           [({"result": "hit"}, snapshots["hits"]), ({"result": "miss"}, snapshots["misses"])])
+    yield ("moodstream_playlist_snapshots", "gauge", "Playlist snapshots held", [({}, snapshots["size"])])
+    yield ("moodstream_playlist_snapshot_songs", "gauge", "Songs held across playlist snapshots", [({}, snapshots["songs"])])
+    yield ("moodstream_playlist_snapshot_evictions_total", "counter", "Playlist snapshots evicted by the memory bound",
+           [({}, snapshots["evictions"])])
+
+    flight = recommendation_flight.stats()
+    yield ("moodstream_recommendation_calls_total", "counter", "Recommendation calls executed or coalesced onto one in flight",
+           [({"result": "executed"}, flight["executions"]), ({"result": "coalesced"}, flight["coalesced"])])
+
+    pools = track_pools.stats()
+    yield ("moodstream_track_pool_size", "gauge", "Tracks in each emotion pool",
+           [({"emotion": emotion}, size) for emotion, size in pools["pools"].items()])
+    yield ("moodstream_track_pool_builds_total", "counter", "Track pool builds", [({}, pools["builds"])])
+    if pools["snapshot"] is not None:
+        snapshot = pools["snapshot"]
+        yield ("moodstream_track_pool_snapshot_refresher", "gauge", "1 if this worker builds the shared pool snapshot",
+               [({}, snapshot["role"] == "refresher")])
+        yield ("moodstream_track_pool_snapshot_bytes", "gauge", "Size of the mapped pool snapshot", [({}, snapshot["mapped_bytes"])])
+        yield ("moodstream_track_pool_snapshot_loads_total", "counter", "Pool snapshots mapped by this worker", [({}, snapshot["loads"])])
+
+    if sp is not None:
+        limiter = sp.stats()
+        yield ("moodstream_spotify_concurrency_limit", "gauge", "Adaptive Spotify concurrency limit", [({}, limiter["concurrency_limit"])])
+        yield ("moodstream_spotify_in_flight", "gauge", "Spotify calls in flight", [({}, limiter["in_flight"])])
+        yield ("moodstream_spotify_throttled_total", "counter", "429 responses from Spotify", [({}, limiter["throttled"])])
+        yield ("moodstream_spotify_rejected_total", "counter", "Calls refused locally (breaker open or no capacity)", [({}, limiter["rejected"])])
+        yield ("moodstream_spotify_breaker_open", "gauge", "1 while the Spotify circuit breaker is open", [({}, limiter["breaker_state"] == "open")])
+        yield ("moodstream_spotify_breaker_opens_total", "counter", "Times the Spotify circuit breaker opened", [({}, limiter["breaker_opens"])])
+    if auth_manager is not None:
+        yield ("moodstream_spotify_token_fetches_total", "counter", "Access tokens this worker requested from Spotify",
+               [({}, auth_manager.stats()["token_fetches"])])
+
+    queue = email_queue.stats()
+    yield ("moodstream_email_queue_depth", "gauge", "Emails waiting for a worker", [({}, queue["queued"])])
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    """
+    Prometheus metrics, aggregated across workers when METRICS_DIR is set.
+    """
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/startup-report', methods=['GET'])
+def startup_report_route():
+    """
+    Report boot time and emotion model load timings.
+    """
+    return jsonify({"app_boot_seconds": APP_BOOT_SECONDS, "emotion_detector": startup_report})
+
+@app.route('/inference-stats', methods=['GET'])
+def inference_stats():
+    """
+    Report emotion micro-batching throughput, per-request latency, face
+    pipeline stage timings and the model server client for this worker.
+    """
+    return jsonify({
+        "worker": os.getpid(),
+        **emotion_batcher.stats(),
+        "pipeline_stages": pipeline_timer.report(),
+        "model_server": model_client.stats() if model_client is not None else None
+    })
+
+APP_BOOT_SECONDS = round(time.perf_counter() - BOOT_STARTED, 4)
+print(f"MoodStream booted in {APP_BOOT_SECONDS}s (emotion model loaded: {startup_report['model_loaded']})")
+
 if __name__ == '__main__':
     # Get port from environment variable (Render assigns this dynamically)
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,161 @@
+"""
+Micro-batching of emotion model inference across concurrent requests.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import numpy as np
+
+from metrics import registry
+
+EMOTION_BATCH_SIZE = int(os.getenv("EMOTION_BATCH_SIZE", 32))
+EMOTION_BATCH_WAIT_MS = float(os.getenv("EMOTION_BATCH_WAIT_MS", 5))
+EMOTION_BATCH_TIMEOUT = float(os.getenv("EMOTION_BATCH_TIMEOUT", 60))  # seconds a caller waits, model load included
+
+BATCH_SIZE = registry.histogram(
+    "moodstream_emotion_batch_size", "Crops per micro-batched forward pass", buckets=(1, 2, 4, 8, 16, 32, 64))
+BATCH_LATENCY = registry.histogram(
+    "moodstream_emotion_batch_seconds", "Micro-batched forward pass latency",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+
+
+class MicroBatcher:
+    """
+    Background thread that groups queued crops into batched predict calls.
+    """
+
+    def __init__(self, get_model, max_batch_size=EMOTION_BATCH_SIZE, max_wait_ms=EMOTION_BATCH_WAIT_MS):
+        self.get_model = get_model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending = deque()
+        self._changed = threading.Condition()
+        self._submitters = 0
+        self._local = threading.local()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._latencies_ms = deque(maxlen=1000)  # recent per-request latencies
+        self._started_at = time.monotonic()
+        self.requests = 0
+        self.batches = 0
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="emotion-microbatcher", daemon=True)
+                    self._thread.start()
+
+    def submit(self, crop):
+        """
+        Queue one (48, 48, 1) or (1, 48, 48, 1) crop; the returned future
+        resolves to its probability vector.
+        """
+        self._ensure_started()
+        future = Future()
+        with self._changed:
+            self._pending.append((np.asarray(crop).reshape(48, 48, 1), future, time.perf_counter()))
+            self._changed.notify_all()
+        return future
+
+    @contextmanager
+    def submitting(self):
+        """
+        Mark the calling thread as submitting crops (e.g. for the frames of
+        one request) so batches wait for its next crop; nested blocks count once.
+        """
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        if depth == 0:
+            with self._changed:
+                self._submitters += 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                with self._changed:
+                    self._submitters -= 1
+                    self._changed.notify_all()
+
+    def predict_proba(self, crop, timeout=EMOTION_BATCH_TIMEOUT):
+        with self.submitting():
+            return self.submit(crop).result(timeout)
+
+    def predict(self, crop, timeout=EMOTION_BATCH_TIMEOUT):
+        """
+        Return the argmax emotion index for one crop.
+        """
+        return int(np.argmax(self.predict_proba(crop, timeout)))
+
+    def _collect(self):
+        with self._changed:
+            while not self._pending:
+                self._changed.wait()
+            # Only wait while another submitter may still add a crop; a lone
+            # caller (a sync worker, say) is flushed at once
+            deadline = time.perf_counter() + self.max_wait
+            while len(self._pending) < min(self.max_batch_size, self._submitters):
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+            return [self._pending.popleft() for _ in range(min(self.max_batch_size, len(self._pending)))]
+
+    def _run(self):
+        while True:
+            batch = []
+            try:
+                batch = self._collect()
+                self._predict_batch(batch)
+            except Exception as e:
+                # Whatever failed (stacking, the model, a short result), fail
+                # this batch's callers and keep serving the next one
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _predict_batch(self, batch):
+        crops = np.stack([crop for crop, _, _ in batch])
+        started = time.perf_counter()
+        predictions = self.get_model().predict(crops, verbose=0)
+        if len(predictions) != len(batch):
+            raise ValueError(f"model returned {len(predictions)} predictions for {len(batch)} crops")
+
+        finished = time.perf_counter()
+        BATCH_SIZE.observe(len(batch))
+        BATCH_LATENCY.observe(finished - started)
+        for (_, future, queued_at), prediction in zip(batch, predictions):
+            future.set_result(prediction)
+        with self._stats_lock:
+            self.requests += len(batch)
+            self.batches += 1
+            self._latencies_ms.extend((finished - queued_at) * 1000 for _, _, queued_at in batch)
+
+    def stats(self):
+        """
+        Report batch sizes, throughput and recent per-request latency.
+        """
+        with self._stats_lock:
+            latencies = sorted(self._latencies_ms)
+            elapsed = time.monotonic() - self._started_at
+
+            def pct(p):
+                return round(latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))], 3) if latencies else None
+
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "requests": self.requests,
+                "batches": self.batches,
+                "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "throughput_per_second": round(self.requests / elapsed, 2) if elapsed else 0.0,
+                "latency_ms": {"p50": pct(50), "p95": pct(95), "p99": pct(99)},
+                "queued": len(self._pending),
+                "submitters": self._submitters
+            }
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+MoodStream Micro-batching Benchmark
+
+Fires single-crop emotion predictions from concurrent clients, once with
+direct per-request predict calls and once per micro-batcher configuration,
+and reports throughput and per-request latency so EMOTION_BATCH_SIZE and
+EMOTION_BATCH_WAIT_MS can be tuned.
+
+Usage:
+    python benchmarks/batching_benchmark.py
+    python benchmarks/batching_benchmark.py --clients 1 8 32 --batch-sizes 8 32 --waits 2 5 10
+    EMOTION_BACKEND=numpy python benchmarks/batching_benchmark.py
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+
+from batch_inference import MicroBatcher
+from inference_benchmark import percentile, sample_crops
+
+
+def run_clients(predict, crops, clients, requests_per_client):
+    """
+    Run predict(crop) from concurrent client threads; return throughput and latencies.
+    """
+    latencies = [[] for _ in range(clients)]
+    barrier = threading.Barrier(clients + 1)
+
+    def client(index):
+        barrier.wait()
+        for i in range(requests_per_client):
+            crop = crops[(index + i) % len(crops)][None]
+            started = time.perf_counter()
+            predict(crop)
+            latencies[index].append((time.perf_counter() - started) * 1000)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    flat = [latency for client_latencies in latencies for latency in client_latencies]
+    return {
+        "throughput_per_second": round(len(flat) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(flat, 50), 3),
+            "p95": round(percentile(flat, 95), 3),
+            "p99": round(percentile(flat, 99), 3)
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark emotion micro-batching")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--waits", type=float, nargs="+", default=[2, 5, 10], help="max wait in ms")
+    parser.add_argument("--requests", type=int, default=50, help="requests per client")
+    parser.add_argument("--images", help="directory of face images to use as inputs")
+    args = parser.parse_args()
+
+    # Keep stdout machine-readable: model loading logs go to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        import emotion_detector
+        model = emotion_detector.get_emotion_model()
+    crops = sample_crops(64, args.images)
+    model.predict(crops[:1], verbose=0)  # warm-up
+
+    results = []
+    for clients in args.clients:
+        direct = run_clients(lambda crop: int(np.argmax(model.predict(crop, verbose=0))),
+                             crops, clients, args.requests)
+        results.append({"clients": clients, "mode": "direct", **direct})
+
+        for batch_size in args.batch_sizes:
+            for wait in args.waits:
+                batcher = MicroBatcher(lambda: model, max_batch_size=batch_size, max_wait_ms=wait)
+                batched = run_clients(batcher.predict, crops, clients, args.requests)
+                results.append({
+                    "clients": clients,
+                    "mode": "microbatch",
+                    "max_batch_size": batch_size,
+                    "max_wait_ms": wait,
+                    "avg_batch_size": batcher.stats()["avg_batch_size"],
+                    **batched
+                })
+
+    print(json.dumps({
+        "benchmark": "microbatching",
+        "backend": emotion_detector.EMOTION_BACKEND,
+        "results": results
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+MoodStream Email Rendering Benchmark
+
+Measures playlist emails rendered and serialized per second with the original
+f-string concatenation and with the precompiled template renderer, both
+with a fresh playlist per message (cache misses) and with every recipient
+getting the same playlist (cache hits). Reports JSON.
+
+Usage:
+    python benchmarks/email_render_benchmark.py
+    python benchmarks/email_render_benchmark.py --messages 5000 --songs 50
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from email_rendering import PlaylistEmailRenderer
+
+SENDER = "moodstream@example.com"
+PLAYLIST_URL = "https://open.spotify.com/search/happy%20pop%20dance"
+
+
+def legacy_build_message(sender, recipient, emotion, songs_list, playlist_url):
+    """
+    The original per-call f-string concatenation from app.send_email_playlist.
+    """
+    # Create message
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = f"🎵 Your {emotion.title()} Playlist from MoodStream"
+    msg['From'] = sender
+    msg['To'] = recipient
+
+    # Create HTML content
+    html_content = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <style>
+            body {{
+                font-family: Arial, sans-serif;
+                background-color: #000000;
+                color: #FFFFFF;
+                margin: 0;
+                padding: 20px;
+            }}
+            .container {{
+                max-width: 600px;
+                margin: 0 auto;
+                background-color: #121212;
+                border-radius: 15px;
+                padding: 30px;
+            }}
+            .header {{
+                text-align: center;
+                background: #1DB954;
+                color: #000000;
+                padding: 20px;
+                border-radius: 10px;
+                margin-bottom: 30px;
+            }}
+            .playlist-button {{
+                background: #1DB954;
+                color: #000000;
+                padding: 20px 40px;
+                border-radius: 25px;
+                text-decoration: none;
+                font-weight: bold;
+                font-size: 1.2rem;
+                display: inline-block;
+                margin: 20px 0;
+                transition: all 0.3s ease;
+            }}
+            .playlist-button:hover {{
+                background: #1ED760;
+                transform: translateY(-2px);
+            }}
+            .song-preview {{
+                background: #1a1a1a;
+                border: 1px solid #404040;
+                border-radius: 8px;
+                padding: 15px;
+                margin: 10px 0;
+                color: #FFFFFF;
+            }}
+            .footer {{
+                text-align: center;
+                margin-top: 30px;
+                color: #B3B3B3;
+                font-size: 0.9rem;
+            }}
+            .spotify-link {{
+                color: #1DB954;
+                text-decoration: none;
+                font-weight: 500;
+            }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h1>🎵 MoodStream</h1>
+                <h2>Your {emotion.title()} Playlist</h2>
+                <p>Generated on {datetime.now().strftime("%B %d, %Y at %I:%M %p")}</p>
+            </div>
+
+            <p>Hello! 👋</p>
+            <p>Based on your <strong>{emotion}</strong> mood, we've curated a special collection with <strong>{len(songs_list)}</strong> handpicked songs to match your vibe!</p>
+
+            <div style="text-align: center; margin: 30px 0;">
+                <a href="{playlist_url}" class="playlist-button" target="_blank">
+                    🎧 Discover Similar Music on Spotify
+                </a>
+            </div>
+
+            <p style="text-align: center; color: #B3B3B3;">
+                This link will take you to Spotify where you can explore music similar to your curated selection!
+            </p>
+
+            <h3 style="color: #1DB954; margin-top: 30px;">Preview of Your Songs:</h3>
+            <div class="song-previews">"""
+
+    # Add first 5 songs as preview
+    for i, song in enumerate(songs_list[:5], 1):
+        song_name = song[0]
+        artist_name = song[2] if len(song) > 2 else "Various Artists"
+
+        html_content += f"""
+                <div class="song-preview">
+                    <strong>{i}. {song_name}</strong><br>
+                    <span style="color: #B3B3B3;">by {artist_name}</span>
+                </div>
+        """
+
+    if len(songs_list) > 5:
+        html_content += f"""
+                <div class="song-preview" style="text-align: center; font-style: italic; color: #B3B3B3;">
+                    + {len(songs_list) - 5} more amazing songs waiting for you!
+                </div>
+        """
+
+    html_content += """
+            </div>
+
+            <div class="footer">
+                <p>🎧 Click the Spotify button to discover more music like your curated selection!</p>
+                <p>The songs below are your personalized recommendations - use them to search on Spotify for similar tracks! 🌟</p>
+                <p><em>- Team MoodStream</em></p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+
+    # Create plain text version
+    text_content = f"""
+    MoodStream - Your {emotion.title()} Playlist
+    Generated on {datetime.now().strftime("%B %d, %Y at %I:%M %p")}
+
+    Hello!
+
+    Based on your {emotion} mood, we've curated a special collection with {len(songs_list)} handpicked songs to match your vibe!
+
+    🎧 Discover Similar Music: {playlist_url}
+
+    Your Curated Song Recommendations:
+    """
+
+    for i, song in enumerate(songs_list[:5], 1):
+        song_name = song[0]
+        artist_name = song[2] if len(song) > 2 else "Various Artists"
+        text_content += f"{i}. {song_name} by {artist_name}\n"
+
+    if len(songs_list) > 5:
+        text_content += f"+ {len(songs_list) - 5} more amazing songs!\n"
+
+    text_content += f"""
+
+    Click the Spotify link above to discover more music like your curated selection!
+    Use these song recommendations to search for similar tracks on Spotify!
+
+    - Team MoodStream
+    """
+
+    # Attach both versions
+    text_part = MIMEText(text_content, 'plain')
+    html_part = MIMEText(html_content, 'html')
+
+    msg.attach(text_part)
+    msg.attach(html_part)
+
+    return msg
+
+
+def make_playlist(seed, songs):
+    return [
+        [f"Song {seed}-{i} & Friends", f"https://open.spotify.com/track/{seed:06d}{i:04d}", f"Artist {i % 7}, Guest {seed}"]
+        for i in range(songs)
+    ]
+
+
+def legacy_render_message(sender, recipient, emotion, songs_list, playlist_url):
+    return legacy_build_message(sender, recipient, emotion, songs_list, playlist_url).as_string()
+
+
+def measure(render, playlists, messages):
+    """
+    Render serialized messages, cycling through playlists; return messages per second.
+    """
+    started = time.perf_counter()
+    for i in range(messages):
+        render(SENDER, f"user{i}@example.com", "Happy", playlists[i % len(playlists)], PLAYLIST_URL)
+    elapsed = time.perf_counter() - started
+    return round(messages / elapsed, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark playlist email rendering")
+    parser.add_argument("--messages", type=int, default=2000, help="messages per scenario")
+    parser.add_argument("--songs", type=int, default=50, help="songs per playlist")
+    args = parser.parse_args()
+
+    unique = [make_playlist(seed, args.songs) for seed in range(args.messages)]
+    shared = unique[:1]
+
+    legacy = measure(legacy_render_message, unique, args.messages)
+    renderer = PlaylistEmailRenderer(cache_size=args.messages)
+    templates_cold = measure(lambda *message: renderer.render_message(*message).as_bytes(), unique, args.messages)
+    renderer = PlaylistEmailRenderer()
+    templates_cached = measure(lambda *message: renderer.render_message(*message).as_bytes(), shared, args.messages)
+
+    print(json.dumps({
+        "benchmark": "email_rendering",
+        "messages": args.messages,
+        "songs_per_playlist": args.songs,
+        "messages_per_second": {
+            "legacy": legacy,
+            "templates_unique_playlists": templates_cold,
+            "templates_shared_playlist": templates_cached
+        },
+        "speedup_unique": round(templates_cold / legacy, 2),
+        "speedup_shared": round(templates_cached / legacy, 2),
+        "cache": renderer.stats()
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+MoodStream Face Detection Benchmark
+
+Replays recorded video (or a directory of frames) through the original
+per-frame detection loop (new CascadeClassifier per frame, upscale to
+1280x720, full-frame detectMultiScale) and through the face_detection
+pipeline (per-thread cascade, downscaled detection, ROI tracking), and
+reports frames per second and per-stage timings as JSON.
+
+Usage:
+    python benchmarks/face_detection_benchmark.py --video recording.mp4
+    python benchmarks/face_detection_benchmark.py --images frames/ --min-face-size 120
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cv2
+
+from face_detection import CASCADE_PATH, FaceTracker, StageTimer
+
+
+def load_frames(video=None, image_dir=None, limit=300):
+    frames = []
+    if video:
+        cap = cv2.VideoCapture(video)
+        while len(frames) < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    elif image_dir:
+        for name in sorted(os.listdir(image_dir))[:limit]:
+            frame = cv2.imread(os.path.join(image_dir, name), cv2.IMREAD_COLOR)
+            if frame is not None:
+                frames.append(frame)
+    return frames
+
+
+def run_legacy(frames):
+    timer = StageTimer()
+    hits = 0
+    started = time.perf_counter()
+    for frame in frames:
+        with timer.stage("resize_1280x720"):
+            frame = cv2.resize(frame, (1280, 720))
+        with timer.stage("load_cascade"):
+            face_detector = cv2.CascadeClassifier(CASCADE_PATH)
+        with timer.stage("grayscale"):
+            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        with timer.stage("detect_full"):
+            faces = face_detector.detectMultiScale(gray_frame, scaleFactor=1.3, minNeighbors=5)
+        hits += len(faces) > 0
+    elapsed = time.perf_counter() - started
+    return {"fps": round(len(frames) / elapsed, 1), "frames_with_face": hits, "stages": timer.report()}
+
+
+def run_pipeline(frames, min_face_size):
+    timer = StageTimer()
+    tracker = FaceTracker(min_face_size=min_face_size, timer=timer)
+    hits = 0
+    started = time.perf_counter()
+    for frame in frames:
+        with timer.stage("grayscale"):
+            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        faces = tracker.detect(gray_frame)
+        hits += len(faces) > 0
+    elapsed = time.perf_counter() - started
+    return {
+        "fps": round(len(frames) / elapsed, 1),
+        "frames_with_face": hits,
+        "full_detections": tracker.full_detections,
+        "roi_detections": tracker.roi_detections,
+        "stages": timer.report()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MoodStream face detection")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--video", help="recorded video file")
+    source.add_argument("--images", help="directory of frames")
+    parser.add_argument("--limit", type=int, default=300, help="maximum frames to replay")
+    parser.add_argument("--min-face-size", type=int, default=80, help="smallest face to detect, in pixels")
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.images, args.limit)
+    if not frames:
+        print("No frames could be read", file=sys.stderr)
+        return 1
+
+    legacy = run_legacy(frames)
+    pipeline = run_pipeline(frames, args.min_face_size)
+    print(json.dumps({
+        "benchmark": "face_detection",
+        "frames": len(frames),
+        "frame_size": list(frames[0].shape[:2]),
+        "legacy": legacy,
+        "pipeline": pipeline,
+        "speedup": round(pipeline["fps"] / legacy["fps"], 2)
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
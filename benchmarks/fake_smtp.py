@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+MoodStream Fake SMTP Server
+
+A minimal local SMTP server for email benchmarks: accepts EHLO/HELO,
+AUTH, MAIL, RCPT, DATA, RSET, NOOP and QUIT, counts delivered messages and
+can add a per-command latency. It does not offer STARTTLS, so run the app
+with SMTP_STARTTLS=0 against it.
+
+Usage:
+    python benchmarks/fake_smtp.py --port 2525 --latency-ms 5
+"""
+
+import argparse
+import socketserver
+import threading
+import time
+
+
+class FakeSMTPServer:
+    """
+    Threaded SMTP sink that accepts every message.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0.0):
+        self.latency = latency_ms / 1000.0
+        self._lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+        self.bytes = 0
+
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                server._session(self)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.tcp = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.tcp.daemon_threads = True
+        self.host = host
+        self.port = self.tcp.server_address[1]
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.tcp.serve_forever, name="fake-smtp", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self.tcp.shutdown()
+        self.tcp.server_close()
+
+    def _session(self, handler):
+        def reply(line):
+            handler.wfile.write((line + "\r\n").encode("ascii"))
+
+        with self._lock:
+            self.connections += 1
+        reply("220 fake-smtp ready")
+        in_data = False
+        size = 0
+        for raw in handler.rfile:
+            line = raw.rstrip(b"\r\n")
+            if in_data:
+                if line == b".":
+                    in_data = False
+                    with self._lock:
+                        self.messages += 1
+                        self.bytes += size
+                    reply("250 2.0.0 queued")
+                else:
+                    size += len(raw)
+                continue
+
+            if self.latency:
+                time.sleep(self.latency)
+            command = line[:4].upper()
+            if command == b"EHLO":
+                reply("250-fake-smtp")
+                reply("250-AUTH PLAIN LOGIN")
+                reply("250 8BITMIME")
+            elif command == b"HELO":
+                reply("250 fake-smtp")
+            elif command == b"AUTH":
+                reply("235 2.7.0 authenticated")
+            elif command == b"DATA":
+                in_data = True
+                size = 0
+                reply("354 end data with <CR><LF>.<CR><LF>")
+            elif command == b"QUIT":
+                reply("221 bye")
+                return
+            else:
+                reply("250 ok")
+
+    def stats(self):
+        with self._lock:
+            return {"connections": self.connections, "messages": self.messages, "bytes": self.bytes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake SMTP server")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every SMTP command")
+    args = parser.parse_args()
+
+    server = FakeSMTPServer(port=args.port, latency_ms=args.latency_ms)
+    print(f"Fake SMTP server listening on {server.host}:{server.port} (use SMTP_STARTTLS=0)")
+    try:
+        server.tcp.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
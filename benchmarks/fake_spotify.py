@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+MoodStream Fake Spotify API
+
+A local stand-in for the Spotify Web API search endpoint (GET /v1/search)
+and the client-credentials token endpoint (POST /api/token) so
+recommendation benchmarks run offline and repeatably. Each request waits
+a configurable latency (plus jitter), new connections can pay an extra
+setup delay standing in for the TCP/TLS handshake, and requests can fail with a 500 or be
+rate-limited with a 429 and a Retry-After header. Results are deterministic
+per query, and queries share part of a fixed track universe so
+deduplication and ranking do real work.
+
+spotipy is pointed at the server by replacing the client's API prefix and
+the auth manager's token URL, see FakeSpotifyServer.client(). The server
+counts TCP connections and token requests so connection reuse and token
+sharing can be checked.
+
+Usage:
+    python benchmarks/fake_spotify.py --port 8765 --latency-ms 80 --rate-limit-rate 0.05
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TRACK_UNIVERSE = 5000  # distinct tracks any query can return
+
+
+def make_track(index):
+    rng = random.Random(index)
+    artists = [{"name": f"Artist {rng.randint(0, 400)}"} for _ in range(rng.choice((1, 1, 2)))]
+    return {
+        "id": f"faketrack{index:06d}",
+        "name": f"Track {index}",
+        "artists": artists,
+        "external_urls": {"spotify": f"https://open.spotify.com/track/faketrack{index:06d}"},
+        "popularity": rng.randint(0, 100),
+        "type": "track"
+    }
+
+
+class FakeSpotifyServer:
+    """
+    Threaded HTTP server answering /v1/search like the Spotify Web API.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=80.0, jitter_ms=20.0,
+                 error_rate=0.0, rate_limit_rate=0.0, retry_after=1, connect_latency_ms=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.connect_latency_ms = connect_latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._tracks = [make_track(i) for i in range(TRACK_UNIVERSE)]
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.connections = 0
+        self.tokens = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; with Nagle on, every
+            # keep-alive response would wait out the client's delayed ACK
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+                time.sleep(server.connect_latency_ms / 1000.0)
+
+            def do_GET(self):
+                server._handle(self)
+
+            def do_POST(self):
+                server._handle_token(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self.token_url = self.url + "/api/token"
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-spotify", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def client(self, retries=3, timeout=10, auth_manager=None, session=None):
+        """
+        Return a spotipy client whose API calls go to this server, set up
+        like the app's client (pooled session, 429s left to the caller).
+        With an auth_manager (e.g. spotify_auth.SharedClientCredentials)
+        tokens are requested from this server too; otherwise a static token
+        is used.
+        """
+        import spotipy
+
+        from spotify_limiter import spotify_session
+
+        if session is None:
+            session = spotify_session(retries, backoff_factor=0.05)
+        if auth_manager is not None:
+            auth_manager.OAUTH_TOKEN_URL = self.token_url
+            sp = spotipy.Spotify(auth_manager=auth_manager, requests_timeout=timeout, requests_session=session)
+        else:
+            sp = spotipy.Spotify(auth="offline-benchmark", requests_timeout=timeout, requests_session=session)
+        sp.prefix = self.url + "/v1/"
+        return sp
+
+    def search_results(self, query, limit, offset=0):
+        rng = random.Random(zlib.crc32(query.encode("utf-8")))
+        start = rng.randrange(TRACK_UNIVERSE)
+        step = rng.choice((1, 3, 7, 11))
+        items = [self._tracks[(start + (offset + i) * step) % TRACK_UNIVERSE] for i in range(limit)]
+        return {
+            "tracks": {
+                "href": f"{self.url}/v1/search?query={query}&type=track&offset={offset}&limit={limit}",
+                "items": items,
+                "limit": limit,
+                "offset": offset,
+                "total": 1000
+            }
+        }
+
+    def _handle(self, handler):
+        with self._lock:
+            self.requests += 1
+            roll = self._rng.random()
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0
+        time.sleep(delay)
+
+        url = urlparse(handler.path)
+        if url.path != "/v1/search":
+            return self._send(handler, 404, {"error": {"status": 404, "message": "Not found"}})
+        if roll < self.rate_limit_rate:
+            with self._lock:
+                self.rate_limited += 1
+            return self._send(handler, 429, {"error": {"status": 429, "message": "API rate limit exceeded"}},
+                              {"Retry-After": str(self.retry_after)})
+        if roll < self.rate_limit_rate + self.error_rate:
+            with self._lock:
+                self.errors += 1
+            return self._send(handler, 500, {"error": {"status": 500, "message": "Server error"}})
+
+        params = parse_qs(url.query)
+        query = params.get("q", [""])[0]
+        limit = min(50, int(params.get("limit", ["10"])[0]))
+        offset = int(params.get("offset", ["0"])[0])
+        self._send(handler, 200, self.search_results(query, limit, offset))
+
+    def _handle_token(self, handler):
+        length = int(handler.headers.get("Content-Length") or 0)
+        handler.rfile.read(length)
+        if urlparse(handler.path).path != "/api/token":
+            return self._send(handler, 404, {"error": "not_found"})
+        with self._lock:
+            self.tokens += 1
+            token = f"fake-token-{self.tokens}"
+        time.sleep(self.latency_ms / 1000.0)
+        self._send(handler, 200, {"access_token": token, "token_type": "Bearer", "expires_in": 3600})
+
+    def _send(self, handler, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json; charset=utf-8")
+        handler.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "rate_limited": self.rate_limited,
+                "connections": self.connections,
+                "tokens": self.tokens,
+                "latency_ms": self.latency_ms,
+                "jitter_ms": self.jitter_ms,
+                "connect_latency_ms": self.connect_latency_ms,
+                "error_rate": self.error_rate,
+                "rate_limit_rate": self.rate_limit_rate
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Spotify search API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--connect-latency-ms", type=float, default=0.0, help="extra delay per new connection")
+    args = parser.parse_args()
+
+    server = FakeSpotifyServer(port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                               error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                               retry_after=args.retry_after, connect_latency_ms=args.connect_latency_ms)
+    print(f"Fake Spotify API listening on {server.url} (set a spotipy client's prefix to {server.url}/v1/)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
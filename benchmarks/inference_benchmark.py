@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+MoodStream Inference Benchmark
+
+Compares the emotion model backends selectable in emotion_detector
+(EMOTION_BACKEND=keras|numpy): output parity, import/load time, single-crop
+latency, batch throughput and resident memory. Each backend is measured in a
+fresh subprocess so its import time and RSS are not affected by the others.
+
+Usage:
+    python benchmarks/inference_benchmark.py                 # benchmark every backend
+    python benchmarks/inference_benchmark.py --parity        # compare numpy vs keras outputs
+    python benchmarks/inference_benchmark.py --images DIR    # use face crops from DIR as inputs
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BACKENDS = ["keras", "numpy"]
+
+
+def rss_mb():
+    """Current resident set size of this process in MB."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    import resource
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def sample_crops(count, image_dir=None, seed=0):
+    """
+    Return (count, 48, 48, 1) uint8 crops: grayscale images from image_dir
+    if given (cycled as needed), otherwise seeded random noise.
+    """
+    import numpy as np
+
+    if image_dir:
+        import cv2
+        crops = []
+        for name in sorted(os.listdir(image_dir)):
+            image = cv2.imread(os.path.join(image_dir, name), cv2.IMREAD_GRAYSCALE)
+            if image is not None:
+                crops.append(cv2.resize(image, (48, 48)))
+        if crops:
+            return np.stack([crops[i % len(crops)] for i in range(count)])[..., None]
+    return np.random.RandomState(seed).randint(0, 256, (count, 48, 48, 1)).astype(np.uint8)
+
+
+def measure_backend(backend, runs, batch_size, image_dir=None):
+    """
+    Measure one backend in the current (fresh) process.
+    """
+    os.environ["EMOTION_BACKEND"] = backend
+    os.chdir(ROOT)
+    rss_start = rss_mb()
+
+    started = time.perf_counter()
+    import emotion_detector
+    model = emotion_detector.get_emotion_model()
+    load_seconds = time.perf_counter() - started
+    rss_loaded = rss_mb()
+
+    crops = sample_crops(max(batch_size, 1), image_dir)
+    single = crops[:1]
+    model.predict(single, verbose=0)  # warm-up
+
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        model.predict(single, verbose=0)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    batch_runs = max(1, runs // 10)
+    started = time.perf_counter()
+    for _ in range(batch_runs):
+        model.predict(crops, verbose=0)
+    batch_seconds = time.perf_counter() - started
+
+    return {
+        "backend": backend,
+        "import_and_load_seconds": round(load_seconds, 4),
+        "startup_report": emotion_detector.startup_report,
+        "single_latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "mean": round(sum(latencies) / len(latencies), 3)
+        },
+        "batch_size": batch_size,
+        "batch_throughput_per_second": round(batch_runs * batch_size / batch_seconds, 1),
+        "rss_mb": {"start": rss_start, "after_load": rss_loaded, "after_inference": rss_mb()}
+    }
+
+
+def check_parity(samples, image_dir=None, tolerance=1e-4):
+    """
+    Run the same crops through both backends and compare probabilities.
+    """
+    import numpy as np
+    import numpy_inference
+    from keras import models
+
+    os.chdir(ROOT)
+    with open("emotion_model.json") as json_file:
+        model_json = json_file.read()
+    weights_path = os.getenv("EMOTION_MODEL_WEIGHTS", "emotion_model.weights.h5")
+
+    keras_model = models.model_from_json(model_json)
+    keras_model.load_weights(weights_path)
+    numpy_model = numpy_inference.model_from_json(model_json)
+    numpy_model.load_weights(weights_path)
+
+    crops = sample_crops(samples, image_dir)
+    expected = keras_model.predict(crops, verbose=0)
+    actual = numpy_model.predict(crops)
+    diff = np.abs(expected - actual)
+    return {
+        "samples": samples,
+        "max_abs_diff": float(diff.max()),
+        "mean_abs_diff": float(diff.mean()),
+        "argmax_agreement": float((expected.argmax(axis=1) == actual.argmax(axis=1)).mean()),
+        "tolerance": tolerance,
+        "passed": bool(diff.max() <= tolerance)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MoodStream emotion inference backends")
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    parser.add_argument("--runs", type=int, default=200, help="single-crop predictions per backend")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--images", help="directory of face images to use as inputs")
+    parser.add_argument("--parity", action="store_true", help="only compare numpy and keras outputs")
+    parser.add_argument("--samples", type=int, default=64, help="crops used for the parity check")
+    parser.add_argument("--measure", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure_backend(args.measure, args.runs, args.batch_size, args.images)))
+        return 0
+
+    if args.parity:
+        result = check_parity(args.samples, args.images)
+        print(json.dumps(result, indent=2))
+        return 0 if result["passed"] else 1
+
+    results = []
+    for backend in args.backends:
+        command = [sys.executable, os.path.abspath(__file__), "--measure", backend,
+                   "--runs", str(args.runs), "--batch-size", str(args.batch_size)]
+        if args.images:
+            command += ["--images", args.images]
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(json.dumps({"benchmark": "inference", "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+"""
+Int8 post-training quantization of the emotion CNN, for
+quantization_benchmark.py only: NumPy has no int8 kernels, so it is slower
+than the float backends and not selectable with EMOTION_BACKEND.
+
+    python benchmarks/int8_inference.py --images benchmarks/recordings/frames --output emotion_model.int8.npz
+"""
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+import numpy_inference
+from numpy_inference import ACTIVATIONS, im2col, _pad
+
+CALIBRATION_PERCENTILE = 99.99  # input range clipped to this percentile of calibration activations
+INT8_MAX = 127
+UINT8_MAX = 255
+WIDEN_ROWS = 128  # Dense kernel rows widened to float32 at a time (a block that stays in cache)
+
+
+def quantize_kernel(kernel):
+    """
+    Quantize a (inputs, outputs) kernel to int8 with one scale per output
+    channel. Returns (int8 kernel, float32 scales).
+    """
+    amax = np.abs(kernel).max(axis=0)
+    scale = np.where(amax > 0, amax / INT8_MAX, 1.0).astype(np.float32)
+    quantized = np.clip(np.rint(kernel / scale), -INT8_MAX, INT8_MAX).astype(np.int8)
+    return quantized, scale
+
+
+def input_scale(amax, signed):
+    """
+    Per-tensor scale mapping [-amax, amax] (or [0, amax]) onto the int8
+    (or uint8) range.
+    """
+    return np.float32(amax / (INT8_MAX if signed else UINT8_MAX)) if amax > 0 else np.float32(1.0)
+
+
+class _QuantizedLayer:
+    def __init__(self, config, kernel_q, kernel_scale, bias=None, scale=None, signed=False):
+        self.name = config["name"]
+        self.activation = ACTIVATIONS[config.get("activation", "linear")]
+        self.kernel_q = kernel_q
+        self.kernel_scale = kernel_scale
+        self.bias = None if bias is None else bias.astype(np.float32)
+        self.input_scale = scale  # None: dynamic, from each sample
+        self.signed = signed
+
+    def quantize_input(self, x):
+        """
+        Return (quantized x, scale); the scale is per tensor when calibrated,
+        otherwise per sample with shape (N, 1, ...).
+        """
+        if self.input_scale is None:
+            amax = np.abs(x).max(axis=tuple(range(1, x.ndim)), keepdims=True)
+            scale = np.where(amax > 0, amax / (INT8_MAX if self.signed else UINT8_MAX), 1.0).astype(np.float32)
+        else:
+            scale = self.input_scale
+        x_q = x * (np.float32(1.0) / scale)
+        np.rint(x_q, out=x_q)
+        return np.clip(x_q, -INT8_MAX if self.signed else 0, INT8_MAX if self.signed else UINT8_MAX, out=x_q), scale
+
+    def finish(self, acc, scale):
+        acc *= scale * self.kernel_scale
+        if self.bias is not None:
+            acc += self.bias
+        return self.activation(acc)
+
+    def arrays(self):
+        arrays = {"kernel_q": self.kernel_q, "kernel_scale": self.kernel_scale,
+                  "signed": np.array(self.signed)}
+        if self.bias is not None:
+            arrays["bias"] = self.bias
+        if self.input_scale is not None:
+            arrays["input_scale"] = np.array(self.input_scale, dtype=np.float32)
+        return arrays
+
+
+class QuantizedConv2D(_QuantizedLayer):
+    def __init__(self, config, kernel_q, kernel_scale, bias=None, scale=None, signed=False):
+        super().__init__(config, kernel_q, kernel_scale, bias, scale, signed)
+        float_layer = numpy_inference.Conv2D(config, np.zeros((1, 1, 1, 1), dtype=np.float32))
+        self.kernel_size = tuple(config["kernel_size"])
+        self.strides = float_layer.strides
+        self.padding = float_layer.padding
+        self.filters = kernel_q.shape[-1]
+        # Small and reused at every output position: keep float32 for BLAS
+        self.kernel = kernel_q.reshape(-1, self.filters).astype(np.float32)
+
+    def __call__(self, x):
+        x_q, scale = self.quantize_input(x)
+        x_q = _pad(x_q, self.kernel_size, self.strides, self.padding)
+        cols, (n, oh, ow) = im2col(x_q, self.kernel_size, self.strides)
+        return self.finish((cols @ self.kernel).reshape(n, oh, ow, self.filters), scale)
+
+
+class QuantizedDense(_QuantizedLayer):
+    def __call__(self, x):
+        x_q, scale = self.quantize_input(x)
+        # Large and read once per call: stays int8 and is widened block by
+        # block, so the float32 copy never leaves the cache
+        rows = len(self.kernel_q)
+        acc = np.zeros((len(x_q), self.kernel_q.shape[1]), dtype=np.float32)
+        block = np.empty((min(WIDEN_ROWS, rows), self.kernel_q.shape[1]), dtype=np.float32)
+        for start in range(0, rows, WIDEN_ROWS):
+            kernel = block[:min(WIDEN_ROWS, rows - start)]
+            kernel[...] = self.kernel_q[start:start + WIDEN_ROWS]
+            acc += x_q[:, start:start + WIDEN_ROWS] @ kernel
+        return self.finish(acc, scale)
+
+
+def quantize_layer(layer_config, kernel, bias, amax=None, signed=False):
+    """
+    Build the quantized layer for a Conv2D or Dense config and its float
+    weights; amax is the calibrated input range (None for dynamic).
+    """
+    class_name = layer_config["class_name"]
+    config = layer_config["config"]
+    scale = None if amax is None else input_scale(amax, signed)
+    if class_name == "Conv2D":
+        kh, kw, cin, cout = kernel.shape
+        kernel_q, kernel_scale = quantize_kernel(kernel.reshape(kh * kw * cin, cout))
+        return QuantizedConv2D(config, kernel_q.reshape(kh, kw, cin, cout), kernel_scale, bias, scale, signed)
+    kernel_q, kernel_scale = quantize_kernel(kernel)
+    return QuantizedDense(config, kernel_q, kernel_scale, bias, scale, signed)
+
+
+class Int8SequentialModel(numpy_inference.NumpySequentialModel):
+    """
+    NumpySequentialModel whose Conv2D and Dense layers run in int8.
+    load_weights() accepts a quantized .npz (see save_quantized) or the
+    float .weights.h5, which is quantized at load time with dynamic input
+    scales and the float weights dropped. set_weights() keeps the float
+    weights so calibrate() can be called.
+    """
+
+    def __init__(self, layer_configs):
+        super().__init__(layer_configs)
+        self.float_layers = None
+        self.calibration = None
+
+    def load_weights(self, path):
+        if str(path).endswith(".npz"):
+            self.load_quantized(path)
+            return
+        super().load_weights(path)
+        self.float_layers = None
+        self.weight_arrays = None
+
+    def set_weights(self, weight_arrays):
+        """
+        Quantize float {layer_name: [kernel, bias]} weights, keeping the
+        float layers for calibrate().
+        """
+        super().set_weights(weight_arrays)
+        self.float_layers = self.layers
+        self.layers = self._quantized_layers(amax=None)
+
+    def _quantized_layers(self, amax):
+        layers = []
+        float_layers = iter(self.float_layers)
+        for layer in self.layer_configs:
+            float_layer = next(float_layers)
+            if layer["class_name"] in ("Conv2D", "Dense"):
+                name = layer["config"]["name"]
+                kernel, bias = (self.weight_arrays[name] + [None])[:2]
+                layers.append(quantize_layer(layer, kernel, bias, None if amax is None else amax[name],
+                                             signed=bool(amax is not None and amax.get(name + "/signed"))))
+            else:
+                layers.append(float_layer)
+        return layers
+
+    def calibrate(self, samples, percentile=CALIBRATION_PERCENTILE):
+        """
+        Run (N, 48, 48, 1) calibration crops through the float model and
+        set every quantized layer's input scale from the observed ranges.
+        """
+        if self.float_layers is None:
+            raise RuntimeError("Float weights are needed to calibrate")
+        amax = {}
+        x = np.asarray(samples, dtype=np.float32)
+        for layer, config in zip(self.float_layers, self.layer_configs):
+            if config["class_name"] in ("Conv2D", "Dense"):
+                name = config["config"]["name"]
+                amax[name] = float(np.percentile(np.abs(x), percentile))
+                amax[name + "/signed"] = bool(x.min() < 0)
+            x = layer(x)
+
+        self.layers = self._quantized_layers(amax)
+        self.calibration = {"samples": len(samples), "percentile": percentile}
+        return amax
+
+    def save_quantized(self, path):
+        """
+        Write the int8 kernels, scales and biases to an .npz file.
+        """
+        arrays = {}
+        for layer in self.layers:
+            if isinstance(layer, _QuantizedLayer):
+                arrays.update({f"{layer.name}/{key}": value for key, value in layer.arrays().items()})
+        arrays["__meta__"] = np.array(json.dumps({"calibration": self.calibration}))
+        np.savez(path, **arrays)
+
+    def load_quantized(self, path):
+        with np.load(path) as data:
+            arrays = {key: data[key] for key in data.files}
+        meta = json.loads(str(arrays.pop("__meta__", "{}")))
+        self.calibration = meta.get("calibration")
+
+        layers = []
+        for layer in self.layer_configs:
+            class_name, config = layer["class_name"], layer["config"]
+            if class_name in ("Conv2D", "Dense"):
+                name = config["name"]
+                if f"{name}/kernel_q" not in arrays:
+                    raise ValueError(f"Missing quantized weights for layer {name}")
+                scale = arrays.get(f"{name}/input_scale")
+                layer_type = QuantizedConv2D if class_name == "Conv2D" else QuantizedDense
+                layers.append(layer_type(config, arrays[f"{name}/kernel_q"], arrays[f"{name}/kernel_scale"],
+                                         arrays.get(f"{name}/bias"), None if scale is None else np.float32(scale),
+                                         bool(arrays[f"{name}/signed"])))
+            elif class_name == "MaxPooling2D":
+                layers.append(numpy_inference.MaxPooling2D(config))
+            elif class_name == "Flatten":
+                layers.append(numpy_inference._flatten)
+            else:
+                layers.append(numpy_inference._identity)
+        self.layers = layers
+        self.float_layers = None
+        self.weight_arrays = None
+
+    def weight_bytes(self):
+        """
+        Bytes held by the layers' weights (int8 kernels, float32 compute
+        copies, scales and biases).
+        """
+        total = 0
+        for layer in self.layers:
+            for value in vars(layer).values() if hasattr(layer, "__dict__") else ():
+                if isinstance(value, np.ndarray):
+                    total += value.nbytes
+        return total
+
+
+def model_from_json(json_string):
+    """
+    Build an Int8SequentialModel from a Keras model JSON string.
+    """
+    spec = json.loads(json_string)
+    if spec.get("class_name") != "Sequential":
+        raise ValueError("Only Sequential models are supported")
+    return Int8SequentialModel(spec["config"]["layers"])
+
+
+def load_calibration_crops(image_dir, limit=256, size=48):
+    """
+    (N, 48, 48, 1) uint8 face crops from the images in image_dir: the first
+    detected face of each image, or the whole image resized when none is
+    found (e.g. images that are already face crops).
+    """
+    import cv2
+
+    from face_detection import detect_faces
+
+    crops = []
+    for name in sorted(os.listdir(image_dir)):
+        if len(crops) >= limit:
+            break
+        image = cv2.imread(os.path.join(image_dir, name), cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            continue
+        faces = detect_faces(image)
+        if faces:
+            x, y, w, h = faces[0]
+            image = image[y:y + h, x:x + w]
+        crops.append(cv2.resize(image, (size, size)))
+    if not crops:
+        raise ValueError(f"No images found in {image_dir}")
+    return np.stack(crops)[..., None]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize the emotion model to int8 with per-channel scales")
+    parser.add_argument("--images", required=True, help="directory of calibration images (faces or webcam frames)")
+    parser.add_argument("--limit", type=int, default=256, help="calibration images to use")
+    parser.add_argument("--model", default=os.getenv("EMOTION_MODEL_JSON", "./emotion_model.json"))
+    parser.add_argument("--weights", default=os.getenv("EMOTION_MODEL_WEIGHTS", "./emotion_model.weights.h5"))
+    parser.add_argument("--output", default="./emotion_model.int8.npz")
+    args = parser.parse_args()
+
+    with open(args.model) as json_file:
+        model = model_from_json(json_file.read())
+    model.set_weights(numpy_inference.load_weight_arrays(args.weights))
+    crops = load_calibration_crops(args.images, args.limit)
+    model.calibrate(crops)
+    model.save_quantized(args.output)
+
+    float_model = numpy_inference.NumpySequentialModel(model.layer_configs)
+    float_model.set_weights(model.weight_arrays)
+    expected = float_model.predict(crops)
+    actual = model.predict(crops)
+    print(json.dumps({
+        "output": args.output,
+        "calibration_images": len(crops),
+        "argmax_agreement": round(float((expected.argmax(axis=1) == actual.argmax(axis=1)).mean()), 4),
+        "max_abs_diff": round(float(np.abs(expected - actual).max()), 5)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+MoodStream Model Server Benchmark
+
+Simulates N web workers (separate processes, each with a few request
+threads sending single face crops through emotion_detector's
+micro-batcher) with the emotion model loaded in every worker and with one
+model_server.py process serving all of them over its Unix socket. For each
+worker count reports JSON: resident memory per web worker, the model
+server's, the total (RSS and, on Linux, PSS which counts shared pages
+once) and predictions per second across all workers.
+
+Usage:
+    python benchmarks/model_server_benchmark.py
+    python benchmarks/model_server_benchmark.py --workers 1 2 4 8 --duration 10 --backend numpy
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from inference_benchmark import sample_crops
+
+
+def memory_mb(pid="self"):
+    """
+    {"rss", "pss"} in MB for a process (pss is None off Linux).
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line and not line.startswith(" "))
+        return {key.lower(): round(int(fields[key].split()[0]) / 1024, 1) for key in ("Rss", "Pss")}
+    except OSError:
+        import resource
+        return {"rss": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1), "pss": None}
+
+
+def web_worker(threads, duration, start, results):
+    """
+    One web worker: load (or connect to) the model, then send single crops
+    from several threads until the duration is up.
+    """
+    import threading
+
+    import emotion_detector
+
+    emotion_detector.preload_model()
+    crops = sample_crops(64)
+    start.wait()
+    deadline = time.perf_counter() + duration
+    counts = [0] * threads
+
+    def run(index):
+        i = index
+        while time.perf_counter() < deadline:
+            emotion_detector.predict_emotion_proba(crops[i % len(crops)][None])
+            counts[index] += 1
+            i += threads
+
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    client = emotion_detector.model_client
+    results.put({
+        "requests": sum(counts),
+        "memory": memory_mb(),
+        "fallbacks": client.fallbacks if client is not None else 0
+    })
+
+
+def run_scenario(workers, threads, duration, socket_path=None):
+    # Workers are spawned (not forked) so each imports its own model runtime
+    os.environ["EMOTION_MODEL_SERVER"] = socket_path or ""
+    context = multiprocessing.get_context("spawn")
+    start = context.Barrier(workers + 1)
+    results = context.Queue()
+    processes = [context.Process(target=web_worker, args=(threads, duration, start, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    start.wait()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    requests = sum(report["requests"] for report in reports)
+    rss = [report["memory"]["rss"] for report in reports]
+    pss = [report["memory"]["pss"] for report in reports]
+    return {
+        "requests_per_second": round(requests / duration, 1),
+        "worker_rss_mb": round(sum(rss) / workers, 1),
+        "workers_rss_total_mb": round(sum(rss), 1),
+        "workers_pss_total_mb": round(sum(pss), 1) if None not in pss else None,
+        "fallbacks": sum(report["fallbacks"] for report in reports)
+    }
+
+
+def start_server(socket_path):
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, "model_server.py"), "--socket", socket_path],
+                              cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    for line in server.stdout:
+        if "listening" in line:
+            return server
+    raise RuntimeError("model server exited before listening")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the out-of-process emotion model server")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="web worker counts")
+    parser.add_argument("--threads", type=int, default=4, help="request threads per web worker")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of load per scenario")
+    parser.add_argument("--backend", choices=["keras", "numpy"], default=os.getenv("EMOTION_BACKEND", "keras"))
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    os.environ["EMOTION_BACKEND"] = args.backend
+    os.environ["EMOTION_MODEL_FALLBACK"] = "none"  # a fallback would hide server failures
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="moodstream-model-"), "model.sock")
+
+    report = {"benchmark": "model_server", "config": vars(args), "in_process": {}, "model_server": {}}
+    for workers in args.workers:
+        report["in_process"][workers] = run_scenario(workers, args.threads, args.duration)
+
+    server = start_server(socket_path)
+    try:
+        report["model_server_memory_idle"] = memory_mb(server.pid)
+        for workers in args.workers:
+            report["model_server"][workers] = run_scenario(workers, args.threads, args.duration, socket_path)
+            report["model_server"][workers]["server_rss_mb"] = memory_mb(server.pid)["rss"]
+            report["model_server"][workers]["total_rss_mb"] = round(
+                report["model_server"][workers]["workers_rss_total_mb"] + report["model_server"][workers]["server_rss_mb"], 1)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+MoodStream Offline Benchmark Suite
+
+Runs the application code against local stand-ins instead of live
+services: a fake Spotify search API (benchmarks/fake_spotify.py, with
+configurable latency, errors and 429s) and a fake SMTP server
+(benchmarks/fake_smtp.py). Emotion inference replays recorded frames
+(see benchmarks/record_frames.py) when --images or --video is given, and
+falls back to seeded random crops otherwise.
+
+Benchmarks:
+- get_songs_for_emotion, display and full_list, with live searches, a warm
+  search cache and the track catalog
+- /select-emotion-and-recommend/stream: time to the first songs and to the
+  final ranked list, against the blocking route
+- create_playlist_url
+- playlist email rendering, synchronous sending and queued delivery
+- emotion model load, single-crop prediction and frame-burst detection
+
+Throughput and latency percentiles are printed as JSON; application logs
+go to stderr.
+
+Usage:
+    python benchmarks/offline_suite.py
+    python benchmarks/offline_suite.py --latency-ms 120 --error-rate 0.02 --rate-limit-rate 0.05
+    python benchmarks/offline_suite.py --images benchmarks/recordings/frames --only inference
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_smtp import FakeSMTPServer
+from fake_spotify import FakeSpotifyServer
+from inference_benchmark import percentile, sample_crops
+from spotify_limiter import RateLimitedSpotify
+
+SECTIONS = ["recommendations", "streaming", "playlist_url", "email", "inference"]
+
+
+def summarize(latencies_ms, elapsed=None):
+    """
+    Throughput and latency percentiles for a list of per-call latencies.
+    elapsed (seconds) defaults to the sum of the latencies.
+    """
+    if not latencies_ms:
+        return {"count": 0}
+    if elapsed is None:
+        elapsed = sum(latencies_ms) / 1000.0
+    return {
+        "count": len(latencies_ms),
+        "throughput_per_second": round(len(latencies_ms) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "mean": round(sum(latencies_ms) / len(latencies_ms), 3),
+            "p50": round(percentile(latencies_ms, 50), 3),
+            "p95": round(percentile(latencies_ms, 95), 3),
+            "p99": round(percentile(latencies_ms, 99), 3),
+            "max": round(max(latencies_ms), 3)
+        }
+    }
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - started) * 1000, result
+
+
+def bench_recommendations(app, spotify, iterations):
+    """
+    get_songs_for_emotion in display and full_list mode. "live" clears the
+    search cache and bypasses the catalog so every search reaches the API;
+    "warm_cache" fetches every emotion once first, so it should make none.
+    """
+    from search_cache import search_cache
+
+    emotions = list(app.emotion_dict.values())
+    catalog = app.track_catalog
+    results = {}
+    playlists = []
+
+    for full_list in (False, True):
+        scenarios = {}
+        for scenario in ("live", "warm_cache", "catalog"):
+            if scenario == "catalog":
+                if catalog is None:
+                    continue
+                app.track_catalog = catalog
+                for emotion in emotions:  # one live pass fills the catalog
+                    search_cache.clear()
+                    app.get_songs_for_emotion(emotion, full_list)
+            else:
+                app.track_catalog = None
+                if scenario == "warm_cache":
+                    for emotion in emotions:
+                        app.get_songs_for_emotion(emotion, full_list)
+
+            requests_before = spotify.stats()["requests"]
+            latencies = []
+            songs = 0
+            for i in range(iterations):
+                emotion = emotions[i % len(emotions)]
+                if scenario != "warm_cache":
+                    search_cache.clear()
+                latency, tracks = timed(lambda: app.get_songs_for_emotion(emotion, full_list))
+                latencies.append(latency)
+                songs += len(tracks)
+                if full_list:
+                    playlists.append((emotion, tracks))
+            api_requests = spotify.stats()["requests"] - requests_before
+            if scenario == "warm_cache" and api_requests:
+                print(f"warm_cache made {api_requests} API requests (failed searches are not cached)", file=sys.stderr)
+            scenarios[scenario] = {
+                **summarize(latencies),
+                "api_requests": api_requests,
+                "api_requests_per_call": round(api_requests / iterations, 2),
+                "avg_songs": round(songs / iterations, 1)
+            }
+        app.track_catalog = catalog
+        results["full_list" if full_list else "display"] = scenarios
+
+    return results, playlists
+
+
+def bench_streaming(app, iterations):
+    """
+    Live recommendations through the blocking route and the NDJSON
+    streaming route (search cache cleared, catalog bypassed): time until
+    the first songs reach the client and until the final list does.
+    """
+    from search_cache import search_cache
+
+    emotions = list(app.emotion_dict.values())
+    catalog = app.track_catalog
+    app.track_catalog = None
+    client = app.app.test_client()
+    blocking = []
+    first_songs = []
+    done = []
+    events = 0
+
+    try:
+        for i in range(iterations):
+            emotion = emotions[i % len(emotions)]
+            search_cache.clear()
+            latency, _ = timed(lambda: client.post("/select-emotion-and-recommend", json={"emotion": emotion}))
+            blocking.append(latency)
+
+            search_cache.clear()
+            started = time.perf_counter()
+            response = client.post("/select-emotion-and-recommend/stream", json={"emotion": emotion},
+                                   buffered=False)
+            first = None
+            for chunk in response.response:
+                for event in chunk.splitlines():
+                    event = json.loads(event)
+                    events += 1
+                    if first is None and event["type"] in ("songs", "done"):
+                        first = (time.perf_counter() - started) * 1000
+            response.close()
+            done.append((time.perf_counter() - started) * 1000)
+            first_songs.append(first if first is not None else done[-1])
+    finally:
+        app.track_catalog = catalog
+
+    return {
+        "blocking": summarize(blocking),
+        "stream_first_songs": summarize(first_songs),
+        "stream_done": summarize(done),
+        "events_per_call": round(events / iterations, 1)
+    }
+
+
+def bench_playlist_url(app, playlists, calls):
+    latencies = []
+    for i in range(calls):
+        emotion, tracks = playlists[i % len(playlists)]
+        latency, _ = timed(lambda: app.create_playlist_url(tracks, emotion))
+        latencies.append(latency)
+    return summarize(latencies)
+
+
+def bench_email(app, smtp, playlists, messages):
+    """
+    Render playlist emails, send them synchronously over the SMTP pool and
+    deliver them through the background queue.
+    """
+    render = []
+    for i in range(messages):
+        emotion, tracks = playlists[i % len(playlists)]
+        latency, _ = timed(lambda: app.build_playlist_email(f"user{i}@example.com", emotion, tracks).as_bytes())
+        render.append(latency)
+
+    send = []
+    for i in range(messages):
+        emotion, tracks = playlists[i % len(playlists)]
+        latency, _ = timed(lambda: app.send_email_playlist(f"user{i}@example.com", emotion, tracks))
+        send.append(latency)
+
+    started = time.perf_counter()
+    job_ids = []
+    for i in range(messages):
+        emotion, tracks = playlists[i % len(playlists)]
+        job_ids.append(app.email_queue.enqueue(
+            f"user{i}@example.com",
+            lambda emotion=emotion, tracks=tracks, i=i: app.build_playlist_email(f"user{i}@example.com", emotion, tracks)
+        ))
+    app.email_queue.join()
+    elapsed = time.perf_counter() - started
+    jobs = [app.email_queue.status(job_id) for job_id in job_ids]
+    queued = [(job["updated_at"] - job["created_at"]) * 1000 for job in jobs]
+
+    return {
+        "render": summarize(render),
+        "send_sync": summarize(send),
+        "queue": {
+            **summarize(queued, elapsed),
+            "sent": sum(job["status"] == "sent" for job in jobs),
+            "failed": sum(job["status"] == "failed" for job in jobs)
+        },
+        "render_cache": app.email_renderer.stats(),
+        "smtp_server": smtp.stats()
+    }
+
+
+def bench_inference(runs, images=None, video=None, burst=5):
+    import cv2
+    import numpy as np
+
+    import emotion_detector
+    from face_detection_benchmark import load_frames
+
+    load_ms, _ = timed(emotion_detector.preload_model)
+    crops = sample_crops(64, images).astype(np.float32) / 255.0
+    single = []
+    for i in range(runs):
+        latency, _ = timed(lambda: emotion_detector.predict_emotion_proba(crops[i % len(crops)][None]))
+        single.append(latency)
+
+    result = {
+        "backend": emotion_detector.EMOTION_BACKEND,
+        "microbatch": emotion_detector.EMOTION_MICROBATCH,
+        "model_load_ms": round(load_ms, 3),
+        "startup_report": emotion_detector.startup_report,
+        "single_crop": summarize(single),
+        "frames": None
+    }
+
+    frames = load_frames(video, images, limit=300) if (images or video) else []
+    if frames:
+        encoded = [cv2.imencode(".jpg", frame)[1].tobytes() for frame in frames]
+        bursts = []
+        detected = 0
+        for i in range(runs):
+            start = (i * burst) % len(encoded)
+            chunk = (encoded + encoded)[start:start + burst]
+            latency, detection = timed(lambda: emotion_detector.detect_emotion_in_frames(chunk))
+            bursts.append(latency)
+            detected += detection["emotion"] is not None
+        result["frames"] = {
+            "recorded_frames": len(frames),
+            "frame_size": list(frames[0].shape[:2]),
+            "burst_size": burst,
+            "bursts_with_face": detected,
+            "detect_burst": summarize(bursts)
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run MoodStream benchmarks against local stand-ins")
+    parser.add_argument("--only", nargs="+", choices=SECTIONS, help="run only these sections")
+    parser.add_argument("--iterations", type=int, default=21, help="recommendation calls per scenario")
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="fake Spotify API latency")
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of API calls failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of API calls answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--smtp-latency-ms", type=float, default=2.0, help="fake SMTP per-command latency")
+    parser.add_argument("--messages", type=int, default=200, help="emails per email scenario")
+    parser.add_argument("--inference-runs", type=int, default=200)
+    parser.add_argument("--images", help="directory of recorded frames")
+    parser.add_argument("--video", help="recorded video file")
+    args = parser.parse_args()
+    sections = args.only or SECTIONS
+
+    spotify = FakeSpotifyServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                                rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after).start()
+    smtp = FakeSMTPServer(latency_ms=args.smtp_latency_ms).start()
+    workdir = tempfile.mkdtemp(prefix="moodstream-bench-")
+
+    # Configure the app for the stand-ins before it is imported
+    os.environ.update({
+        "CLIENT_ID": os.environ.get("CLIENT_ID", "offline-benchmark"),
+        "CLIENT_SECRET": os.environ.get("CLIENT_SECRET", "offline-benchmark"),
+        "EMAIL_ADDRESS": "moodstream@example.com",
+        "EMAIL_PASSWORD": "offline-benchmark",
+        "SMTP_HOST": smtp.host,
+        "SMTP_PORT": str(smtp.port),
+        "SMTP_STARTTLS": "0",
+        "TRACK_POOLS": "0",
+        "TRACK_CATALOG_PATH": os.path.join(workdir, "track_catalog.db"),
+        "EMOTION_MODEL_PRELOAD": "0"
+    })
+    os.chdir(ROOT)
+
+    report = {
+        "benchmark": "offline_suite",
+        "config": {k: v for k, v in vars(args).items() if k != "only"},
+        "sections": sections
+    }
+    # Keep stdout machine-readable: application logs go to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        import_ms, app = timed(lambda: __import__("app"))
+        app.sp = RateLimitedSpotify(spotify.client())
+        report["app_import_ms"] = round(import_ms, 3)
+
+        playlists = []
+        if "recommendations" in sections or "playlist_url" in sections or "email" in sections:
+            report["get_songs_for_emotion"], playlists = bench_recommendations(app, spotify, args.iterations)
+        if "streaming" in sections:
+            report["streaming"] = bench_streaming(app, args.iterations)
+        if "playlist_url" in sections:
+            report["create_playlist_url"] = bench_playlist_url(app, playlists, 2000)
+        if "email" in sections:
+            report["email"] = bench_email(app, smtp, playlists, args.messages)
+        if "inference" in sections:
+            report["inference"] = bench_inference(args.inference_runs, args.images, args.video)
+        report["fake_spotify"] = spotify.stats()
+        report["spotify_limiter"] = app.sp.stats()
+
+    print(json.dumps(report, indent=2))
+    spotify.stop()
+    smtp.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+MoodStream Pool Snapshot Benchmark
+
+Builds per-emotion candidate pools (tracks shaped like the fake Spotify
+API's), writes them as a pool_snapshot file and reports JSON:
+
+- the snapshot's write time and size, and that selections from the mapped
+  pools pick the same tracks as from the in-memory ones;
+- selection latency from in-memory and from mapped pools;
+- memory across --workers processes that each hold every pool, either
+  building their own in memory (one copy per worker) or mapping the shared
+  snapshot. Measured from /proc/self/smaps_rollup on Linux: private bytes
+  each worker added and the proportional set size (PSS) summed over all
+  workers, which counts shared pages once.
+
+Usage:
+    python benchmarks/pool_snapshot_benchmark.py
+    python benchmarks/pool_snapshot_benchmark.py --tracks 5000 --workers 8
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_spotify import make_track
+from inference_benchmark import percentile
+from pool_snapshot import read_pool_snapshot, write_pool_snapshot
+from ranking import CandidateSet, keyword_weights
+from tracks import Track
+
+EMOTIONS = ["angry", "disgust", "anxious", "happy", "sad", "surprise", "relaxed"]
+KEYWORDS = keyword_weights({"genres": ["pop", "dance", "rock"], "moods": ["upbeat", "sad", "calm"]})
+
+
+def make_pools(tracks_per_pool):
+    pools = {}
+    for e, emotion in enumerate(EMOTIONS):
+        rng = random.Random(e)
+        terms = [f"{emotion} {genre} hindi songs" for genre in ("pop", "dance", "rock", "lofi", "indie")]
+        tracks = [Track.from_spotify(make_track(e * tracks_per_pool + i), rng.choice(terms))
+                  for i in range(tracks_per_pool)]
+        pools[emotion] = CandidateSet(tracks, KEYWORDS)
+    return pools
+
+
+def memory():
+    """
+    (private bytes, PSS bytes) of this process, or (None, None) off Linux.
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line and not line.startswith(" "))
+    except OSError:
+        return None, None
+
+    def kb(name):
+        return int(fields.get(name, "0 kB").split()[0]) * 1024
+
+    return kb("Private_Clean") + kb("Private_Dirty"), kb("Pss")
+
+
+def worker(mode, path, tracks_per_pool, ready, results):
+    private_before, _ = memory()
+    if mode == "mapped":
+        pools, _ = read_pool_snapshot(path)
+    else:
+        pools = make_pools(tracks_per_pool)
+    # Serve a few selections from every pool so the pages are touched
+    for pool in pools.values():
+        for _ in range(5):
+            pool.select(50)
+    private_after, pss = memory()
+    results.put({
+        "private_added": private_after - private_before if private_after is not None else None,
+        "pss": pss
+    })
+    ready.wait()  # hold the pools until every worker has measured
+
+
+def worker_memory(mode, path, tracks_per_pool, workers):
+    context = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+    ready = context.Event()
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(mode, path, tracks_per_pool, ready, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    ready.set()
+    for process in processes:
+        process.join()
+    if reports[0]["pss"] is None:
+        return {"available": False}
+    return {
+        "private_added_mb_per_worker": round(sum(r["private_added"] for r in reports) / workers / 2**20, 2),
+        "pss_total_mb": round(sum(r["pss"] for r in reports) / 2**20, 2)
+    }
+
+
+def select_latency(pools, runs, k):
+    latencies = []
+    for i in range(runs):
+        pool = pools[EMOTIONS[i % len(EMOTIONS)]]
+        started = time.perf_counter()
+        pool.select(k)
+        latencies.append((time.perf_counter() - started) * 1e6)
+    return {"p50_us": round(percentile(latencies, 50), 1), "p95_us": round(percentile(latencies, 95), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark memory-mapped track pool snapshots")
+    parser.add_argument("--tracks", type=int, default=2000, help="candidates per emotion pool")
+    parser.add_argument("--workers", type=int, default=4, help="worker processes holding the pools")
+    parser.add_argument("--runs", type=int, default=500, help="selections per latency scenario")
+    args = parser.parse_args()
+
+    pools = make_pools(args.tracks)
+    path = os.path.join(tempfile.mkdtemp(prefix="moodstream-pools-"), "pools.bin")
+    started = time.perf_counter()
+    size = write_pool_snapshot(path, pools)
+    write_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    mapped, _ = read_pool_snapshot(path)
+    map_ms = (time.perf_counter() - started) * 1000
+
+    identical = all(
+        [track.id for track in pools[emotion].select(50, novelty=0)] ==
+        [track.id for track in mapped[emotion].select(50, novelty=0)]
+        for emotion in EMOTIONS
+    )
+
+    report = {
+        "benchmark": "pool_snapshot",
+        "config": vars(args),
+        "snapshot": {
+            "write_ms": round(write_ms, 2),
+            "map_ms": round(map_ms, 3),
+            "bytes": size,
+            "bytes_per_track": round(size / (args.tracks * len(EMOTIONS)), 1),
+            "identical_selections": identical
+        },
+        "select_top_10": {
+            "in_memory": select_latency(pools, args.runs, 10),
+            "mapped": select_latency(mapped, args.runs, 10)
+        },
+        "select_top_50": {
+            "in_memory": select_latency(pools, args.runs, 50),
+            "mapped": select_latency(mapped, args.runs, 50)
+        }
+    }
+    del pools, mapped
+    report["worker_memory"] = {
+        "in_memory": worker_memory("in_memory", path, args.tracks, args.workers),
+        "mapped": worker_memory("mapped", path, args.tracks, args.workers)
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
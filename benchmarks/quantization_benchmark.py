@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+MoodStream Int8 Quantization Benchmark
+
+Quantizes the emotion model with int8_inference, calibrating on part of a
+local image directory and evaluating on the rest (or on seeded noise when
+no images are given), and reports JSON:
+
+- accuracy delta against the float NumPy model on the held-out crops:
+  top-1 agreement, the top-1 confidence shift and the max/mean absolute
+  probability difference, for calibrated and dynamic input scales;
+- single-crop latency and batch throughput of the float and int8 models;
+- bytes held by each model's weights and the size of the saved .npz.
+
+Usage:
+    python benchmarks/quantization_benchmark.py --images benchmarks/recordings/frames
+    python benchmarks/quantization_benchmark.py --images DIR --calibration 32 --runs 500
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+import int8_inference
+import numpy_inference
+from inference_benchmark import percentile, sample_crops
+
+
+def accuracy_delta(expected, actual):
+    top1 = expected.argmax(axis=1)
+    diff = np.abs(expected - actual)
+    return {
+        "top1_agreement": round(float((top1 == actual.argmax(axis=1)).mean()), 4),
+        "top1_confidence_shift": round(float(np.abs(
+            expected[np.arange(len(top1)), top1] - actual[np.arange(len(top1)), top1]).mean()), 5),
+        "max_abs_diff": round(float(diff.max()), 5),
+        "mean_abs_diff": round(float(diff.mean()), 6)
+    }
+
+
+def latency(model, crops, runs, batch_size):
+    single = crops[:1]
+    model.predict(single)  # warm-up
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        model.predict(single)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    batch = crops[:batch_size]
+    batch_runs = max(1, runs // 10)
+    started = time.perf_counter()
+    for _ in range(batch_runs):
+        model.predict(batch)
+    batch_seconds = time.perf_counter() - started
+    return {
+        "single_p50_ms": round(percentile(latencies, 50), 3),
+        "single_p95_ms": round(percentile(latencies, 95), 3),
+        "batch_throughput_per_second": round(batch_runs * len(batch) / batch_seconds, 1)
+    }
+
+
+def float_weight_bytes(model):
+    return sum(getattr(layer, name).nbytes for layer in model.layers for name in ("kernel", "bias")
+               if isinstance(getattr(layer, name, None), np.ndarray))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark int8 quantization of the emotion model")
+    parser.add_argument("--images", help="directory of face images or webcam frames")
+    parser.add_argument("--calibration", type=int, default=16, help="images used for calibration; the rest evaluate")
+    parser.add_argument("--samples", type=int, default=256, help="evaluation crops when no images are given")
+    parser.add_argument("--runs", type=int, default=200, help="single-crop predictions per model")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    with open(os.getenv("EMOTION_MODEL_JSON", "emotion_model.json")) as json_file:
+        model_json = json_file.read()
+    weights = numpy_inference.load_weight_arrays(os.getenv("EMOTION_MODEL_WEIGHTS", "emotion_model.weights.h5"))
+
+    if args.images:
+        crops = int8_inference.load_calibration_crops(args.images, limit=10 ** 6)
+        if len(crops) <= args.calibration:
+            parser.error(f"need more than {args.calibration} images, found {len(crops)}")
+        calibration, evaluation = crops[:args.calibration], crops[args.calibration:]
+    else:
+        calibration = sample_crops(args.calibration, seed=1)
+        evaluation = sample_crops(args.samples, seed=2)
+
+    float_model = numpy_inference.model_from_json(model_json)
+    float_model.set_weights(weights)
+    dynamic_model = int8_inference.model_from_json(model_json)
+    dynamic_model.set_weights(weights)
+    int8_model = int8_inference.model_from_json(model_json)
+    int8_model.set_weights(weights)
+    int8_model.calibrate(calibration)
+
+    path = os.path.join(tempfile.mkdtemp(prefix="moodstream-int8-"), "emotion_model.int8.npz")
+    int8_model.save_quantized(path)
+    saved_model = int8_inference.model_from_json(model_json)
+    saved_model.load_weights(path)  # the serving path: int8 weights only
+
+    expected = float_model.predict(evaluation)
+    report = {
+        "benchmark": "quantization",
+        "config": vars(args),
+        "calibration_crops": len(calibration),
+        "evaluation_crops": len(evaluation),
+        "accuracy_delta": {
+            "calibrated": accuracy_delta(expected, saved_model.predict(evaluation)),
+            "dynamic": accuracy_delta(expected, dynamic_model.predict(evaluation))
+        },
+        "latency": {
+            "float": latency(float_model, evaluation, args.runs, args.batch_size),
+            "int8": latency(saved_model, evaluation, args.runs, args.batch_size)
+        },
+        "weights": {
+            "float_bytes": float_weight_bytes(float_model),
+            "int8_bytes": saved_model.weight_bytes(),
+            "float_h5_file_bytes": os.path.getsize(os.getenv("EMOTION_MODEL_WEIGHTS", "emotion_model.weights.h5")),
+            "int8_npz_file_bytes": os.path.getsize(path)
+        }
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
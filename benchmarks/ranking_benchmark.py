@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+MoodStream Ranking Benchmark
+
+Ranks synthetic candidate pools (tracks shaped like the fake Spotify API's,
+found by an emotion's search terms) with the original popularity sort and
+slice and with ranking.CandidateSet's vectorized MMR selection. Reports
+JSON: index build time, per-selection latency and how many selected
+tracks repeat an artist picked before them.
+
+Usage:
+    python benchmarks/ranking_benchmark.py
+    python benchmarks/ranking_benchmark.py --candidates 50000 --runs 500
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_spotify import make_track
+from inference_benchmark import percentile
+from ranking import CandidateSet, keyword_weights
+from tracks import Track
+
+PROFILE = {
+    "genres": ["pop", "dance", "funk", "disco", "electronic", "reggae"],
+    "moods": ["upbeat", "joyful", "celebration", "energetic", "festive", "cheerful"],
+    "descriptors": ["bright", "optimistic", "vibrant", "bouncy", "lively"],
+    "styles": ["party", "wedding", "festival", "dance", "uplifting"]
+}
+SEARCH_TERMS = [f"{genre} bollywood hindi" for genre in PROFILE["genres"][:3]] + \
+               [f"{mood} hindi songs" for mood in PROFILE["moods"][:3]] + \
+               ["popular bollywood hits", "trending indian songs"]
+
+
+def make_candidates(count, seed=0):
+    rng = random.Random(seed)
+    candidates = []
+    for index in range(count):
+        candidates.append(Track.from_spotify(make_track(index), rng.choice(SEARCH_TERMS)))
+    return candidates
+
+
+def legacy_select(tracks, k):
+    """
+    The original phase 2: sort by popularity, top 6 plus 4 from the next 9
+    (extended to k for the full list).
+    """
+    ranked = sorted(tracks, key=lambda x: x.popularity, reverse=True)
+    if k <= 10:
+        return ranked[:6] + ranked[6:15][:4]
+    return ranked[:k]
+
+
+def repeated_artists(tracks):
+    seen = set()
+    repeats = 0
+    for track in tracks:
+        artists = set(track.artists)
+        repeats += bool(artists & seen)
+        seen |= artists
+    return repeats
+
+
+def measure(fn, runs):
+    latencies = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        latencies.append((time.perf_counter() - started) * 1e6)
+    return {
+        "p50_us": round(percentile(latencies, 50), 1),
+        "p95_us": round(percentile(latencies, 95), 1),
+        "repeated_artist_tracks": repeated_artists(result)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark candidate ranking and diversity")
+    parser.add_argument("--candidates", type=int, default=10000, help="candidate tracks in the pool")
+    parser.add_argument("--runs", type=int, default=200, help="selections per scenario")
+    args = parser.parse_args()
+
+    tracks = make_candidates(args.candidates)
+    started = time.perf_counter()
+    candidates = CandidateSet(tracks, keyword_weights(PROFILE))
+    build_ms = (time.perf_counter() - started) * 1000
+
+    report = {
+        "benchmark": "ranking",
+        "candidates": args.candidates,
+        "index_build_ms": round(build_ms, 3),
+        "select": {}
+    }
+    for k in (10, 50):
+        report["select"][f"top_{k}"] = {
+            "legacy_sort": measure(lambda: legacy_select(tracks, k), args.runs),
+            "mmr": measure(lambda: candidates.select(k), args.runs),
+            "mmr_no_novelty": measure(lambda: candidates.select(k, novelty=0), args.runs)
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+MoodStream Frame Recorder
+
+Records webcam frames once so the benchmarks can replay the same faces
+offline: writes numbered JPEGs to a directory and/or an MP4 video, at the
+camera's native resolution.
+
+Usage:
+    python benchmarks/record_frames.py --images benchmarks/recordings/frames --frames 120
+    python benchmarks/record_frames.py --video benchmarks/recordings/session.mp4 --frames 300
+"""
+
+import argparse
+import os
+import sys
+
+import cv2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record webcam frames for offline benchmarks")
+    parser.add_argument("--camera", type=int, default=0, help="camera index")
+    parser.add_argument("--frames", type=int, default=120, help="frames to record")
+    parser.add_argument("--images", help="directory to write JPEG frames to")
+    parser.add_argument("--video", help="MP4 file to write")
+    parser.add_argument("--fps", type=float, default=15.0, help="frame rate stored in the video")
+    args = parser.parse_args()
+
+    if not args.images and not args.video:
+        parser.error("give --images and/or --video")
+
+    cap = cv2.VideoCapture(args.camera)
+    if not cap.isOpened():
+        print("Could not open camera", file=sys.stderr)
+        return 1
+
+    writer = None
+    if args.images:
+        os.makedirs(args.images, exist_ok=True)
+
+    recorded = 0
+    try:
+        while recorded < args.frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if args.images:
+                cv2.imwrite(os.path.join(args.images, f"frame_{recorded:05d}.jpg"), frame)
+            if args.video:
+                if writer is None:
+                    height, width = frame.shape[:2]
+                    writer = cv2.VideoWriter(args.video, cv2.VideoWriter_fourcc(*"mp4v"), args.fps, (width, height))
+                writer.write(frame)
+            recorded += 1
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+
+    print(f"Recorded {recorded} frames")
+    return 0 if recorded else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
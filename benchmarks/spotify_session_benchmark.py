@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+MoodStream Spotify Session Benchmark
+
+Runs against the fake Spotify API (benchmarks/fake_spotify.py) and reports
+JSON for two questions:
+
+- connections: rounds of concurrent searches (one recommendation's worth,
+  fanned out over SEARCH_CONCURRENCY threads like search_many) with
+  spotipy's default session and with spotify_limiter.spotify_session().
+  Counts the TCP connections the server accepted and the search latency;
+  --connect-latency-ms stands in for the TLS handshake.
+- tokens: several worker processes starting cold and searching, with
+  spotipy's SpotifyClientCredentials and its (unlocked) cache file, and
+  with spotify_auth.SharedClientCredentials over one locked cache file.
+  Counts the token requests the server answered.
+
+Usage:
+    python benchmarks/spotify_session_benchmark.py
+    python benchmarks/spotify_session_benchmark.py --rounds 20 --connect-latency-ms 60 --workers 8
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_spotify import FakeSpotifyServer
+from inference_benchmark import percentile
+
+
+def search_rounds(server, session, rounds, searches, concurrency):
+    """
+    Run rounds of concurrent searches over one client and return per-search
+    latencies (ms) and the connections the server accepted meanwhile.
+    """
+    sp = server.client(session=session)
+    connections_before = server.stats()["connections"]
+    latencies = []
+
+    def search(query):
+        started = time.perf_counter()
+        sp.search(q=query, limit=10, type="track", market="IN")
+        return (time.perf_counter() - started) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for round_index in range(rounds):
+            queries = [f"round {round_index} query {i}" for i in range(searches)]
+            latencies.extend(pool.map(search, queries))
+
+    return {
+        "connections": server.stats()["connections"] - connections_before,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 3),
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3)
+        }
+    }
+
+
+def cold_worker(server_url, shared, cache_path, searches):
+    """
+    One freshly started worker: build the client and run a few searches.
+    """
+    from spotipy.cache_handler import CacheFileHandler
+    from spotipy.oauth2 import SpotifyClientCredentials
+
+    from spotify_auth import SharedClientCredentials
+    from spotify_limiter import spotify_session
+
+    session = spotify_session()
+    if shared:
+        auth_manager = SharedClientCredentials(client_id="offline-benchmark", client_secret="offline-benchmark",
+                                               cache_path=cache_path, requests_session=session)
+    else:
+        auth_manager = SpotifyClientCredentials(client_id="offline-benchmark", client_secret="offline-benchmark",
+                                                cache_handler=CacheFileHandler(cache_path), requests_session=session)
+    auth_manager.OAUTH_TOKEN_URL = server_url + "/api/token"
+
+    import spotipy
+    sp = spotipy.Spotify(auth_manager=auth_manager, requests_session=session)
+    sp.prefix = server_url + "/v1/"
+    for i in range(searches):
+        sp.search(q=f"cold worker query {i}", limit=10, type="track", market="IN")
+
+
+def token_requests(server, workers, searches, shared):
+    cache_dir = tempfile.mkdtemp(prefix="moodstream-token-")
+    cache_path = os.path.join(cache_dir, "spotify-token.json")
+    tokens_before = server.stats()["tokens"]
+    processes = [
+        multiprocessing.Process(target=cold_worker, args=(server.url, shared, cache_path, searches))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return server.stats()["tokens"] - tokens_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Spotify connection pooling and token sharing")
+    parser.add_argument("--rounds", type=int, default=10, help="rounds of concurrent searches")
+    parser.add_argument("--searches", type=int, default=26, help="searches per round (one full-list recommendation)")
+    parser.add_argument("--concurrency", type=int, default=16, help="threads issuing searches")
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="fake Spotify API latency")
+    parser.add_argument("--connect-latency-ms", type=float, default=30.0, help="extra delay per new connection")
+    parser.add_argument("--workers", type=int, default=4, help="cold worker processes for the token test")
+    args = parser.parse_args()
+
+    import requests
+
+    from spotify_limiter import spotify_session
+
+    server = FakeSpotifyServer(latency_ms=args.latency_ms, jitter_ms=0,
+                               connect_latency_ms=args.connect_latency_ms).start()
+    try:
+        default = search_rounds(server, requests.Session(), args.rounds, args.searches, args.concurrency)
+        pooled = search_rounds(server, spotify_session(pool_size=args.concurrency), args.rounds, args.searches,
+                               args.concurrency)
+        tokens_default = token_requests(server, args.workers, 3, shared=False)
+        tokens_shared = token_requests(server, args.workers, 3, shared=True)
+    finally:
+        server.stop()
+
+    print(json.dumps({
+        "benchmark": "spotify_session",
+        "config": vars(args),
+        "connections": {
+            "default_session": default,
+            "pooled_session": pooled
+        },
+        "token_requests": {
+            "unlocked_file_cache": tokens_default,
+            "shared_token_cache": tokens_shared
+        }
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+MoodStream Track Memory Benchmark
+
+Builds per-emotion candidate pools from freshly parsed search responses
+(shaped like the fake Spotify API's, so strings are not shared the way
+literals would be) and measures with tracemalloc how many bytes each
+cached track keeps alive: as the original dicts and as tracks.Track
+records, plus the ranking index (ranking.CandidateSet) on top. Also times
+building the response rows. Reports JSON.
+
+Usage:
+    python benchmarks/track_memory_benchmark.py
+    python benchmarks/track_memory_benchmark.py --tracks 5000 --emotions 7
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_spotify import FakeSpotifyServer
+from ranking import CandidateSet
+from tracks import Track
+
+SEARCHES_PER_POOL = 26  # one pool build runs every search combination of a profile
+EMOTIONS = ["angry", "disgust", "anxious", "happy", "sad", "surprise", "relaxed"]
+
+
+def search_responses(server, emotion, tracks):
+    """
+    Parsed JSON responses for an emotion's searches, tracks spread over them.
+    """
+    per_search = max(1, tracks // SEARCHES_PER_POOL)
+    responses = []
+    for i in range(SEARCHES_PER_POOL):
+        term = f"{emotion} mood {i % 9} hindi songs"
+        body = json.dumps(server.search_results(f"{emotion} {i}", per_search, offset=i * per_search))
+        responses.append((term, json.loads(body)))
+    return responses
+
+
+def legacy_pool(responses):
+    pool = []
+    for search_term, results in responses:
+        for track in results['tracks']['items']:
+            pool.append({
+                'name': track['name'],
+                'url': track['external_urls']['spotify'],
+                'id': track['id'],
+                'artists': [artist['name'] for artist in track['artists']],
+                'popularity': track['popularity'],
+                'search_term': search_term
+            })
+    return pool
+
+
+def compact_pool(responses):
+    return [Track.from_spotify(track, search_term) for search_term, results in responses
+            for track in results['tracks']['items']]
+
+
+def retained_bytes(build, inputs):
+    """
+    Bytes still allocated by build()'s result once its inputs are dropped.
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = [build(responses) for responses in inputs]
+    inputs.clear()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark memory per cached track")
+    parser.add_argument("--tracks", type=int, default=2000, help="candidates per emotion pool")
+    parser.add_argument("--emotions", type=int, default=7, help="emotion pools")
+    args = parser.parse_args()
+
+    server = FakeSpotifyServer()  # only used to shape responses, never started
+    emotions = EMOTIONS[:args.emotions]
+
+    def inputs():
+        return [search_responses(server, emotion, args.tracks) for emotion in emotions]
+
+    legacy_bytes, legacy = retained_bytes(legacy_pool, inputs())
+    compact_bytes, compact = retained_bytes(compact_pool, inputs())
+    count = sum(len(pool) for pool in compact)
+
+    gc.collect()
+    tracemalloc.start()
+    indexed = [CandidateSet(pool) for pool in compact]
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    rows = compact[0][:50]
+    started = time.perf_counter()
+    for _ in range(1000):
+        [track.full_row() for track in rows]
+    full_rows_us = (time.perf_counter() - started) * 1000
+
+    server.httpd.server_close()
+    print(json.dumps({
+        "benchmark": "track_memory",
+        "pools": len(emotions),
+        "tracks": count,
+        "bytes_per_track": {
+            "dict": round(legacy_bytes / count, 1),
+            "track_record": round(compact_bytes / count, 1),
+            "ranking_index": round(index_bytes / count, 1)
+        },
+        "reduction": round(legacy_bytes / compact_bytes, 2),
+        "full_rows_50_us": round(full_rows_us, 2),
+        "retained": len(legacy) + len(indexed)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Background email delivery over pooled SMTP connections, with jobs tracked in the shared state database.
+"""
+import json
+import os
+import queue
+import smtplib
+import threading
+import time
+import uuid
+
+from metrics import registry
+from shared_state import SHARED_STATE_PATH, SharedStateDB
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", 30))
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 2))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 3))
+EMAIL_RETRY_BACKOFF = float(os.getenv("EMAIL_RETRY_BACKOFF", 2))  # seconds, doubled after each failure
+EMAIL_JOB_HISTORY = int(os.getenv("EMAIL_JOB_HISTORY", 1000))  # finished jobs kept for status lookups
+# Unfinished jobs untouched this long were left by a worker that exited
+EMAIL_JOB_STALE_SECONDS = float(os.getenv("EMAIL_JOB_STALE_SECONDS", 10 * SMTP_TIMEOUT))
+
+JOB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS email_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    details TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_email_jobs_status_created ON email_jobs(status, created_at);
+"""
+JOB_FIELDS = ("status", "recipient", "attempts", "error", "created_at", "updated_at")
+
+SMTP_SEND_LATENCY = registry.histogram(
+    "moodstream_smtp_send_seconds", "SMTP send time including connection checkout", ("outcome",))
+SMTP_CONNECTS = registry.counter("moodstream_smtp_connections_total", "SMTP connections opened")
+EMAIL_JOBS = registry.counter("moodstream_email_jobs_total", "Finished email jobs by final status", ("status",))
+
+
+class SMTPConnectionPool:
+    """
+    Keeps up to size authenticated SMTP connections open for reuse.
+    """
+
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, username=None, password=None,
+                 starttls=SMTP_STARTTLS, size=SMTP_POOL_SIZE, timeout=SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        SMTP_CONNECTS.inc()
+        return server
+
+    def acquire(self):
+        """
+        Return an idle connection that still answers NOOP, or a new one.
+        """
+        while True:
+            try:
+                server = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self.discard(server)
+
+    def release(self, server):
+        try:
+            self._idle.put_nowait(server)
+        except queue.Full:
+            self.discard(server)
+
+    def discard(self, server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def sendmail(self, sender, recipient, message):
+        """
+        Send message text over a pooled connection. The connection goes back
+        to the pool on success or a refused recipient (once RSET confirms it
+        is still usable), and is dropped on any other error since it may be
+        half-closed or unauthenticated.
+        """
+        started = time.perf_counter()
+        outcome = "error"
+        server = None
+        try:
+            server = self.acquire()
+            server.sendmail(sender, recipient, message)
+            outcome = "ok"
+            self.release(server)
+        except smtplib.SMTPRecipientsRefused:
+            outcome = "refused"
+            try:
+                server.rset()
+            except Exception:
+                self.discard(server)
+            else:
+                self.release(server)
+            raise
+        except Exception:
+            if server is not None:
+                self.discard(server)
+            raise
+        finally:
+            SMTP_SEND_LATENCY.observe(time.perf_counter() - started, outcome=outcome)
+
+    def close(self):
+        while True:
+            try:
+                self.discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+class EmailQueue:
+    """
+    Background delivery queue; send jobs are tracked by id in the shared
+    job table.
+    """
+
+    def __init__(self, pool, sender, workers=SMTP_POOL_SIZE, max_attempts=EMAIL_MAX_ATTEMPTS,
+                 backoff=EMAIL_RETRY_BACKOFF, history=EMAIL_JOB_HISTORY, stale_after=EMAIL_JOB_STALE_SECONDS,
+                 path=SHARED_STATE_PATH):
+        self.pool = pool
+        self.sender = sender
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.history = history
+        self.stale_after = stale_after
+        self.db = SharedStateDB(path, JOB_SCHEMA)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            with self.db.connect() as conn:
+                self._fail_stale(conn)
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"email-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def enqueue(self, recipient, build_message, **details):
+        """
+        Queue a message for recipient and return its job id. build_message is
+        called on the worker thread and must return an email.message.Message
+        or an already serialized message.
+        """
+        self.start()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self.db.connect() as conn:
+            conn.execute(
+                "INSERT INTO email_jobs (id, status, recipient, attempts, error, details, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, 0, NULL, ?, ?, ?)",
+                (job_id, recipient, json.dumps(details), now, now)
+            )
+            self._fail_stale(conn)
+            self._trim(conn)
+        self._queue.put((job_id, recipient, build_message))
+        return job_id
+
+    def status(self, job_id):
+        row = self.db.connect().execute("SELECT * FROM email_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {"id": row["id"], **{field: row[field] for field in JOB_FIELDS}, **json.loads(row["details"])}
+
+    def _update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{field} = ?" for field in fields)
+        with self.db.connect() as conn:
+            conn.execute(f"UPDATE email_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _fail_stale(self, conn):
+        # Jobs live in the memory of the worker that queued them; a worker
+        # refreshes updated_at on every attempt, so one that has not for
+        # stale_after seconds died with the job
+        now = time.time()
+        failed = conn.execute(
+            "UPDATE email_jobs SET status = 'failed', error = 'abandoned by a stopped worker', updated_at = ? "
+            "WHERE status IN ('queued', 'sending') AND updated_at < ?",
+            (now, now - self.stale_after)
+        ).rowcount
+        if failed:
+            print(f"Marked {failed} abandoned email jobs as failed")
+            EMAIL_JOBS.inc(failed, status="failed")
+
+    def _trim(self, conn):
+        # Drop the oldest finished jobs once the history bound is exceeded
+        total = conn.execute("SELECT COUNT(*) FROM email_jobs").fetchone()[0]
+        if total > self.history:
+            conn.execute(
+                "DELETE FROM email_jobs WHERE id IN (SELECT id FROM email_jobs "
+                "WHERE status IN ('sent', 'failed') ORDER BY created_at LIMIT ?)",
+                (total - self.history,)
+            )
+
+    def _run(self):
+        while True:
+            job_id, recipient, build_message = self._queue.get()
+            try:
+                self._deliver(job_id, recipient, build_message)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, job_id, recipient, build_message):
+        try:
+            message = build_message()
+            if not isinstance(message, (str, bytes)):
+                message = message.as_bytes()
+        except Exception as e:
+            print(f"Failed to build email for {recipient}: {e}")
+            self._update(job_id, status="failed", error=str(e))
+            EMAIL_JOBS.inc(status="failed")
+            return
+
+        for attempt in range(1, self.max_attempts + 1):
+            self._update(job_id, status="sending", attempts=attempt)
+            try:
+                self.pool.sendmail(self.sender, recipient, message)
+                self._update(job_id, status="sent", error=None)
+                EMAIL_JOBS.inc(status="sent")
+                print(f"Email sent successfully to {recipient}")
+                return
+            except smtplib.SMTPRecipientsRefused as e:
+                # Permanent: the connection is fine, the address is not
+                print(f"Email to {recipient} refused: {e}")
+                self._update(job_id, status="failed", error=str(e))
+                EMAIL_JOBS.inc(status="failed")
+                return
+            except smtplib.SMTPAuthenticationError as e:
+                # Permanent: retrying with the same credentials cannot succeed
+                print(f"Email to {recipient} failed, SMTP login rejected: {e}")
+                self._update(job_id, status="failed", error=str(e))
+                EMAIL_JOBS.inc(status="failed")
+                return
+            except Exception as e:
+                print(f"Email attempt {attempt} to {recipient} failed: {e}")
+                self._update(job_id, error=str(e))
+                if attempt < self.max_attempts:
+                    time.sleep(self.backoff * 2 ** (attempt - 1))
+
+        self._update(job_id, status="failed")
+        EMAIL_JOBS.inc(status="failed")
+
+    def stats(self):
+        counts = dict(self.db.connect().execute("SELECT status, COUNT(*) FROM email_jobs GROUP BY status").fetchall())
+        return {
+            "queued": self._queue.qsize(),
+            "workers": len(self._threads),
+            "jobs": {status: counts.get(status, 0) for status in ("queued", "sending", "sent", "failed")}
+        }
+
+    def join(self):
+        """
+        Block until every queued job has finished (used by benchmarks).
+        """
+        self._queue.join()
@@ -0,0 +1,114 @@
+"""
+Playlist email rendering from precompiled templates, with a cache of rendered bodies.
+"""
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from email.message import EmailMessage
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+EMAIL_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "email")
+EMAIL_RENDER_CACHE_SIZE = int(os.getenv("EMAIL_RENDER_CACHE_SIZE", 256))  # rendered playlists kept
+EMAIL_PREVIEW_SONGS = 5  # songs listed in the email body
+
+
+def playlist_hash(songs_list):
+    """
+    Stable digest of a playlist's songs, used as part of the cache key.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for song in songs_list:
+        digest.update("\x1f".join(str(field) for field in song).encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+class PlaylistEmailRenderer:
+    """
+    Renders playlist emails from precompiled templates with an LRU cache of
+    rendered bodies.
+    """
+
+    def __init__(self, template_dir=EMAIL_TEMPLATE_DIR, cache_size=EMAIL_RENDER_CACHE_SIZE):
+        env = Environment(
+            loader=FileSystemLoader(template_dir),
+            autoescape=select_autoescape(["html"]),
+            trim_blocks=True,
+            lstrip_blocks=True
+        )
+        self.html_template = env.get_template("playlist.html")
+        self.text_template = env.get_template("playlist.txt")
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def render_body(self, emotion, songs_list, playlist_url):
+        """
+        Return the multipart/alternative body (plain text and HTML) for a
+        playlist, from the cache when the same playlist was rendered this
+        minute. The returned message is shared and must not be modified.
+        """
+        generated_at = datetime.now().strftime("%B %d, %Y at %I:%M %p")
+        key = (emotion, playlist_hash(songs_list))
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] == generated_at:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        context = {
+            "emotion": emotion,
+            "songs": songs_list,
+            "playlist_url": playlist_url,
+            "generated_at": generated_at,
+            "preview": EMAIL_PREVIEW_SONGS
+        }
+        rendered = EmailMessage()
+        rendered.set_content(self.text_template.render(context), cte="base64")
+        rendered.add_alternative(self.html_template.render(context), subtype="html", cte="base64")
+        # Fixed once so serializing a message does not search the parts for
+        # a free one; base64 lines can never contain it
+        rendered.set_boundary(f"==============={uuid.uuid4().hex}==")
+
+        with self._lock:
+            self._cache[key] = (generated_at, rendered)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return rendered
+
+    def render_message(self, sender, recipient, emotion, songs_list, playlist_url):
+        """
+        Return the playlist email for one recipient as a multipart/alternative
+        EmailMessage; send it with as_bytes().
+        """
+        body = self.render_body(emotion, songs_list, playlist_url)
+        msg = EmailMessage()
+        msg["Subject"] = f"🎵 Your {emotion.title()} Playlist from MoodStream"
+        msg["From"] = sender or ""
+        msg["To"] = recipient
+        # The parts are the cached ones; parsed headers are reused as is
+        for name, value in body.items():
+            msg[name] = value
+        msg.set_payload(body.get_payload())
+        return msg
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._cache),
+                "max_entries": self.cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
@@ -1,57 +1,399 @@
+import time
+_import_started = time.perf_counter()
+
+import os
+import threading
 import cv2
 import numpy as np
-from keras import models
+import binascii
 from base64 import b64decode
 import execjs
+from batch_inference import MicroBatcher
+from face_detection import FaceTracker, StageTimer, detect_faces
+from metrics import registry
+from model_server import EMOTION_MODEL_FALLBACK, EMOTION_MODEL_SERVER, ModelClient
 
 emotion_dict = {0: "Angry", 1: "Disgust", 2: "Anxious", 3: "Happy", 4: "Sad", 5: "Surprise", 6: "Relaxed"}
 
-with open('./emotion_model.json', 'r') as json_file:
-    loaded_model_json = json_file.read()
+MODEL_JSON_PATH = os.getenv("EMOTION_MODEL_JSON", "./emotion_model.json")
+MODEL_WEIGHTS_PATH = os.getenv("EMOTION_MODEL_WEIGHTS", "./emotion_model.weights.h5")
 
-emotion_model = models.model_from_json(loaded_model_json)
-emotion_model.load_weights('./emotion_model.weights.h5')
-print("Emotion model loaded successfully!")
-def detect_emotion():
-    cap = cv2.VideoCapture(0)
-    maxindex = 3  # Default to "Happy" if no face detected
-    face_detected = False
-    
-    # Try to capture and analyze a few frames
-    for attempt in range(30):  # Try for ~1 second at 30fps
-        ret, frame = cap.read()
-        if not ret:
-            continue
-            
-        frame = cv2.resize(frame, (1280, 720))
-        face_detector = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-        # detect faces available on camera
-        num_faces = face_detector.detectMultiScale(gray_frame, scaleFactor=1.3, minNeighbors=5)
-
-        # take each face available on the camera and Preprocess it
-        for (x, y, w, h) in num_faces:
-            cv2.rectangle(frame, (x, y-50), (x+w, y+h+10), (0, 255, 0), 4)
-            roi_gray_frame = gray_frame[y:y + h, x:x + w]
-            cropped_img = np.expand_dims(np.expand_dims(cv2.resize(roi_gray_frame, (48, 48)), -1), 0)
-
-            # predict the emotions
-            emotion_prediction = emotion_model.predict(cropped_img, verbose=0)
-            maxindex = int(np.argmax(emotion_prediction))
-            cv2.putText(frame, emotion_dict[maxindex], (x+5, y-20), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2, cv2.LINE_AA)
-            face_detected = True
-            break  # Use first detected face
-
-        cv2.imshow('Emotion Detection', frame)
-        cv2.waitKey(1)  # Non-blocking wait
-        
-        if face_detected:
+# Inference backend: "keras" (TensorFlow) or "numpy" (numpy_inference, no TensorFlow needed)
+EMOTION_BACKEND = os.getenv("EMOTION_BACKEND", "keras").lower()
+
+# Batch crops from concurrent requests into one forward pass; off by default
+# with a model server, which batches across workers itself
+EMOTION_MICROBATCH = os.getenv("EMOTION_MICROBATCH", "0" if EMOTION_MODEL_SERVER else "1") == "1"
+
+# Multi-frame aggregation: stop once the smoothed confidence passes the
+# threshold, or when the frame or time budget runs out
+EMOTION_MAX_FRAMES = int(os.getenv("EMOTION_MAX_FRAMES", 30))
+EMOTION_EMA_ALPHA = float(os.getenv("EMOTION_EMA_ALPHA", 0.5))
+EMOTION_CONFIDENCE_THRESHOLD = float(os.getenv("EMOTION_CONFIDENCE_THRESHOLD", 0.6))
+EMOTION_TIME_BUDGET_MS = float(os.getenv("EMOTION_TIME_BUDGET_MS", 1500))
+
+# The model is loaded on first use (TensorFlow import is expensive);
+# call preload_model() to load and warm it up eagerly instead
+emotion_model = None
+_model_lock = threading.Lock()
+
+# Timings (seconds) of module import and model loading
+startup_report = {
+    "module_import_seconds": None,
+    "backend": EMOTION_BACKEND,
+    "model_server": EMOTION_MODEL_SERVER or None,
+    "model_loaded": False,
+    "backend_import_seconds": None,
+    "model_build_seconds": None,
+    "weights_load_seconds": None,
+    "warmup_seconds": None
+}
+
+def _load_model():
+    started = time.perf_counter()
+    if EMOTION_BACKEND == "numpy":
+        import numpy_inference as models
+    else:
+        from keras import models
+    startup_report["backend_import_seconds"] = round(time.perf_counter() - started, 4)
+
+    started = time.perf_counter()
+    with open(MODEL_JSON_PATH, 'r') as json_file:
+        loaded_model_json = json_file.read()
+    model = models.model_from_json(loaded_model_json)
+    startup_report["model_build_seconds"] = round(time.perf_counter() - started, 4)
+
+    started = time.perf_counter()
+    model.load_weights(MODEL_WEIGHTS_PATH)
+    startup_report["weights_load_seconds"] = round(time.perf_counter() - started, 4)
+
+    startup_report["model_loaded"] = True
+    print(f"Emotion model loaded successfully! (backend: {EMOTION_BACKEND})")
+    return model
+
+def get_local_model():
+    """
+    Return the in-process emotion model, loading it on the first call (thread-safe).
+    """
+    global emotion_model
+    if emotion_model is None:
+        with _model_lock:
+            if emotion_model is None:
+                emotion_model = _load_model()
+    return emotion_model
+
+# With a model server (see model_server.py) the model stays out of this
+# process; it is only loaded here as the fallback when the server is down
+model_client = ModelClient(
+    EMOTION_MODEL_SERVER, fallback=get_local_model if EMOTION_MODEL_FALLBACK == "local" else None
+) if EMOTION_MODEL_SERVER else None
+
+def get_emotion_model():
+    """
+    Return the emotion model: the model server client when one is
+    configured, the in-process model otherwise.
+    """
+    if model_client is not None:
+        return model_client
+    return get_local_model()
+
+def preload_model(warmup=True):
+    """
+    Eagerly load the model, optionally running one dummy prediction so the
+    first real detection request does not pay graph/tracing setup costs.
+    With a model server, only check that it answers.
+    """
+    if model_client is not None:
+        try:
+            print(f"Emotion model server {EMOTION_MODEL_SERVER} answered in {model_client.ping() * 1000:.1f} ms")
+        except Exception as e:
+            print(f"Emotion model server {EMOTION_MODEL_SERVER} not reachable yet: {e}")
+        return model_client
+
+    model = get_emotion_model()
+    if warmup and startup_report["warmup_seconds"] is None:
+        started = time.perf_counter()
+        model.predict(np.zeros((1, 48, 48, 1), dtype=np.float32), verbose=0)
+        startup_report["warmup_seconds"] = round(time.perf_counter() - started, 4)
+    return model
+
+# Shared by all detection requests in this worker
+emotion_batcher = MicroBatcher(get_emotion_model)
+
+INFERENCE_LATENCY = registry.histogram(
+    "moodstream_emotion_inference_seconds", "Emotion model inference latency per request", ("path",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+
+@registry.collector
+def _collect_model_metrics():
+    yield ("moodstream_emotion_model_loaded", "gauge", "Whether the emotion model is loaded in this worker",
+           [({"backend": EMOTION_BACKEND}, startup_report["model_loaded"])])
+    yield ("moodstream_emotion_model_load_seconds", "gauge", "Emotion model load time by stage",
+           [({"stage": stage}, startup_report[f"{stage}_seconds"])
+            for stage in ("module_import", "backend_import", "model_build", "weights_load", "warmup")])
+
+def predict_emotion_proba(cropped_img):
+    """
+    Return the softmax probabilities for a (1, 48, 48, 1) face crop, going
+    through the micro-batcher when it is enabled.
+    """
+    if EMOTION_MICROBATCH:
+        with INFERENCE_LATENCY.time(path="microbatch"):
+            return emotion_batcher.predict_proba(cropped_img)
+    with INFERENCE_LATENCY.time(path="direct"):
+        return get_emotion_model().predict(cropped_img, verbose=0)[0]
+
+def predict_emotion(cropped_img):
+    """
+    Return the emotion index for a (1, 48, 48, 1) face crop.
+    """
+    return int(np.argmax(predict_emotion_proba(cropped_img)))
+
+def decode_frame(data):
+    """
+    Decode an uploaded JPEG/PNG frame into a BGR image.
+    Accepts raw bytes or a base64 data URL; the byte buffer is wrapped with
+    np.frombuffer (no copy) and handed straight to cv2.imdecode.
+    Returns None if the data is not a decodable image.
+    """
+    if isinstance(data, str):
+        encoded = data.split(",", 1)[1] if data.startswith("data:") else data
+        try:
+            data = b64decode(encoded)
+        except (binascii.Error, ValueError):
+            return None
+    if not data or not isinstance(data, (bytes, bytearray)):
+        return None
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+# Per-stage timings (decode, grayscale, detection, preprocessing, inference) across all requests
+pipeline_timer = StageTimer()
+
+def preprocess_face(gray_frame, box):
+    """
+    Crop a face box from a grayscale frame into a (1, 48, 48, 1) model input.
+    """
+    x, y, w, h = box
+    roi_gray_frame = gray_frame[y:y + h, x:x + w]
+    return np.expand_dims(np.expand_dims(cv2.resize(roi_gray_frame, (48, 48)), -1), 0)
+
+def crop_and_resize_faces(gray_frame, boxes, size=48):
+    """
+    Crop every face box and resize it to size x size in one vectorized
+    bilinear gather (matches cv2.resize INTER_LINEAR to within rounding).
+    Returns an (N, size, size, 1) uint8 batch.
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    x, y, w, h = boxes.T
+    steps = (np.arange(size, dtype=np.float32) + 0.5) / size
+
+    def sample_axis(start, length):
+        # Half-pixel-centered source coordinates, clamped to the box
+        last = start + length - 1
+        src = np.clip(start[:, None] + steps[None, :] * length[:, None] - 0.5, start[:, None], last[:, None])
+        low = np.floor(src).astype(np.intp)
+        high = np.minimum(low + 1, last.astype(np.intp)[:, None])
+        return low, high, (src - low).astype(np.float32)
+
+    y0, y1, wy = sample_axis(y, h)
+    x0, x1, wx = sample_axis(x, w)
+    wy, wx = wy[:, :, None], wx[:, None, :]
+    rows0, rows1 = y0[:, :, None], y1[:, :, None]
+    cols0, cols1 = x0[:, None, :], x1[:, None, :]
+
+    top = gray_frame[rows0, cols0] * (1 - wx) + gray_frame[rows0, cols1] * wx
+    bottom = gray_frame[rows1, cols0] * (1 - wx) + gray_frame[rows1, cols1] * wx
+    return np.rint(top * (1 - wy) + bottom * wy).astype(np.uint8)[..., None]
+
+def predict_group(gray_frame, boxes):
+    """
+    Run every face in a frame through the model as a single batch.
+    Returns per-face results and the group emotion (mean of the per-face
+    probabilities).
+    """
+    with pipeline_timer.stage("preprocess"):
+        crops = crop_and_resize_faces(gray_frame, boxes)
+    with pipeline_timer.stage("inference"), INFERENCE_LATENCY.time(path="group"):
+        probabilities = np.asarray(get_emotion_model().predict(crops, verbose=0), dtype=np.float32)
+
+    faces = []
+    for box, face_probabilities in zip(boxes, probabilities):
+        index = int(np.argmax(face_probabilities))
+        faces.append({
+            "box": [int(v) for v in box],
+            "emotion_index": index,
+            "emotion": emotion_dict[index],
+            "confidence": round(float(face_probabilities[index]), 4)
+        })
+
+    group_probabilities = probabilities.mean(axis=0)
+    group_index = int(np.argmax(group_probabilities))
+    return {
+        "faces": faces,
+        "emotion_index": group_index,
+        "emotion": emotion_dict[group_index],
+        "probabilities": {emotion_dict[i]: round(float(p), 4) for i, p in enumerate(group_probabilities)},
+        "confidence": round(float(group_probabilities[group_index]), 4)
+    }
+
+def detect_group_emotions(frames, max_frames=EMOTION_MAX_FRAMES):
+    """
+    Group mode for uploaded frames: picks the frame with the most faces and
+    returns predict_group() for it, or None if no frame contains a face.
+    """
+    best_gray, best_boxes = None, []
+    for frame_number, frame in enumerate(iter_uploaded_frames(frames)):
+        if frame_number >= max_frames:
             break
+        with pipeline_timer.stage("grayscale"):
+            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        with pipeline_timer.stage("detect_full"):
+            boxes = sorted(detect_faces(gray_frame), key=lambda box: box[0])  # Left to right
+        if len(boxes) > len(best_boxes):
+            best_gray, best_boxes = gray_frame, boxes
+
+    if not best_boxes:
+        return None
+    return predict_group(best_gray, best_boxes)
+
+def iter_uploaded_frames(frames):
+    """
+    Decode uploaded frames lazily, skipping any that are not valid images.
+    """
+    for data in frames:
+        with pipeline_timer.stage("decode"):
+            frame = decode_frame(data)
+        if frame is not None:
+            yield frame
+
+def iter_camera_frames(max_frames=EMOTION_MAX_FRAMES, show=True):
+    """
+    Yield frames from the local camera. When show is set, each frame is
+    displayed after the consumer has processed (and annotated) it.
+    """
+    cap = cv2.VideoCapture(0)
+    try:
+        for attempt in range(max_frames):
+            ret, frame = cap.read()
+            if not ret:
+                continue
+            yield frame
+            if show:
+                cv2.imshow('Emotion Detection', frame)
+                cv2.waitKey(1)  # Non-blocking wait
+    finally:
+        cap.release()
+        if show:
+            cv2.destroyAllWindows()
+
+def iter_face_probabilities(frames, annotate=False):
+    """
+    For each frame, yield the emotion probabilities of its first face, or
+    None when no face was found. Faces are tracked across frames.
+    """
+    tracker = FaceTracker(timer=pipeline_timer)
+    try:
+        for frame in frames:
+            with pipeline_timer.stage("grayscale"):
+                gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            num_faces = tracker.detect(gray_frame)
+            if not num_faces:
+                yield None
+                continue
+
+            x, y, w, h = num_faces[0]  # Use first detected face
+            with pipeline_timer.stage("preprocess"):
+                cropped_img = preprocess_face(gray_frame, (x, y, w, h))
+            with pipeline_timer.stage("inference"):
+                probabilities = np.asarray(predict_emotion_proba(cropped_img), dtype=np.float32)
+
+            if annotate:
+                cv2.rectangle(frame, (x, y-50), (x+w, y+h+10), (0, 255, 0), 4)
+                cv2.putText(frame, emotion_dict[int(np.argmax(probabilities))], (x+5, y-20),
+                            cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2, cv2.LINE_AA)
+            yield probabilities
+    finally:
+        close = getattr(frames, "close", None)
+        if close is not None:
+            close()  # Stop the frame source early (releases the camera)
+
+def aggregate_emotions(probability_stream, alpha=EMOTION_EMA_ALPHA,
+                       confidence_threshold=EMOTION_CONFIDENCE_THRESHOLD,
+                       time_budget_ms=EMOTION_TIME_BUDGET_MS, max_frames=EMOTION_MAX_FRAMES):
+    """
+    Smooth per-frame probabilities with an exponential moving average and
+    stop as soon as the top class passes confidence_threshold, or when the
+    time or frame budget runs out. Closing the stream stops the upstream
+    generators (and releases the camera).
+
+    Returns a dict with emotion_index (None if no face was seen), emotion,
+    probabilities, confidence, frames_used, faces_used, elapsed_ms and the
+    stop reason.
+    """
+    started = time.perf_counter()
+    smoothed = None
+    frames_used = 0
+    faces_used = 0
+    stop_reason = "frames_exhausted"
+
+    try:
+        for probabilities in probability_stream:
+            frames_used += 1
+            if probabilities is not None:
+                faces_used += 1
+                smoothed = probabilities if smoothed is None else alpha * probabilities + (1 - alpha) * smoothed
+                if smoothed.max() >= confidence_threshold:
+                    stop_reason = "confident"
+                    break
+            if (time.perf_counter() - started) * 1000 >= time_budget_ms:
+                stop_reason = "time_budget"
+                break
+            if frames_used >= max_frames:
+                stop_reason = "frame_budget"
+                break
+    finally:
+        close = getattr(probability_stream, "close", None)
+        if close is not None:
+            close()
+
+    emotion_index = int(np.argmax(smoothed)) if smoothed is not None else None
+    return {
+        "emotion_index": emotion_index,
+        "emotion": emotion_dict[emotion_index] if emotion_index is not None else None,
+        "probabilities": {emotion_dict[i]: round(float(p), 4) for i, p in enumerate(smoothed)} if smoothed is not None else None,
+        "confidence": round(float(smoothed.max()), 4) if smoothed is not None else 0.0,
+        "frames_used": frames_used,
+        "faces_used": faces_used,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        "stop_reason": stop_reason
+    }
+
+def detect_emotion_in_frames(frames):
+    """
+    Headless emotion detection over a burst of browser-uploaded frames.
+    Returns the aggregate_emotions() result; emotion_index is None if no
+    frame contains a face.
+    """
+    # Batches wait for this request's next crop only while it is running
+    with emotion_batcher.submitting():
+        return aggregate_emotions(iter_face_probabilities(iter_uploaded_frames(frames)))
+
+def detect_emotion_stream(show=True):
+    """
+    Detect emotion from the local camera, aggregating frames until the
+    result is confident or the budget runs out (see aggregate_emotions).
+    """
+    frames = iter_camera_frames(EMOTION_MAX_FRAMES, show=show)
+    return aggregate_emotions(iter_face_probabilities(frames, annotate=show))
+
+def detect_emotion():
+    """
+    Return the detected emotion index from the local camera, or None if no
+    face was seen.
+    """
+    return detect_emotion_stream()["emotion_index"]
 
-    cap.release()
-    cv2.destroyAllWindows()
-    return maxindex
+startup_report["module_import_seconds"] = round(time.perf_counter() - _import_started, 4)
 # def capture_frame():
 #     """
 #     Capture a frame using the webcam or another input source.
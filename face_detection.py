@@ -0,0 +1,140 @@
+"""
+Face detection stage: per-thread Haar cascades, downscaled detection and ROI tracking.
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import cv2
+
+CASCADE_PATH = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+FACE_MIN_SIZE = int(os.getenv("FACE_MIN_SIZE", 80))  # smallest face (full-resolution px) that must still be found
+CASCADE_WINDOW = 24  # detection window of the frontal face cascade
+FACE_ROI_MARGIN = float(os.getenv("FACE_ROI_MARGIN", 0.5))  # ROI padding around the last face, as a fraction of its size
+
+_local = threading.local()
+
+
+def get_face_detector():
+    """
+    Return this thread's cascade classifier, loading it on first use.
+    """
+    detector = getattr(_local, "detector", None)
+    if detector is None:
+        detector = cv2.CascadeClassifier(CASCADE_PATH)
+        _local.detector = detector
+    return detector
+
+
+def detection_scale(min_face_size=FACE_MIN_SIZE):
+    """
+    Downscale factor that maps min_face_size to twice the cascade window,
+    which keeps recall with the coarse scaleFactor of 1.3.
+    """
+    return min(1.0, CASCADE_WINDOW * 2 / float(min_face_size))
+
+
+def detect_faces(gray, scale=None, scale_factor=1.3, min_neighbors=5):
+    """
+    Detect faces on a downscaled copy of a grayscale image.
+    Returns (x, y, w, h) boxes in the coordinates of the input image.
+    """
+    height, width = gray.shape[:2]
+    if scale is None:
+        scale = detection_scale()
+    if scale < 1.0:
+        small = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+    else:
+        scale = 1.0
+        small = gray
+
+    boxes = get_face_detector().detectMultiScale(small, scaleFactor=scale_factor, minNeighbors=min_neighbors)
+    if len(boxes) == 0:
+        return []
+    return [(int(x / scale), int(y / scale), int(w / scale), int(h / scale)) for (x, y, w, h) in boxes]
+
+
+class StageTimer:
+    """
+    Accumulates wall-clock time per named pipeline stage (thread-safe).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = defaultdict(float)
+        self._counts = defaultdict(int)
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._totals[name] += elapsed
+                self._counts[name] += 1
+
+    def report(self):
+        with self._lock:
+            return {
+                name: {
+                    "calls": self._counts[name],
+                    "total_ms": round(self._totals[name] * 1000, 3),
+                    "mean_ms": round(self._totals[name] * 1000 / self._counts[name], 3)
+                }
+                for name in self._totals
+            }
+
+
+class FaceTracker:
+    """
+    Detects a face once on the full frame, then tracks it inside a region of
+    interest on subsequent frames of the same stream.
+    """
+
+    def __init__(self, min_face_size=FACE_MIN_SIZE, margin=FACE_ROI_MARGIN, timer=None):
+        self.min_face_size = min_face_size
+        self.margin = margin
+        self.timer = timer or StageTimer()
+        self.box = None
+        self.full_detections = 0
+        self.roi_detections = 0
+
+    def reset(self):
+        self.box = None
+
+    def detect(self, gray):
+        """
+        Return face boxes (full-resolution coordinates) for this frame.
+        """
+        scale = detection_scale(self.min_face_size)
+
+        if self.box is not None:
+            with self.timer.stage("detect_roi"):
+                faces = self._detect_in_roi(gray, scale)
+            self.roi_detections += 1
+            if faces:
+                self.box = faces[0]
+                return faces
+            self.box = None  # Lost the face, search the whole frame
+
+        with self.timer.stage("detect_full"):
+            faces = detect_faces(gray, scale)
+        self.full_detections += 1
+        self.box = faces[0] if faces else None
+        return faces
+
+    def _detect_in_roi(self, gray, scale):
+        height, width = gray.shape[:2]
+        x, y, w, h = self.box
+        pad_x, pad_y = int(w * self.margin), int(h * self.margin)
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        x1, y1 = min(width, x + w + pad_x), min(height, y + h + pad_y)
+
+        # Same scale as full-frame detection so the cascade sees the face at the same size
+        faces = detect_faces(gray[y0:y1, x0:x1], scale)
+        return [(fx + x0, fy + y0, fw, fh) for (fx, fy, fw, fh) in faces]
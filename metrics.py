@@ -0,0 +1,291 @@
+"""
+Prometheus counters, histograms and scrape-time collectors, optionally aggregated across processes.
+"""
+import atexit
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+METRICS_DIR = os.getenv("METRICS_DIR", "")  # directory where every process publishes its metrics; empty keeps them per process
+METRICS_PUBLISH_INTERVAL = float(os.getenv("METRICS_PUBLISH_INTERVAL", "5"))  # seconds between publishes
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(_label_value(labels[name]) for name in self.labelnames)
+
+    def _items(self):
+        with self._lock:
+            return [(key, self._copy(value)) for key, value in self._values.items()]
+
+    def _copy(self, value):
+        return value
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing value per label set.
+    """
+    type = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self):
+        for key, value in self._items():
+            yield self.name, tuple(zip(self.labelnames, key)), value
+
+
+class Histogram(_Metric):
+    """
+    Bucketed distribution (e.g. latency in seconds) per label set.
+    """
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _copy(self, value):
+        return list(value[0]), value[1], value[2]
+
+    def samples(self):
+        for key, (counts, total, count) in self._items():
+            labels = tuple(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                yield self.name + "_bucket", labels + (("le", _format_value(bound)),), cumulative
+            yield self.name + "_sum", labels, total
+            yield self.name + "_count", labels, count
+
+
+class MetricsRegistry:
+    """
+    Holds the process's metrics and scrape-time collectors. With a
+    multiprocess directory, render() sums counters and histograms over every
+    process that published there (exited ones included) and reports the
+    gauges of running processes labelled by worker.
+    """
+
+    def __init__(self):
+        self._metrics = OrderedDict()
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._directory = None
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help, labelnames, buckets=buckets)
+
+    def collector(self, fn):
+        """
+        Register fn, called at scrape time, which yields
+        (name, type, help, [(labels dict, value), ...]) tuples.
+        Usable as a decorator.
+        """
+        with self._lock:
+            self._collectors.append(fn)
+        return fn
+
+    def families(self):
+        """
+        This process's samples as (name, type, help, [(sample name,
+        labels, value), ...]) tuples, labels being (name, value) pairs.
+        """
+        families = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        for metric in metrics:
+            families.append((metric.name, metric.type, metric.help, list(metric.samples())))
+
+        for collect in collectors:
+            try:
+                collected = list(collect())
+            except Exception as e:
+                print(f"Metrics collector {getattr(collect, '__name__', collect)} failed: {e}")
+                continue
+            for name, metric_type, help, samples in collected:
+                families.append((name, metric_type, help, [
+                    (name, tuple(sorted((key, _label_value(value)) for key, value in labels.items())), value)
+                    for labels, value in samples if value is not None
+                ]))
+
+        return families
+
+    def enable_multiprocess(self, directory, interval=METRICS_PUBLISH_INTERVAL):
+        """
+        Publish this process's samples to directory every interval seconds
+        and at exit, and merge every process's samples when rendering.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        atexit.register(self.publish)
+        thread = threading.Thread(target=self._publish_loop, args=(interval,), name="metrics-publisher", daemon=True)
+        thread.start()
+
+    def _publish_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"Publishing metrics failed: {e}")
+
+    def publish(self, families=None):
+        """
+        Write this process's samples to the multiprocess directory.
+        """
+        if self._directory is None:
+            return
+        if families is None:
+            families = self.families()
+        path = os.path.join(self._directory, f"{os.getpid()}.json")
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(families, f)
+        os.replace(temp_path, path)
+
+    def _published(self):
+        """
+        (pid, families) for every other process in the multiprocess directory.
+        """
+        own = os.getpid()
+        for entry in os.listdir(self._directory):
+            pid, ext = os.path.splitext(entry)
+            if ext != ".json" or not pid.isdigit() or int(pid) == own:
+                continue
+            try:
+                with open(os.path.join(self._directory, entry)) as f:
+                    families = json.load(f)
+            except (OSError, ValueError):
+                continue  # vanished or being replaced; picked up next scrape
+            yield int(pid), families
+
+    def _merge(self, families):
+        merged = OrderedDict()
+        sources = [(os.getpid(), families)]
+        if self._directory is not None:
+            self.publish(families)
+            sources.extend(self._published())
+
+        for pid, process_families in sources:
+            alive = pid == os.getpid() or _process_alive(pid)
+            for name, metric_type, help, samples in process_families:
+                family = merged.get(name)
+                if family is None:
+                    family = merged[name] = (metric_type, help, OrderedDict())
+                values = family[2]
+                for sample_name, labels, value in samples:
+                    labels = tuple(tuple(label) for label in labels)
+                    if metric_type == "gauge":
+                        if not alive:
+                            continue
+                        if self._directory is not None:
+                            labels = labels + (("worker", str(pid)),)
+                        values[(sample_name, labels)] = value
+                    else:
+                        values[(sample_name, labels)] = values.get((sample_name, labels), 0) + value
+        return merged
+
+    def render(self):
+        """
+        Return every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        for name, (metric_type, help, values) in self._merge(self.families()).items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for (sample_name, labels), value in values.items():
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Shared by every component in the worker
+registry = MetricsRegistry()
+if METRICS_DIR:
+    registry.enable_multiprocess(METRICS_DIR)
@@ -0,0 +1,244 @@
+"""
+Emotion model server and client: one process runs the model for all web workers
+over a Unix socket (protocol in the README, Technical Architecture).
+"""
+import argparse
+import os
+import signal
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import numpy as np
+
+from metrics import registry
+
+EMOTION_MODEL_SERVER = os.getenv("EMOTION_MODEL_SERVER", "")  # socket path; empty loads the model in-process
+EMOTION_MODEL_SERVER_TIMEOUT = float(os.getenv("EMOTION_MODEL_SERVER_TIMEOUT", 2.0))  # seconds per request
+EMOTION_MODEL_SERVER_RETRY = float(os.getenv("EMOTION_MODEL_SERVER_RETRY", 5.0))  # seconds before retrying a failed server
+EMOTION_MODEL_FALLBACK = os.getenv("EMOTION_MODEL_FALLBACK", "local").lower()  # "local" loads the model in-process, "none" fails
+
+CROP_SIZE = 48
+MAX_CROPS = 1024  # per request
+REQUEST_HEADER = struct.Struct("<cI")
+RESPONSE_HEADER = struct.Struct("<BII")
+DTYPES = {b"B": np.uint8, b"f": np.float32}
+DTYPE_CODES = {np.dtype(np.uint8): b"B", np.dtype(np.float32): b"f"}
+
+MODEL_SERVER_REQUESTS = registry.counter(
+    "moodstream_model_server_requests_total", "Predictions sent to the model server by result", ("result",))
+
+
+class ModelServerError(Exception):
+    """
+    The model server could not be reached or answered with an error.
+    """
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("model server connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+class _PredictionHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock = self.request
+        while True:
+            try:
+                header = _recv_exactly(sock, REQUEST_HEADER.size)
+            except ConnectionError:
+                return
+            code, count = REQUEST_HEADER.unpack(header)
+            dtype = DTYPES.get(code)
+            if dtype is None or count > MAX_CROPS:
+                self._send_error(f"bad request (dtype {code!r}, {count} crops)")
+                return
+
+            data = _recv_exactly(sock, count * CROP_SIZE * CROP_SIZE * np.dtype(dtype).itemsize)
+            crops = np.frombuffer(data, dtype=dtype).reshape(count, CROP_SIZE, CROP_SIZE, 1)
+            try:
+                probabilities = self.server.predict(crops)
+            except Exception as e:
+                self._send_error(str(e))
+                continue
+            sock.sendall(RESPONSE_HEADER.pack(0, *probabilities.shape) + probabilities.tobytes())
+
+    def _send_error(self, message):
+        message = message.encode("utf-8")
+        self.request.sendall(RESPONSE_HEADER.pack(1, len(message), 0) + message)
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """
+    Serves predictions from one model to every connected web worker, one
+    thread per connection, batching their crops with a MicroBatcher.
+    """
+    # A Unix stream server; spelled out so this module imports where AF_UNIX is missing
+    address_family = getattr(socket, "AF_UNIX", None)
+    daemon_threads = True
+
+    def __init__(self, socket_path, get_model, batcher=None):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # left over from a previous run
+        super().__init__(socket_path, _PredictionHandler)
+        self.socket_path = socket_path
+        self.get_model = get_model
+        self.batcher = batcher
+
+    def predict(self, crops):
+        # Single crops (the common case) go through the batcher so concurrent
+        # workers share forward passes; group batches are already batched
+        if self.batcher is not None and len(crops) == 1:
+            return np.asarray(self.batcher.predict_proba(crops[0]), dtype=np.float32)[None, :]
+        return np.ascontiguousarray(self.get_model().predict(crops, verbose=0), dtype=np.float32)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+
+class ModelClient:
+    """
+    Stand-in for the emotion model that forwards predictions to a model
+    server. Each thread keeps its own connection. When the server cannot
+    be reached or times out, predictions go to fallback() (a callable
+    returning a local model) if one is given, and the server is not
+    retried for retry_seconds.
+    """
+
+    def __init__(self, socket_path, timeout=EMOTION_MODEL_SERVER_TIMEOUT, retry_seconds=EMOTION_MODEL_SERVER_RETRY,
+                 fallback=None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.retry_seconds = retry_seconds
+        self.fallback = fallback
+        self._local = threading.local()
+        self._down_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.fallbacks = 0
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
+
+    def _remote_predict(self, crops):
+        code = DTYPE_CODES.get(crops.dtype)
+        if code is None:
+            crops, code = crops.astype(np.float32), b"f"
+        crops = np.ascontiguousarray(crops).reshape(-1, CROP_SIZE, CROP_SIZE, 1)
+        if len(crops) > MAX_CROPS:
+            return np.concatenate([self._remote_predict(crops[i:i + MAX_CROPS]) for i in range(0, len(crops), MAX_CROPS)])
+
+        sock = self._connection()
+        try:
+            sock.sendall(REQUEST_HEADER.pack(code, len(crops)) + crops.tobytes())
+            status, rows, columns = RESPONSE_HEADER.unpack(_recv_exactly(sock, RESPONSE_HEADER.size))
+            if status:
+                raise ModelServerError(_recv_exactly(sock, rows).decode("utf-8", "replace"))
+            data = _recv_exactly(sock, rows * columns * 4)
+        except (OSError, ModelServerError):
+            # A timed-out or failed exchange leaves the stream out of step
+            self._close()
+            raise
+        return np.frombuffer(data, dtype=np.float32).reshape(rows, columns)
+
+    def predict(self, crops, verbose=0):
+        """
+        Return (N, classes) probabilities for (N, 48, 48, 1) crops.
+        """
+        crops = np.asarray(crops)
+        if time.monotonic() >= self._down_until:
+            try:
+                probabilities = self._remote_predict(crops)
+                self.requests += 1
+                MODEL_SERVER_REQUESTS.inc(result="ok")
+                return probabilities
+            except (OSError, ModelServerError) as e:
+                self.errors += 1
+                MODEL_SERVER_REQUESTS.inc(result="error")
+                self._down_until = time.monotonic() + self.retry_seconds
+                print(f"Model server {self.socket_path} unavailable: {e}")
+                if self.fallback is None:
+                    raise ModelServerError(str(e)) from e
+        elif self.fallback is None:
+            raise ModelServerError(f"Model server {self.socket_path} is unavailable")
+
+        self.fallbacks += 1
+        MODEL_SERVER_REQUESTS.inc(result="fallback")
+        return self.fallback().predict(crops, verbose=0)
+
+    def ping(self):
+        """
+        Check that the server answers; returns the round trip in seconds.
+        """
+        started = time.perf_counter()
+        self._remote_predict(np.zeros((1, CROP_SIZE, CROP_SIZE, 1), dtype=np.uint8))
+        return time.perf_counter() - started
+
+    def stats(self):
+        return {
+            "socket": self.socket_path,
+            "available": time.monotonic() >= self._down_until,
+            "requests": self.requests,
+            "errors": self.errors,
+            "fallbacks": self.fallbacks,
+            "fallback": self.fallback is not None
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the MoodStream emotion model over a Unix socket")
+    parser.add_argument("--socket", default=EMOTION_MODEL_SERVER or "/tmp/moodstream-model.sock",
+                        help="Unix socket path (default: $EMOTION_MODEL_SERVER)")
+    parser.add_argument("--no-batching", action="store_true", help="run every request as its own forward pass")
+    args = parser.parse_args()
+
+    # The server always runs the model in-process, whatever EMOTION_MODEL_SERVER says
+    from batch_inference import MicroBatcher
+    from emotion_detector import get_local_model, startup_report
+
+    get_local_model().predict(np.zeros((1, CROP_SIZE, CROP_SIZE, 1), dtype=np.float32), verbose=0)  # warm up
+    server = ModelServer(args.socket, get_local_model, None if args.no_batching else MicroBatcher(get_local_model))
+    print(f"Emotion model server listening on {args.socket} "
+          f"(backend: {startup_report['backend']}, pid {os.getpid()})", flush=True)
+    def stop(signum, frame):
+        raise SystemExit(0)  # unwind through server_close(), which removes the socket
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
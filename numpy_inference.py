@@ -0,0 +1,229 @@
+"""
+Pure-NumPy forward pass for the Keras emotion CNN (model_from_json, load_weights, predict).
+"""
+import json
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+SUPPORTED_LAYERS = ("InputLayer", "Conv2D", "MaxPooling2D", "Dropout", "Flatten", "Dense")
+
+
+def _relu(x):
+    return np.maximum(x, 0, out=x)
+
+
+def _softmax(x):
+    x = x - x.max(axis=-1, keepdims=True)
+    np.exp(x, out=x)
+    x /= x.sum(axis=-1, keepdims=True)
+    return x
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": _relu,
+    "softmax": _softmax,
+    "sigmoid": _sigmoid,
+    "tanh": np.tanh
+}
+
+
+def _same_padding(size, kernel, stride):
+    """
+    TensorFlow-style 'same' padding for one spatial dimension.
+    """
+    out = -(-size // stride)
+    total = max((out - 1) * stride + kernel - size, 0)
+    return total // 2, total - total // 2
+
+
+def _pad(x, kernel_size, strides, padding):
+    if padding == "valid":
+        return x
+    if padding != "same":
+        raise ValueError(f"Unsupported padding: {padding}")
+    pad_h = _same_padding(x.shape[1], kernel_size[0], strides[0])
+    pad_w = _same_padding(x.shape[2], kernel_size[1], strides[1])
+    return np.pad(x, ((0, 0), pad_h, pad_w, (0, 0)))
+
+
+def im2col(x, kernel_size, strides):
+    """
+    Unfold NHWC input into a (N*OH*OW, KH*KW*C) patch matrix.
+    The patch view is zero-copy; only the final contiguous matrix is materialized.
+    """
+    kh, kw = kernel_size
+    sh, sw = strides
+    n, _, _, c = x.shape
+    patches = sliding_window_view(x, (kh, kw), axis=(1, 2))[:, ::sh, ::sw]  # (N, OH, OW, C, KH, KW)
+    oh, ow = patches.shape[1], patches.shape[2]
+    cols = np.ascontiguousarray(patches.transpose(0, 1, 2, 4, 5, 3)).reshape(n * oh * ow, kh * kw * c)
+    return cols, (n, oh, ow)
+
+
+class Conv2D:
+    def __init__(self, config, kernel, bias=None):
+        if config.get("data_format", "channels_last") != "channels_last":
+            raise ValueError("Only channels_last Conv2D is supported")
+        if tuple(config.get("dilation_rate", (1, 1))) != (1, 1) or config.get("groups", 1) != 1:
+            raise ValueError("Dilated and grouped Conv2D are not supported")
+        self.kernel_size = tuple(config["kernel_size"])
+        self.strides = tuple(config.get("strides", (1, 1)))
+        self.padding = config.get("padding", "valid")
+        self.activation = ACTIVATIONS[config.get("activation", "linear")]
+        kh, kw, cin, cout = kernel.shape
+        self.filters = cout
+        self.kernel = np.ascontiguousarray(kernel.reshape(kh * kw * cin, cout), dtype=np.float32)
+        self.bias = None if bias is None else bias.astype(np.float32)
+
+    def __call__(self, x):
+        x = _pad(x, self.kernel_size, self.strides, self.padding)
+        cols, (n, oh, ow) = im2col(x, self.kernel_size, self.strides)
+        out = cols @ self.kernel
+        if self.bias is not None:
+            out += self.bias
+        return self.activation(out.reshape(n, oh, ow, self.filters))
+
+
+class MaxPooling2D:
+    def __init__(self, config):
+        self.pool_size = tuple(config.get("pool_size", (2, 2)))
+        self.strides = tuple(config.get("strides") or self.pool_size)
+        self.padding = config.get("padding", "valid")
+
+    def __call__(self, x):
+        ph, pw = self.pool_size
+        if self.padding == "valid" and self.strides == self.pool_size:
+            # Non-overlapping windows: crop and reduce over a reshaped view
+            n, h, w, c = x.shape
+            oh, ow = h // ph, w // pw
+            return x[:, :oh * ph, :ow * pw].reshape(n, oh, ph, ow, pw, c).max(axis=(2, 4))
+        if self.padding == "same":
+            pad_h = _same_padding(x.shape[1], ph, self.strides[0])
+            pad_w = _same_padding(x.shape[2], pw, self.strides[1])
+            x = np.pad(x, ((0, 0), pad_h, pad_w, (0, 0)), constant_values=-np.inf)
+        windows = sliding_window_view(x, (ph, pw), axis=(1, 2))[:, ::self.strides[0], ::self.strides[1]]
+        return windows.max(axis=(4, 5))
+
+
+class Dense:
+    def __init__(self, config, kernel, bias=None):
+        self.activation = ACTIVATIONS[config.get("activation", "linear")]
+        self.kernel = np.ascontiguousarray(kernel, dtype=np.float32)
+        self.bias = None if bias is None else bias.astype(np.float32)
+
+    def __call__(self, x):
+        out = x @ self.kernel
+        if self.bias is not None:
+            out += self.bias
+        return self.activation(out)
+
+
+def _flatten(x):
+    return x.reshape(x.shape[0], -1)
+
+
+def _identity(x):
+    return x
+
+
+def load_weight_arrays(path):
+    """
+    Read per-layer weight arrays from a Keras 3 .weights.h5 file (or a
+    legacy Keras 2 HDF5 weights file), keyed by layer name.
+    """
+    import h5py
+
+    def decode(name):
+        return name.decode("utf-8") if isinstance(name, bytes) else name
+
+    weights = {}
+    with h5py.File(path, "r") as f:
+        if "layers" in f:
+            for name, group in f["layers"].items():
+                variables = group.get("vars")
+                if variables is not None and len(variables):
+                    weights[name] = [np.asarray(variables[str(i)]) for i in range(len(variables))]
+        else:
+            root = f["model_weights"] if "model_weights" in f else f
+            for name in root.attrs.get("layer_names", []):
+                name = decode(name)
+                group = root[name]
+                weight_names = [decode(w) for w in group.attrs.get("weight_names", [])]
+                if weight_names:
+                    weights[name] = [np.asarray(group[w]) for w in weight_names]
+    return weights
+
+
+class NumpySequentialModel:
+    """
+    Forward-pass-only Sequential model built from a Keras JSON config.
+    """
+
+    def __init__(self, layer_configs):
+        self.layer_configs = []
+        for layer in layer_configs:
+            if layer["class_name"] not in SUPPORTED_LAYERS:
+                raise ValueError(f"Unsupported layer type: {layer['class_name']}")
+            if layer["class_name"] != "InputLayer":
+                self.layer_configs.append(layer)
+        self.layers = None
+        self.weight_arrays = None
+
+    def load_weights(self, path):
+        self.set_weights(load_weight_arrays(path))
+
+    def set_weights(self, weight_arrays):
+        """
+        Build the layer callables from a {layer_name: [kernel, bias]} mapping.
+        """
+        layers = []
+        for layer in self.layer_configs:
+            class_name, config = layer["class_name"], layer["config"]
+            if class_name in ("Conv2D", "Dense"):
+                arrays = weight_arrays.get(config["name"])
+                if not arrays:
+                    raise ValueError(f"Missing weights for layer {config['name']}")
+                layer_type = Conv2D if class_name == "Conv2D" else Dense
+                layers.append(layer_type(config, *arrays[:2]))
+            elif class_name == "MaxPooling2D":
+                layers.append(MaxPooling2D(config))
+            elif class_name == "Flatten":
+                layers.append(_flatten)
+            else:  # Dropout is a no-op at inference time
+                layers.append(_identity)
+        self.weight_arrays = weight_arrays
+        self.layers = layers
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        for layer in self.layers:
+            x = layer(x)
+        return x
+
+    def predict(self, x, batch_size=32, verbose=0):
+        """
+        Same contract as keras Model.predict: returns class probabilities
+        of shape (N, classes) for an (N, 48, 48, 1) input batch.
+        """
+        if self.layers is None:
+            raise RuntimeError("Weights have not been loaded")
+        x = np.asarray(x)
+        if len(x) <= batch_size:
+            return self(x)
+        return np.concatenate([self(x[i:i + batch_size]) for i in range(0, len(x), batch_size)])
+
+
+def model_from_json(json_string):
+    """
+    Build a NumpySequentialModel from a Keras model JSON string.
+    """
+    spec = json.loads(json_string)
+    if spec.get("class_name") != "Sequential":
+        raise ValueError("Only Sequential models are supported")
+    return NumpySequentialModel(spec["config"]["layers"])
@@ -0,0 +1,164 @@
+"""
+Computed playlists stored by id in the shared state database, with a TTL and LRU bounds.
+"""
+import json
+import os
+import secrets
+import threading
+import time
+
+from shared_state import SHARED_STATE_PATH, SharedStateDB
+
+PLAYLIST_SNAPSHOT_TTL = float(os.getenv("PLAYLIST_SNAPSHOT_TTL", 1800))  # seconds a snapshot is kept
+PLAYLIST_SNAPSHOT_MAX = int(os.getenv("PLAYLIST_SNAPSHOT_MAX", 5000))  # snapshots kept across workers
+PLAYLIST_SNAPSHOT_MAX_SONGS = int(os.getenv("PLAYLIST_SNAPSHOT_MAX_SONGS", 100000))  # songs kept across workers
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS playlist_snapshots (
+    id TEXT PRIMARY KEY,
+    emotion TEXT NOT NULL,
+    songs TEXT NOT NULL,
+    song_count INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_playlist_snapshots_used_at ON playlist_snapshots(used_at);
+CREATE INDEX IF NOT EXISTS idx_playlist_snapshots_stored_at ON playlist_snapshots(stored_at);
+CREATE TABLE IF NOT EXISTS playlist_snapshot_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    snapshots INTEGER NOT NULL,
+    songs INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO playlist_snapshot_totals (id, snapshots, songs)
+    SELECT 0, COUNT(*), COALESCE(SUM(song_count), 0) FROM playlist_snapshots;
+CREATE TRIGGER IF NOT EXISTS playlist_snapshots_counted AFTER INSERT ON playlist_snapshots BEGIN
+    UPDATE playlist_snapshot_totals SET snapshots = snapshots + 1, songs = songs + NEW.song_count WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS playlist_snapshots_uncounted AFTER DELETE ON playlist_snapshots BEGIN
+    UPDATE playlist_snapshot_totals SET snapshots = snapshots - 1, songs = songs - OLD.song_count WHERE id = 0;
+END;
+"""
+
+# Everything past the newest max_entries snapshots or max_songs songs, by
+# last use, except the snapshot just stored
+EVICT_SQL = """
+DELETE FROM playlist_snapshots WHERE id IN (
+    SELECT id FROM (
+        SELECT id,
+               ROW_NUMBER() OVER recent AS position,
+               SUM(song_count) OVER recent AS kept_songs
+        FROM playlist_snapshots
+        WINDOW recent AS (ORDER BY used_at DESC ROWS UNBOUNDED PRECEDING)
+    )
+    WHERE id != ? AND (position > ? OR kept_songs > ?)
+)
+"""
+
+
+class PlaylistSnapshotStore:
+    """
+    TTL/LRU store of computed playlists keyed by snapshot id, shared by
+    every worker through the state database. Hit/miss counters are this
+    worker's.
+    """
+
+    def __init__(self, ttl=PLAYLIST_SNAPSHOT_TTL, max_entries=PLAYLIST_SNAPSHOT_MAX,
+                 max_songs=PLAYLIST_SNAPSHOT_MAX_SONGS, path=SHARED_STATE_PATH):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_songs = max_songs
+        self.db = SharedStateDB(path, SCHEMA)
+        self._lock = threading.Lock()
+        self.created = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def put(self, emotion, songs):
+        """
+        Store a playlist ([name, url, artists] rows) and return its id.
+        """
+        snapshot_id = secrets.token_urlsafe(12)
+        songs = [list(song) for song in songs]
+        now = time.time()
+        with self.db.connect() as conn:
+            conn.execute(
+                "INSERT INTO playlist_snapshots (id, emotion, songs, song_count, stored_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (snapshot_id, emotion, json.dumps(songs), len(songs), now, now)
+            )
+            # Drop expired snapshots, then enforce the bounds from the cold end
+            # (the newest snapshot is kept even if it alone exceeds max_songs);
+            # the totals are kept by triggers, so checking them is one row read
+            expired = conn.execute("DELETE FROM playlist_snapshots WHERE stored_at < ?", (now - self.ttl,)).rowcount
+            count, total = self._totals(conn)
+            evictions = 0
+            if count > self.max_entries or total > self.max_songs:
+                evictions = conn.execute(EVICT_SQL, (snapshot_id, self.max_entries, self.max_songs)).rowcount
+        with self._lock:
+            self.created += 1
+            self.expired += expired
+            self.evictions += evictions
+        return snapshot_id
+
+    def get(self, snapshot_id):
+        """
+        Return (emotion, songs) for a live snapshot, or None if it is
+        unknown or expired.
+        """
+        now = time.time()
+        with self.db.connect() as conn:
+            row = conn.execute("SELECT emotion, songs, stored_at FROM playlist_snapshots WHERE id = ?",
+                               (snapshot_id,)).fetchone()
+            expired = row is not None and now - row["stored_at"] > self.ttl
+            if expired:
+                conn.execute("DELETE FROM playlist_snapshots WHERE id = ?", (snapshot_id,))
+            elif row is not None:
+                conn.execute("UPDATE playlist_snapshots SET used_at = ? WHERE id = ?", (now, snapshot_id))
+
+        with self._lock:
+            if row is None or expired:
+                self.expired += expired
+                self.misses += 1
+                return None
+            self.hits += 1
+        return row["emotion"], json.loads(row["songs"])
+
+    def page(self, snapshot_id, offset=0, limit=10):
+        """
+        Return (emotion, songs[offset:offset + limit], total) for a live
+        snapshot, or None.
+        """
+        snapshot = self.get(snapshot_id)
+        if snapshot is None:
+            return None
+        emotion, songs = snapshot
+        return emotion, songs[offset:offset + limit], len(songs)
+
+    def _totals(self, conn):
+        row = conn.execute("SELECT snapshots, songs FROM playlist_snapshot_totals WHERE id = 0").fetchone()
+        return row["snapshots"], row["songs"]
+
+    def clear(self):
+        with self.db.connect() as conn:
+            conn.execute("DELETE FROM playlist_snapshots")
+
+    def stats(self):
+        """
+        Return size and hit/miss counters.
+        """
+        size, songs = self._totals(self.db.connect())
+        with self._lock:
+            return {
+                "size": size,
+                "songs": songs,
+                "max_entries": self.max_entries,
+                "max_songs": self.max_songs,
+                "ttl": self.ttl,
+                "created": self.created,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions
+            }
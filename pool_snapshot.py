@@ -0,0 +1,332 @@
+"""
+Memory-mapped track pool snapshot that one worker writes and every worker maps.
+The file layout is described in the README (Technical Architecture).
+"""
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from ranking import CandidateSet
+from tracks import Track
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, every worker refreshes its own pools
+    fcntl = None
+
+POOL_SNAPSHOT_PATH = os.getenv("POOL_SNAPSHOT_PATH", os.path.join(tempfile.gettempdir(), "moodstream-pools.bin"))
+POOL_SNAPSHOT_POLL_SECONDS = float(os.getenv("POOL_SNAPSHOT_POLL_SECONDS", 10))  # how often workers check for a new file
+
+SNAPSHOT_MAGIC = b"MSPOOLS1"
+SNAPSHOT_VERSION = 1
+SECTION_ALIGNMENT = 64
+NO_STRING = 0xFFFFFFFF
+SNAPSHOT_TRACK_CACHE = 1024  # built tracks kept per mapped pool; selections favour the same prefix
+
+# Ranking columns as stored in the file
+RANKING_DTYPES = {
+    "popularity": "<f4",
+    "match": "<f4",
+    "relevance": "<f4",
+    "track_artists": "<i4",
+    "track_offsets": "<i4",
+    "artist_tracks": "<i4",
+    "artist_offsets": "<i4"
+}
+
+
+class StringTable:
+    """
+    Deduplicated UTF-8 strings addressed by (offset, length).
+    """
+
+    def __init__(self):
+        self._refs = {}
+        self._chunks = []
+        self.size = 0
+
+    def ref(self, value):
+        ref = self._refs.get(value)
+        if ref is None:
+            data = value.encode("utf-8")
+            ref = self._refs[value] = (self.size, len(data))
+            self._chunks.append(data)
+            self.size += len(data)
+        return ref
+
+    def tobytes(self):
+        return b"".join(self._chunks)
+
+
+def pool_columns(pool, strings):
+    """
+    Fixed-width columns for one CandidateSet, its strings added to strings.
+    """
+    tracks = pool.tracks
+    n = len(tracks)
+    columns = {name: np.ascontiguousarray(getattr(pool, name), dtype=dtype) for name, dtype in RANKING_DTYPES.items()}
+
+    refs = np.zeros((n, 8), dtype="<u4")  # id, name, url, search term as (offset, length)
+    popularity = np.zeros(n, dtype="<u1")
+    artist_offsets = np.zeros(n + 1, dtype="<u4")
+    artist_names = []
+    for i, track in enumerate(tracks):
+        refs[i, 0:2] = strings.ref(track.id)
+        refs[i, 2:4] = strings.ref(track.name)
+        if track._url is not None:
+            refs[i, 4:6] = strings.ref(track._url)
+        refs[i, 6:8] = strings.ref(track.search_term) if track.search_term is not None else (NO_STRING, 0)
+        popularity[i] = min(max(int(track.popularity), 0), 255)
+        artist_names.extend(strings.ref(artist) for artist in track.artists)
+        artist_offsets[i + 1] = len(artist_names)
+
+    columns.update({
+        "track_refs": refs,
+        "track_popularity": popularity,
+        "artist_names": np.array(artist_names, dtype="<u4").reshape(-1, 2),
+        "artist_name_offsets": artist_offsets
+    })
+    return columns
+
+
+def _align(offset):
+    return -(-offset // SECTION_ALIGNMENT) * SECTION_ALIGNMENT
+
+
+def write_pool_snapshot(path, pools):
+    """
+    Write pools ({emotion: CandidateSet}) as a snapshot file, atomically
+    replacing any previous one. Returns the number of bytes written.
+    """
+    strings = StringTable()
+    pool_columns_by_emotion = {emotion: pool_columns(pool, strings) for emotion, pool in pools.items()}
+    string_bytes = strings.tobytes()
+
+    # Lay out the sections; offsets depend on the header size, so settle
+    # them with a header that is padded to a fixed length
+    header = {"version": SNAPSHOT_VERSION, "created_at": time.time(), "strings": {}, "pools": {}}
+    sections = []
+
+    def layout(start):
+        offset = start
+        sections.clear()
+        for emotion, columns in pool_columns_by_emotion.items():
+            entry = {"tracks": len(pools[emotion]), "columns": {}}
+            for name, array in columns.items():
+                offset = _align(offset)
+                entry["columns"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+                sections.append((offset, array.tobytes()))
+                offset += array.nbytes
+            header["pools"][emotion] = entry
+        offset = _align(offset)
+        header["strings"] = {"offset": offset, "size": len(string_bytes)}
+        sections.append((offset, string_bytes))
+        return offset + len(string_bytes)
+
+    header_size = 0
+    while True:
+        end = layout(_align(len(SNAPSHOT_MAGIC) + 4 + header_size))
+        encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        if len(encoded) <= header_size:
+            break
+        header_size = _align(len(encoded) + 256)
+    encoded = encoded.ljust(header_size)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".moodstream-pools-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(len(encoded).to_bytes(4, "little"))
+            f.write(encoded)
+            for offset, data in sections:
+                f.seek(offset)
+                f.write(data)
+            f.truncate(end)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return end
+
+
+class SnapshotTracks:
+    """
+    Read-only sequence of one mapped pool's tracks; a tracks.Track is only
+    built for the entries that are accessed (i.e. the selected ones), and
+    the most recent ones are kept.
+    """
+
+    def __init__(self, mapped, strings_offset, refs, popularity, artist_names, artist_name_offsets):
+        self._mapped = mapped
+        self._strings_offset = strings_offset
+        self._refs = refs
+        self._popularity = popularity
+        self._artist_names = artist_names
+        self._artist_name_offsets = artist_name_offsets
+        self._built = {}
+
+    def _string(self, offset, length):
+        start = self._strings_offset + offset
+        return self._mapped[start:start + length].decode("utf-8")
+
+    def __len__(self):
+        return len(self._refs)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        track = self._built.get(index)
+        if track is not None:
+            return track
+        if not 0 <= index < len(self):
+            raise IndexError("track index out of range")
+        id_offset, id_length, name_offset, name_length, url_offset, url_length, term_offset, term_length = \
+            self._refs[index].tolist()
+        start, end = self._artist_name_offsets[index:index + 2].tolist()
+        artists = [self._string(offset, length) for offset, length in self._artist_names[start:end].tolist()]
+        track = Track(self._string(id_offset, id_length), self._string(name_offset, name_length),
+                      self._string(url_offset, url_length) if url_length else None, artists,
+                      self._popularity.item(index),
+                      self._string(term_offset, term_length) if term_offset != NO_STRING else None)
+        if len(self._built) >= SNAPSHOT_TRACK_CACHE:
+            self._built.clear()
+        self._built[index] = track
+        return track
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def read_pool_snapshot(path):
+    """
+    Map a snapshot file and return ({emotion: CandidateSet}, header). The
+    columns are views of the mapping; nothing is copied.
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if mapped[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        raise ValueError(f"{path} is not a track pool snapshot")
+    header_length = int.from_bytes(mapped[len(SNAPSHOT_MAGIC):len(SNAPSHOT_MAGIC) + 4], "little")
+    header_start = len(SNAPSHOT_MAGIC) + 4
+    header = json.loads(bytes(mapped[header_start:header_start + header_length]))
+    if header.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported track pool snapshot version {header.get('version')}")
+
+    pools = {}
+    for emotion, entry in header["pools"].items():
+        columns = {}
+        for name, spec in entry["columns"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            columns[name] = np.frombuffer(mapped, dtype=dtype, count=count, offset=spec["offset"]).reshape(spec["shape"])
+        tracks = SnapshotTracks(mapped, header["strings"]["offset"], columns["track_refs"], columns["track_popularity"],
+                                columns["artist_names"], columns["artist_name_offsets"])
+        pools[emotion] = CandidateSet.from_columns(tracks, *(columns[name] for name in CandidateSet.COLUMNS))
+    return pools, header
+
+
+class PoolSnapshotFile:
+    """
+    The shared snapshot file as seen by one worker: elects the refresher,
+    writes new snapshots and maps them when they change.
+    """
+
+    def __init__(self, path=POOL_SNAPSHOT_PATH, poll_seconds=POOL_SNAPSHOT_POLL_SECONDS):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self._lock_fd = None
+        self._lock = threading.Lock()
+        self._loaded_key = None
+        self.created_at = None
+        self.mapped_bytes = 0
+        self.writes = 0
+        self.loads = 0
+        self.errors = 0
+
+    def lead(self):
+        """
+        Try to become (or stay) the refresher; True if this process is it.
+        The flock is held for the life of the process, so another worker
+        takes over once the refresher exits.
+        """
+        if fcntl is None:
+            return True
+        with self._lock:
+            if self._lock_fd is not None:
+                return True
+            fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self._lock_fd = fd
+            print(f"This worker (pid {os.getpid()}) refreshes the track pool snapshot {self.path}")
+            return True
+
+    def write(self, pools):
+        """
+        Write pools as the new snapshot; returns the pools mapped from it,
+        or None if writing or mapping failed.
+        """
+        try:
+            size = write_pool_snapshot(self.path, pools)
+            self.writes += 1
+            print(f"Wrote track pool snapshot {self.path} ({size} bytes)")
+        except Exception as e:
+            self.errors += 1
+            print(f"Track pool snapshot write failed: {e}")
+            return None
+        return self.load()
+
+    def load(self):
+        """
+        Map the snapshot if it changed since the last load; returns its
+        pools, or None if it is missing, unchanged or unreadable.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key == self._loaded_key:
+            return None
+        try:
+            pools, header = read_pool_snapshot(self.path)
+        except Exception as e:
+            self.errors += 1
+            self._loaded_key = key  # do not retry a bad file until it is replaced
+            print(f"Track pool snapshot load failed: {e}")
+            return None
+        self._loaded_key = key
+        self.created_at = header["created_at"]
+        self.mapped_bytes = stat.st_size
+        self.loads += 1
+        return pools
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "role": "refresher" if self._lock_fd is not None or fcntl is None else "reader",
+            "poll_seconds": self.poll_seconds,
+            "created_at": self.created_at,
+            "mapped_bytes": self.mapped_bytes,
+            "writes": self.writes,
+            "loads": self.loads,
+            "errors": self.errors
+        }
@@ -0,0 +1,174 @@
+"""
+Vectorized candidate ranking with artist diversity (greedy MMR) for recommendations.
+"""
+import bisect
+import os
+import threading
+
+import numpy as np
+
+RANK_POPULARITY_WEIGHT = float(os.getenv("RANK_POPULARITY_WEIGHT", 0.8))
+RANK_MATCH_WEIGHT = float(os.getenv("RANK_MATCH_WEIGHT", 0.2))  # emotion-term match of the search that found the track
+RANK_DIVERSITY = float(os.getenv("RANK_DIVERSITY", 0.3))  # MMR trade-off: 0 ranks by relevance only
+RANK_NOVELTY = float(os.getenv("RANK_NOVELTY", 0.2))  # penalty for tracks served in recent selections
+RANK_EXPOSURE_DECAY = float(os.getenv("RANK_EXPOSURE_DECAY", 0.8))  # per selection
+RANK_SHORTLIST = 256  # minimum prefix of the relevance order scanned per selection
+
+
+def keyword_weights(profile):
+    """
+    Emotion keywords from a profile (genres, moods, styles, descriptors),
+    weighted from 1.0 for the first down to 0.5 for the last.
+    """
+    keywords = []
+    for category in ("genres", "moods", "styles", "descriptors"):
+        for keyword in profile.get(category, []):
+            keyword = keyword.lower()
+            if keyword not in keywords:
+                keywords.append(keyword)
+    if not keywords:
+        return {}
+    return {keyword: 1.0 - 0.5 * i / len(keywords) for i, keyword in enumerate(keywords)}
+
+
+def term_match_score(search_term, keywords):
+    """
+    Weight of the best emotion keyword contained (as whole words) in a
+    search term, 0.0 if none is.
+    """
+    padded = f" {search_term.lower()} "
+    return max((weight for keyword, weight in keywords.items() if f" {keyword} " in padded), default=0.0)
+
+
+class CandidateSet:
+    """
+    Columnar view of candidate tracks (tracks.Track) for one emotion, kept
+    in descending relevance order.
+    """
+    # Read-only columns, in from_columns() order
+    COLUMNS = ("popularity", "match", "relevance", "track_artists", "track_offsets", "artist_tracks", "artist_offsets")
+
+    def __init__(self, tracks, keywords=None, popularity_weight=RANK_POPULARITY_WEIGHT,
+                 match_weight=RANK_MATCH_WEIGHT, exposure_decay=RANK_EXPOSURE_DECAY):
+        tracks = list(tracks)
+        n = len(tracks)
+        self.exposure_decay = exposure_decay
+
+        popularity = np.fromiter((track.popularity for track in tracks), dtype=np.float32, count=n) / 100
+        term_ids = {}
+        terms = np.fromiter((term_ids.setdefault(track.search_term or "", len(term_ids)) for track in tracks),
+                            dtype=np.int32, count=n)
+        term_scores = np.array([term_match_score(term, keywords or {}) for term in term_ids], dtype=np.float32)
+        match = term_scores[terms] if n else np.zeros(0, dtype=np.float32)
+        relevance = popularity_weight * popularity + match_weight * match
+
+        order = np.argsort(-relevance, kind="stable")
+        tracks = [tracks[i] for i in order]
+
+        # Artists per track and the inverted index artist -> tracks (ascending),
+        # as flat arrays with offsets rather than per-track Python lists
+        artist_ids = {}
+        pair_tracks = []
+        pair_artists = []
+        for i, track in enumerate(tracks):
+            for artist_id in dict.fromkeys(artist_ids.setdefault(artist.lower(), len(artist_ids))
+                                           for artist in track.artists):
+                pair_tracks.append(i)
+                pair_artists.append(artist_id)
+        pair_tracks = np.array(pair_tracks, dtype=np.int32)
+        pair_artists = np.array(pair_artists, dtype=np.int32)
+        by_artist = np.argsort(pair_artists, kind="stable")
+
+        self._set_columns(tracks, popularity[order], match[order], relevance[order], pair_artists,
+                          np.searchsorted(pair_tracks, np.arange(n + 1)).astype(np.int32),
+                          pair_tracks[by_artist],
+                          np.searchsorted(pair_artists[by_artist], np.arange(len(artist_ids) + 1)).astype(np.int32))
+
+    @classmethod
+    def from_columns(cls, tracks, popularity, match, relevance, track_artists, track_offsets,
+                     artist_tracks, artist_offsets, exposure_decay=RANK_EXPOSURE_DECAY):
+        """
+        Wrap columns a CandidateSet already computed (see COLUMNS), e.g.
+        memory-mapped from a pool snapshot, without copying them. tracks is
+        any sequence of tracks.Track in relevance order.
+        """
+        candidates = cls.__new__(cls)
+        candidates.exposure_decay = exposure_decay
+        candidates._set_columns(tracks, popularity, match, relevance, track_artists, track_offsets,
+                                artist_tracks, artist_offsets)
+        return candidates
+
+    def _set_columns(self, tracks, popularity, match, relevance, track_artists, track_offsets,
+                     artist_tracks, artist_offsets):
+        self.tracks = tracks
+        self.popularity = popularity
+        self.match = match
+        self.relevance = relevance
+        self.track_artists = track_artists
+        self.track_offsets = track_offsets
+        self.artist_tracks = artist_tracks
+        self.artist_offsets = artist_offsets
+        # Exposure is the only column selections write to
+        self.exposure = np.zeros(len(tracks), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def __iter__(self):
+        return iter(self.tracks)
+
+    def select(self, k, diversity=RANK_DIVERSITY, novelty=RANK_NOVELTY):
+        """
+        Pick up to k tracks by greedy MMR and return them in pick order.
+        Selected tracks accumulate exposure, which a (non-negative) novelty
+        weight penalizes in later selections.
+        """
+        n = len(self.tracks)
+        k = min(k, n)
+        if k <= 0:
+            return []
+
+        size = min(n, max(RANK_SHORTLIST, 8 * k))
+        picks = self._select(k, size, diversity, novelty)
+        while picks is None:
+            size = min(n, size * 4)
+            picks = self._select(k, size, diversity, novelty)
+
+        if novelty > 0:
+            with self._lock:
+                self.exposure *= self.exposure_decay
+                self.exposure[picks] += 1.0 - self.exposure_decay
+
+        return [self.tracks[i] for i in picks]
+
+    def _select(self, k, size, diversity, novelty):
+        """
+        MMR over the first size tracks; None if a track past them could
+        have been picked.
+        """
+        keep = 1.0 - diversity
+        scores = keep * (self.relevance[:size] - novelty * self.exposure[:size])
+        artist_floor = scores - diversity
+        bound = keep * float(self.relevance[size]) if size < len(self.tracks) else -np.inf
+        track_offsets = self.track_offsets
+        artist_offsets = self.artist_offsets
+        artists_done = set()
+        picks = []
+
+        for _ in range(k):
+            j = int(scores.argmax())
+            if scores[j] < bound:
+                return None
+            picks.append(j)
+            if diversity > 0:
+                for artist in self.track_artists[track_offsets.item(j):track_offsets.item(j + 1)].tolist():
+                    if artist not in artists_done:
+                        artists_done.add(artist)
+                        indices = self.artist_tracks[artist_offsets.item(artist):artist_offsets.item(artist + 1)]
+                        if indices.item(-1) >= size:
+                            indices = indices[:bisect.bisect_left(indices, size)]
+                        np.minimum.at(scores, indices, artist_floor[indices])
+            scores[j] = -np.inf
+
+        return picks
@@ -0,0 +1,32 @@
+"""
+SQLite database for state every web worker must see (playlist snapshots, email jobs).
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", os.path.join(tempfile.gettempdir(), "moodstream-state.db"))
+
+
+class SharedStateDB:
+    """
+    Per-thread connections to the shared state database.
+    """
+
+    def __init__(self, path=SHARED_STATE_PATH, schema=""):
+        self.path = path
+        self._local = threading.local()
+        if schema:
+            with self.connect() as conn:
+                conn.executescript(schema)
+
+    def connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,91 @@
+"""
+Single-flight coalescing of identical concurrent event streams.
+"""
+import threading
+
+
+class _Flight:
+    def __init__(self, events):
+        self.events = events
+        self.produced = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.lock = threading.Lock()
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent event streams per key and counts how many were coalesced.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def stream(self, key, make_events):
+        """
+        Yield the events of make_events() for key, sharing one generator with
+        any caller already streaming the same key. Whichever caller needs the
+        next event advances the generator, so a caller that stops early does
+        not stall the others; it is closed once every caller has stopped.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = _Flight(make_events())
+                self._flights[key] = flight
+                self.executions += 1
+            else:
+                self.coalesced += 1
+            flight.subscribers += 1
+
+        position = 0
+        try:
+            while True:
+                with flight.lock:
+                    if position < len(flight.produced):
+                        event = flight.produced[position]
+                    elif flight.done:
+                        if flight.error is not None:
+                            raise flight.error
+                        return
+                    else:
+                        try:
+                            event = next(flight.events)
+                        except StopIteration:
+                            self._finish(key, flight)
+                            return
+                        except Exception as e:
+                            flight.error = e
+                            self._finish(key, flight)
+                            raise
+                        flight.produced.append(event)
+                position += 1
+                yield event
+        finally:
+            with self._lock:
+                flight.subscribers -= 1
+                abandoned = flight.subscribers == 0 and not flight.done
+                if abandoned and self._flights.get(key) is flight:
+                    del self._flights[key]
+            if abandoned:
+                with flight.lock:
+                    flight.done = True
+                    flight.events.close()
+
+    def _finish(self, key, flight):
+        flight.done = True
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._flights)
+            }
@@ -0,0 +1,121 @@
+"""
+Spotify client-credentials token cached in a locked file shared by every worker on the host.
+"""
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from spotipy.cache_handler import CacheHandler
+from spotipy.oauth2 import SpotifyClientCredentials
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SPOTIFY_TOKEN_CACHE = os.getenv("SPOTIFY_TOKEN_CACHE",
+                                os.path.join(tempfile.gettempdir(), "moodstream-spotify-token.json"))
+
+
+class SharedTokenCache(CacheHandler):
+    """
+    spotipy cache handler storing the token in a file shared by all workers.
+    Tokens saved for a different client id are ignored.
+    """
+
+    def __init__(self, path=SPOTIFY_TOKEN_CACHE, client_id=None):
+        self.path = path
+        self.client_id = client_id
+        self.reads = 0
+        self.writes = 0
+
+    def get_cached_token(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                token_info = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self.reads += 1
+        if not isinstance(token_info, dict) or token_info.get("client_id") != self.client_id:
+            return None
+        return token_info
+
+    def save_token_to_cache(self, token_info):
+        token_info = dict(token_info, client_id=self.client_id)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            # Write a private temp file and swap it in, so readers never see a partial token
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".spotify-token-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(token_info, f)
+            os.replace(tmp_path, self.path)
+            self.writes += 1
+        except OSError as e:
+            print(f"Could not write Spotify token cache {self.path}: {e}")
+
+    @contextmanager
+    def locked(self):
+        """
+        Hold an exclusive lock on the cache file's companion lock file.
+        """
+        if fcntl is None:
+            yield
+            return
+        try:
+            lock_file = open(self.path + ".lock", "a")
+        except OSError as e:
+            print(f"Could not open Spotify token lock {self.path}.lock: {e}")
+            yield
+            return
+        with lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class SharedClientCredentials(SpotifyClientCredentials):
+    """
+    Client-credentials flow that fetches at most one token per expiry
+    across all workers sharing the cache file.
+    """
+
+    def __init__(self, client_id=None, client_secret=None, cache_path=SPOTIFY_TOKEN_CACHE, **kwargs):
+        super().__init__(client_id=client_id, client_secret=client_secret,
+                         cache_handler=SharedTokenCache(cache_path, client_id), **kwargs)
+        self._token_info = None
+        self._lock = threading.Lock()
+        self.fetches = 0
+
+    def get_access_token(self, as_dict=False, check_cache=True):
+        token_info = self._token_info
+        if not check_cache or token_info is None or self.is_token_expired(token_info):
+            with self._lock:
+                token_info = self._token_info
+                if not check_cache or token_info is None or self.is_token_expired(token_info):
+                    token_info = self._token_info = self._shared_token(check_cache)
+        return token_info if as_dict else token_info["access_token"]
+
+    def _shared_token(self, check_cache):
+        with self.cache_handler.locked():
+            if check_cache:
+                token_info = self.cache_handler.get_cached_token()
+                if token_info and not self.is_token_expired(token_info):
+                    return token_info
+            token_info = self._add_custom_values_to_token_info(self._request_access_token())
+            self.fetches += 1
+            self.cache_handler.save_token_to_cache(token_info)
+            return token_info
+
+    def stats(self):
+        token_info = self._token_info
+        return {
+            "cache_path": self.cache_handler.path,
+            "token_fetches": self.fetches,
+            "cache_reads": self.cache_handler.reads,
+            "cache_writes": self.cache_handler.writes,
+            "expires_at": token_info["expires_at"] if token_info else None
+        }
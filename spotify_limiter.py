@@ -0,0 +1,294 @@
+"""
+Rate limiting, adaptive concurrency and a circuit breaker around the Spotify client.
+"""
+import os
+import threading
+import time
+
+import requests
+from urllib3.util.retry import Retry
+
+SPOTIFY_RATE = float(os.getenv("SPOTIFY_RATE", 30))  # sustained requests per second (0 disables)
+SPOTIFY_BURST = int(os.getenv("SPOTIFY_BURST", 60))  # one full-list recommendation issues up to ~26 searches
+SPOTIFY_MAX_CONCURRENCY = int(os.getenv("SPOTIFY_MAX_CONCURRENCY", 16))
+SPOTIFY_MIN_CONCURRENCY = int(os.getenv("SPOTIFY_MIN_CONCURRENCY", 1))
+SPOTIFY_MAX_WAIT = float(os.getenv("SPOTIFY_MAX_WAIT", 10))  # seconds a call may wait for tokens, slots or Retry-After
+SPOTIFY_MAX_ATTEMPTS = int(os.getenv("SPOTIFY_MAX_ATTEMPTS", 3))  # tries per call when rate limited
+SPOTIFY_BREAKER_THRESHOLD = int(os.getenv("SPOTIFY_BREAKER_THRESHOLD", 5))  # consecutive failures that open the breaker
+SPOTIFY_BREAKER_RESET = float(os.getenv("SPOTIFY_BREAKER_RESET", 30))  # seconds before a probe call is let through
+SPOTIFY_POOL_SIZE = int(os.getenv("SPOTIFY_POOL_SIZE", SPOTIFY_MAX_CONCURRENCY))  # keep-alive connections per host
+SPOTIFY_CONNECT_TIMEOUT = float(os.getenv("SPOTIFY_CONNECT_TIMEOUT", 3.05))
+SPOTIFY_READ_TIMEOUT = float(os.getenv("SPOTIFY_READ_TIMEOUT", 10))
+SPOTIFY_TIMEOUT = (SPOTIFY_CONNECT_TIMEOUT, SPOTIFY_READ_TIMEOUT)  # requests_timeout for spotipy
+DEFAULT_RETRY_AFTER = 1.0
+MAX_RETRY_AFTER = 60.0
+
+# Statuses the HTTP layer may retry on its own; 429 is handled by the limiter
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+def spotify_session(retries=3, backoff_factor=0.3, pool_size=SPOTIFY_POOL_SIZE):
+    """
+    requests session for spotipy.Spotify(requests_session=...) that retries
+    connection errors and 5xx responses but hands every 429 to the caller.
+
+    Connections are kept alive and pooled per host. The pool holds as many
+    connections as searches can be in flight, so concurrent searches reuse
+    them instead of opening (and TLS-handshaking) new ones that urllib3's
+    default pool of 10 would then discard.
+    """
+    retry = Retry(
+        total=retries,
+        connect=None,
+        read=False,
+        allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE']),
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        respect_retry_after_header=False)
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class SpotifyUnavailable(Exception):
+    """
+    Raised instead of calling Spotify while the breaker is open or the
+    call could not get capacity within its wait budget.
+    """
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at rate tokens per second.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline):
+        """
+        Take one token, waiting until deadline (monotonic) at most.
+        """
+        if self.rate <= 0:
+            return True
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit with additive increase and multiplicative decrease.
+    """
+
+    def __init__(self, initial, minimum, maximum, decrease=0.5):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(self.maximum, max(self.minimum, initial)))
+        self.decrease = decrease
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, deadline):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            self.in_flight += 1
+            return True
+
+    def release(self, congested=False):
+        with self._cond:
+            self.in_flight -= 1
+            if congested:
+                self.limit = max(self.minimum, self.limit * self.decrease)
+            else:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+
+class CircuitBreaker:
+    """
+    Opens after threshold consecutive failures; after reset_timeout a
+    single probe call decides whether it closes again.
+    """
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opens = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._probing:
+                    return False
+                self._probing = True
+                return True
+            return self.state == "closed"
+
+    def available(self):
+        with self._lock:
+            return self.state != "open" or time.monotonic() - self._opened_at >= self.reset_timeout
+
+    def record(self, healthy):
+        """
+        Record a call outcome: True, False, or None when the call never
+        reached Spotify (it only releases a half-open probe).
+        """
+        with self._lock:
+            self._probing = False
+            if healthy is None:
+                return
+            if healthy:
+                self.state = "closed"
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    self.opens += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+def retry_after_seconds(error):
+    """
+    Seconds to wait from a 429's Retry-After header, bounded.
+    """
+    headers = getattr(error, "headers", None) or {}
+    try:
+        value = float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+    return min(MAX_RETRY_AFTER, max(0.0, value))
+
+
+class RateLimitedSpotify:
+    """
+    Wraps a spotipy client; search() is limited, other attributes pass through.
+    """
+
+    def __init__(self, sp, rate=SPOTIFY_RATE, burst=SPOTIFY_BURST, max_concurrency=SPOTIFY_MAX_CONCURRENCY,
+                 min_concurrency=SPOTIFY_MIN_CONCURRENCY, max_wait=SPOTIFY_MAX_WAIT,
+                 max_attempts=SPOTIFY_MAX_ATTEMPTS, breaker_threshold=SPOTIFY_BREAKER_THRESHOLD,
+                 breaker_reset=SPOTIFY_BREAKER_RESET):
+        self.sp = sp
+        self.max_wait = max_wait
+        self.max_attempts = max_attempts
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AdaptiveConcurrency(max_concurrency, min_concurrency, max_concurrency)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+        self.rejected = 0
+
+    def __getattr__(self, name):
+        return getattr(self.sp, name)
+
+    def available(self):
+        """
+        False while the circuit breaker is open.
+        """
+        return self.breaker.available()
+
+    def _pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _wait_for_capacity(self, deadline):
+        with self._lock:
+            paused_until = self._paused_until
+        if paused_until > time.monotonic():
+            if paused_until > deadline:
+                return False
+            time.sleep(paused_until - time.monotonic())
+        return self.bucket.acquire(deadline) and self.concurrency.acquire(deadline)
+
+    def search(self, q, limit=10, offset=0, type="track", market=None):
+        if not self.breaker.allow():
+            with self._lock:
+                self.rejected += 1
+            raise SpotifyUnavailable("Spotify circuit breaker is open")
+
+        deadline = time.monotonic() + self.max_wait
+        healthy = None
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                if not self._wait_for_capacity(deadline):
+                    with self._lock:
+                        self.rejected += 1
+                    raise SpotifyUnavailable("Spotify rate limit: no capacity within the wait budget")
+
+                congested = False
+                try:
+                    with self._lock:
+                        self.calls += 1
+                    results = self.sp.search(q=q, limit=limit, offset=offset, type=type, market=market)
+                    healthy = True
+                    return results
+                except Exception as e:
+                    status = getattr(e, "http_status", None)
+                    if status == 429 and getattr(e, "headers", None) is not None:
+                        congested = True
+                        with self._lock:
+                            self.throttled += 1
+                        self._pause(retry_after_seconds(e))
+                        if attempt < self.max_attempts:
+                            continue
+                        healthy = False
+                    elif status is None or status >= 500 or status == 429:
+                        # Timeouts, connection errors and server errors (spotipy
+                        # reports exhausted 5xx retries as a 429 without headers)
+                        congested = True
+                        healthy = False
+                    else:
+                        healthy = True  # Client errors: the API itself is up
+                    raise
+                finally:
+                    self.concurrency.release(congested)
+        finally:
+            self.breaker.record(healthy)
+
+    def stats(self):
+        with self._lock:
+            paused_for = max(0.0, self._paused_until - time.monotonic())
+            calls, throttled, rejected = self.calls, self.throttled, self.rejected
+        return {
+            "calls": calls,
+            "throttled": throttled,
+            "rejected": rejected,
+            "paused_seconds": round(paused_for, 3),
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+            "rate_per_second": self.bucket.rate,
+            "breaker_state": self.breaker.state,
+            "breaker_opens": self.breaker.opens
+        }
@@ -0,0 +1,85 @@
+"""
+Concurrent Spotify searches on a shared thread pool, served from the search cache when possible.
+"""
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+from metrics import registry
+from search_cache import search_cache
+from spotify_limiter import SpotifyUnavailable
+
+# Upper bound on Spotify searches in flight across all requests of a worker
+SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", 16))
+
+_executor = ThreadPoolExecutor(max_workers=SEARCH_CONCURRENCY, thread_name_prefix="spotify-search")
+
+# Labelled by query kind ("profile" combinations or "fallback" searches),
+# not by query text, which would give one series per distinct query
+SPOTIFY_REQUESTS = registry.counter(
+    "moodstream_spotify_requests_total", "Spotify search calls by query kind and outcome", ("kind", "outcome"))
+SPOTIFY_QUERY_SECONDS = registry.counter(
+    "moodstream_spotify_query_seconds_total", "Time spent in Spotify search calls by query kind", ("kind",))
+SPOTIFY_LATENCY = registry.histogram(
+    "moodstream_spotify_request_seconds", "Spotify search call latency, including rate-limit waits", ("outcome",))
+
+
+def _search(sp, query, limit, market, kind):
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        results = sp.search(q=query, type='track', limit=limit, market=market)
+        outcome = "ok"
+        return results
+    except Exception as e:
+        if isinstance(e, SpotifyUnavailable):
+            outcome = "unavailable"
+        elif getattr(e, "http_status", None) == 429:
+            outcome = "rate_limited"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        SPOTIFY_REQUESTS.inc(kind=kind, outcome=outcome)
+        SPOTIFY_QUERY_SECONDS.inc(elapsed, kind=kind)
+        SPOTIFY_LATENCY.observe(elapsed, outcome=outcome)
+
+
+def _search_and_store(sp, query, limit, market, kind):
+    results = _search(sp, query, limit, market, kind)
+    search_cache.put((query, limit, market), results)
+    return results
+
+
+def _submit(sp, query, limit, market, kind):
+    """
+    Return a future for the search, already resolved on a cache hit.
+    """
+    cached = search_cache.get((query, limit, market), refresh=lambda: _search(sp, query, limit, market, kind))
+    if cached is not None:
+        future = Future()
+        future.set_result(cached)
+        return future
+    return _executor.submit(_search_and_store, sp, query, limit, market, kind)
+
+
+def search_many(sp, queries, limit, market='IN', ordered=True, kind="profile"):
+    """
+    Submit every query at once and yield (query, results, error) tuples
+    in the original query order, so callers keep their existing dedup and
+    early-exit logic. With ordered=False results are yielded as soon as
+    each search finishes instead. Closing the generator (or breaking out of
+    a ``with closing(...)`` block) cancels the searches that have not started.
+    kind ("profile" or "fallback") labels the search metrics.
+    """
+    queries = list(queries)
+    futures = [_submit(sp, query, limit, market, kind) for query in queries]
+    query_of = {future: query for query, future in zip(queries, futures)}
+    try:
+        for future in (futures if ordered else as_completed(futures)):
+            try:
+                yield query_of[future], future.result(), None
+            except Exception as search_error:
+                yield query_of[future], None, search_error
+    finally:
+        for future in futures:
+            future.cancel()
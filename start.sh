@@ -0,0 +1,42 @@
+#!/usr/bin/env bash
+# Production entry point: the emotion model server and gunicorn run side by
+# side, and the service stops when either of them exits so the platform
+# restarts both instead of leaving workers without their model server.
+set -u
+
+SOCKET="${EMOTION_MODEL_SERVER:-/tmp/moodstream-model.sock}"
+READY_TIMEOUT="${EMOTION_MODEL_SERVER_READY_TIMEOUT:-120}"  # seconds to wait for the model to load
+
+# Every process publishes its metrics here for /metrics to aggregate;
+# cleared so totals start from zero with the service
+export METRICS_DIR="${METRICS_DIR:-/tmp/moodstream-metrics}"
+rm -rf "$METRICS_DIR"
+
+trap 'kill $(jobs -p) 2>/dev/null' EXIT
+
+rm -f "$SOCKET"  # a stale socket would look ready
+python model_server.py --socket "$SOCKET" &
+server=$!
+
+# The server binds its socket only after the model is loaded and warmed up
+waited=0
+until [ -S "$SOCKET" ]; do
+    if ! kill -0 "$server" 2>/dev/null; then
+        echo "Emotion model server exited before listening" >&2
+        exit 1
+    fi
+    if [ "$waited" -ge $((READY_TIMEOUT * 5)) ]; then
+        echo "Emotion model server not listening after ${READY_TIMEOUT}s" >&2
+        exit 1
+    fi
+    sleep 0.2
+    waited=$((waited + 1))
+done
+
+gunicorn --bind "0.0.0.0:${PORT:-5000}" --timeout 120 app:app &
+
+# Exit (and take the other process down) as soon as either one stops
+wait -n
+status=$?
+echo "A MoodStream process exited with status $status, stopping the service" >&2
+exit "$status"
@@ -0,0 +1,179 @@
+"""
+Persistent SQLite catalog of tracks found on Spotify, per emotion.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from tracks import Track
+
+TRACK_CATALOG_PATH = os.getenv("TRACK_CATALOG_PATH", "track_catalog.db")
+TRACK_CATALOG_MAX_AGE_DAYS = float(os.getenv("TRACK_CATALOG_MAX_AGE_DAYS", 30))
+TRACK_CATALOG_COMPACT_SECONDS = float(os.getenv("TRACK_CATALOG_COMPACT_SECONDS", 86400))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    url TEXT NOT NULL,
+    artists TEXT NOT NULL,
+    popularity INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS track_emotions (
+    emotion TEXT NOT NULL,
+    track_id TEXT NOT NULL REFERENCES tracks(id) ON DELETE CASCADE,
+    search_term TEXT,
+    popularity INTEGER NOT NULL DEFAULT 0,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (emotion, track_id)
+);
+DROP INDEX IF EXISTS idx_tracks_popularity;
+CREATE INDEX IF NOT EXISTS idx_track_emotions_track ON track_emotions(track_id);
+CREATE INDEX IF NOT EXISTS idx_track_emotions_search_term ON track_emotions(search_term);
+CREATE INDEX IF NOT EXISTS idx_track_emotions_seen_at ON track_emotions(seen_at);
+"""
+
+# Popularity is copied onto each emotion link so top_tracks() reads the
+# (emotion, popularity) index in order instead of sorting every link
+POPULARITY_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_track_emotions_popularity ON track_emotions(emotion, popularity DESC);
+"""
+
+
+class TrackCatalog:
+    """
+    Thread-safe wrapper around the on-disk catalog (one connection per thread).
+    """
+
+    def __init__(self, path=TRACK_CATALOG_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._compactor = None
+        self._stop = threading.Event()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(track_emotions)")}
+            if "popularity" not in columns:
+                # Catalogs created before links carried popularity
+                conn.execute("ALTER TABLE track_emotions ADD COLUMN popularity INTEGER NOT NULL DEFAULT 0")
+                conn.execute("UPDATE track_emotions SET popularity = "
+                             "(SELECT popularity FROM tracks WHERE tracks.id = track_emotions.track_id)")
+            conn.executescript(POPULARITY_INDEX)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def upsert_tracks(self, emotion, tracks):
+        """
+        Bulk insert or update tracks (tracks.Track) found for an emotion in
+        one transaction.
+        """
+        if not tracks:
+            return 0
+        now = time.time()
+        emotion = emotion.lower()
+        with self._connect() as conn:
+            conn.executemany(
+                """
+                INSERT INTO tracks (id, name, url, artists, popularity, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    name = excluded.name,
+                    url = excluded.url,
+                    artists = excluded.artists,
+                    popularity = excluded.popularity,
+                    updated_at = excluded.updated_at
+                """,
+                [(track.id, track.name, track.url, json.dumps(track.artists),
+                  track.popularity, now) for track in tracks]
+            )
+            conn.executemany(
+                """
+                INSERT INTO track_emotions (emotion, track_id, search_term, popularity, seen_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(emotion, track_id) DO UPDATE SET
+                    search_term = COALESCE(excluded.search_term, track_emotions.search_term),
+                    popularity = excluded.popularity,
+                    seen_at = excluded.seen_at
+                """,
+                [(emotion, track.id, track.search_term, track.popularity, now) for track in tracks]
+            )
+            # Keep the track's links for other emotions in step
+            conn.executemany(
+                "UPDATE track_emotions SET popularity = ? WHERE track_id = ? AND emotion != ? AND popularity != ?",
+                [(track.popularity, track.id, emotion, track.popularity) for track in tracks]
+            )
+        return len(tracks)
+
+    def top_tracks(self, emotion, limit=50):
+        """
+        Return up to limit tracks for an emotion, most popular first.
+        """
+        rows = self._connect().execute(
+            """
+            SELECT t.id, t.name, t.url, t.artists, t.popularity, e.search_term
+            FROM track_emotions e JOIN tracks t ON t.id = e.track_id
+            WHERE e.emotion = ?
+            ORDER BY e.popularity DESC
+            LIMIT ?
+            """,
+            (emotion.lower(), limit)
+        ).fetchall()
+        return [
+            Track(row['id'], row['name'], row['url'], json.loads(row['artists']), row['popularity'], row['search_term'])
+            for row in rows
+        ]
+
+    def count(self, emotion=None):
+        conn = self._connect()
+        if emotion is None:
+            return conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+        return conn.execute("SELECT COUNT(*) FROM track_emotions WHERE emotion = ?", (emotion.lower(),)).fetchone()[0]
+
+    def compact(self, max_age_days=TRACK_CATALOG_MAX_AGE_DAYS):
+        """
+        Expire emotion links not seen within max_age_days, drop tracks no
+        emotion references any more, and reclaim the freed pages.
+        """
+        cutoff = time.time() - max_age_days * 86400
+        conn = self._connect()
+        with conn:
+            expired = conn.execute("DELETE FROM track_emotions WHERE seen_at < ?", (cutoff,)).rowcount
+            orphaned = conn.execute(
+                "DELETE FROM tracks WHERE id NOT IN (SELECT DISTINCT track_id FROM track_emotions)"
+            ).rowcount
+        conn.execute("VACUUM")
+        print(f"Track catalog compacted: {expired} expired links, {orphaned} orphaned tracks removed")
+        return expired, orphaned
+
+    def start_compactor(self, interval=TRACK_CATALOG_COMPACT_SECONDS):
+        """
+        Run compact() periodically on a daemon thread (idempotent).
+        """
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._stop.clear()
+        self._compactor = threading.Thread(target=self._run_compactor, args=(interval,),
+                                           name="track-catalog-compactor", daemon=True)
+        self._compactor.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run_compactor(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"Track catalog compaction failed: {e}")
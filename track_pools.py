@@ -0,0 +1,112 @@
+"""
+Per-emotion track pools, rebuilt in the background and optionally shared through a snapshot file.
+"""
+import os
+import threading
+import time
+
+TRACK_POOL_REFRESH_SECONDS = float(os.getenv("TRACK_POOL_REFRESH_SECONDS", 1800))
+
+
+class TrackPools:
+    """
+    Holds the latest pool per emotion and the thread that rebuilds them.
+    """
+
+    def __init__(self, build_fn, emotions, refresh_seconds=TRACK_POOL_REFRESH_SECONDS, snapshot=None):
+        self.build_fn = build_fn
+        self.emotions = list(emotions)
+        self.refresh_seconds = refresh_seconds
+        self.snapshot = snapshot
+        self._pools = {}  # emotion (lowercase) -> candidates (ranking.CandidateSet); replaced, not rebuilt in place
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_built_at = None
+        self.builds = 0
+
+    def get(self, emotion):
+        """
+        Return the candidate pool for an emotion, or None if none was built yet.
+        """
+        return self._pools.get(emotion.lower())
+
+    def seed(self, pools):
+        """
+        Install initial pools (e.g. loaded from disk) for emotions that have none yet.
+        """
+        new_pools = dict(self._pools)
+        for emotion, pool in pools.items():
+            if pool and emotion.lower() not in new_pools:
+                new_pools[emotion.lower()] = pool
+        self._pools = new_pools
+
+    def refresh(self):
+        """
+        Rebuild every pool and swap the new set in with a single assignment.
+        Emotions whose build fails or comes back empty keep their previous pool.
+        """
+        new_pools = dict(self._pools)
+        for emotion in self.emotions:
+            try:
+                pool = self.build_fn(emotion)
+                if pool:
+                    new_pools[emotion.lower()] = pool
+            except Exception as e:
+                print(f"Track pool build failed for {emotion}: {e}")
+
+        # Publish through the snapshot and serve the mapped copy like every other worker
+        if self.snapshot is not None and new_pools:
+            mapped = self.snapshot.write(new_pools)
+            if mapped:
+                new_pools = dict(new_pools, **mapped)
+
+        self._pools = new_pools
+        self.last_built_at = time.time()
+        self.builds += 1
+        print(f"Track pools refreshed: {', '.join(f'{k}={len(v)}' for k, v in new_pools.items())}")
+
+    def sync(self):
+        """
+        Map the shared snapshot if another worker published a new one.
+        Returns True if pools were swapped in.
+        """
+        if self.snapshot is None:
+            return False
+        pools = self.snapshot.load()
+        if not pools:
+            return False
+        self._pools = dict(self._pools, **pools)
+        self.last_built_at = self.snapshot.created_at
+        return True
+
+    def start(self):
+        """
+        Start the background builder thread (idempotent).
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="track-pool-builder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Without a snapshot every worker builds; with one only the refresher does
+            if self.snapshot is None or self.snapshot.lead():
+                self.refresh()
+                self._stop.wait(self.refresh_seconds)
+            else:
+                self.sync()
+                self._stop.wait(self.snapshot.poll_seconds)
+
+    def stats(self):
+        return {
+            "pools": {emotion: len(pool) for emotion, pool in self._pools.items()},
+            "builds": self.builds,
+            "last_built_at": self.last_built_at,
+            "refresh_seconds": self.refresh_seconds,
+            "snapshot": self.snapshot.stats() if self.snapshot is not None else None
+        }
@@ -0,0 +1,59 @@
+"""
+Compact track records with interned strings; response rows are built when served.
+"""
+import sys
+
+TRACK_URL_PREFIX = "https://open.spotify.com/track/"
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class Track:
+    """
+    One recommendation candidate.
+    """
+    __slots__ = ("id", "name", "artists", "popularity", "search_term", "_url")
+
+    def __init__(self, id, name, url=None, artists=(), popularity=0, search_term=None):
+        self.id = _intern(id)
+        self.name = _intern(name)
+        self.artists = tuple(_intern(artist) for artist in artists)
+        self.popularity = popularity or 0
+        self.search_term = _intern(search_term)
+        # Only keep URLs that are not the canonical one for the id
+        self._url = None if url is None or url == TRACK_URL_PREFIX + id else url
+
+    @classmethod
+    def from_spotify(cls, item, search_term=None):
+        """
+        Build a track from a Spotify search result item.
+        """
+        return cls(item['id'], item['name'], item['external_urls'].get('spotify'),
+                   [artist['name'] for artist in item['artists']], item.get('popularity'), search_term)
+
+    @property
+    def url(self):
+        return self._url or TRACK_URL_PREFIX + self.id
+
+    def display_row(self):
+        """
+        [name, url], the shape of the recommendation display list.
+        """
+        return [self.name, self.url]
+
+    def full_row(self):
+        """
+        [name, url, artists], the shape of the email playlist.
+        """
+        return [self.name, self.url, ', '.join(self.artists)]
+
+    def __eq__(self, other):
+        return isinstance(other, Track) and self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"Track({self.id!r}, {self.name!r}, artists={list(self.artists)!r}, popularity={self.popularity})"